@@ -0,0 +1,310 @@
+"""
+HTTP API базы студентов для других подразделений
+
+Необязательный асинхронный сервис на aiohttp (в requirements.txt не
+входит, устанавливается отдельно: pip install aiohttp). Отдаёт JSON:
+
+    GET /api/students          список с keyset-пагинацией и фильтрами поиска
+    GET /api/students/count    количество по фильтрам
+    GET /api/stats             статистика по годам поступления и институтам
+    GET /api/departments       справочник кафедр
+    GET /health                проверка живости
+
+Параметры списка: sort (колонка Database.SORT_COLUMNS), desc=1, limit
+(не больше MAX_LIMIT), after (курсор из поля next предыдущего ответа) и
+фильтры Database.STUDENT_FILTERS (admission_year, group_name, ...).
+
+Запросы к PostgreSQL блокирующие, поэтому выполняются в пуле потоков,
+а соединения берутся из ThreadedConnectionPool. Готовые ответы хранятся
+в кэше процесса на cache_ttl секунд; каждый ответ получает ETag, и на
+If-None-Match с тем же ETag сервис отвечает 304 без тела.
+
+Зашифрованные поля (телефон, номер зачётки) не отдаются.
+
+Запуск:
+    python -m app.api --host 0.0.0.0 --port 8080
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+try:
+    from aiohttp import web
+except ImportError:  # сервис необязателен, остальное приложение работает без aiohttp
+    web = None
+
+from app.database import Database, QueryTimeoutError
+from app.query_cache import QueryCache
+from app.replicas import ReplicaSet
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+CACHE_MAX_ENTRIES = 1024
+
+
+def encode_cursor(value, student_id):
+    """Упаковывает ключ последней строки страницы в непрозрачную строку"""
+    raw = json.dumps([value, student_id], ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Распаковывает курсор страницы
+
+    Raises:
+        ValueError: курсор повреждён
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        value, student_id = json.loads(base64.urlsafe_b64decode(padded).decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Некорректный курсор страницы")
+    return value, int(student_id)
+
+
+def make_etag(body):
+    """Сильный ETag по содержимому ответа"""
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def etag_matches(header, etag):
+    """Проверяет заголовок If-None-Match"""
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags or f"W/{etag}" in tags
+
+
+class ResponseCache:
+    """Кэш готовых ответов с временем жизни и вытеснением давно не нужных"""
+
+    def __init__(self, ttl, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # ключ -> (истекает, etag, тело)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Возвращает (etag, тело) или None"""
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def put(self, key, etag, body):
+        if self.ttl <= 0:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, etag, body)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+def parse_filters(query):
+    """Выбирает из параметров запроса фильтры поиска"""
+    return {name: query[name] for name in Database.STUDENT_FILTERS if query.get(name)}
+
+
+def parse_limit(query):
+    try:
+        limit = int(query.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError("limit должен быть числом")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"limit должен быть от 1 до {MAX_LIMIT}")
+    return limit
+
+
+class StudentService:
+    """Блокирующие операции с базой; вызываются из пула потоков"""
+
+    def __init__(self, db_config, pool_min=2, pool_max=10):
+        self.db_config = db_config
+        self.pool = Database.create_pool(db_config, pool_min, pool_max)
+        # Общий для всех запросов кэш результатов (справочники, счётчики)
+        self.query_cache = QueryCache.from_config(db_config)
+        # Чтения уходят на реплики, если они заданы (DB_REPLICAS)
+        self.replicas = ReplicaSet.from_config(db_config, maxconn=pool_max)
+        # Потоков не больше соединений, иначе потоки ждали бы пул
+        self.executor = ThreadPoolExecutor(max_workers=pool_max, thread_name_prefix='api-db')
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.pool.closeall()
+        if self.replicas is not None:
+            self.replicas.close()
+
+    def database(self):
+        return Database(self.db_config, pool=self.pool, cache=self.query_cache,
+                        replicas=self.replicas)
+
+    def list_students(self, query):
+        sort_by = query.get('sort', 'last_name')
+        descending = query.get('desc') in ('1', 'true')
+        limit = parse_limit(query)
+        after = decode_cursor(query['after']) if query.get('after') else None
+
+        students = self.database().get_students_page(
+            sort_by=sort_by, descending=descending, after=after,
+            limit=limit, filters=parse_filters(query),
+        )
+        next_cursor = None
+        if len(students) == limit:
+            last = students[-1]
+            next_cursor = encode_cursor(last[sort_by], last['id'])
+        return {'items': students, 'next': next_cursor}
+
+    def count_students(self, query):
+        return {'count': self.database().count_students(parse_filters(query))}
+
+    def stats(self, query):
+        return self.database().student_stats(parse_filters(query))
+
+    def departments(self, query):
+        return {'items': self.database().get_departments() or []}
+
+
+class ApiHandlers:
+    """Обработчики HTTP-запросов"""
+
+    def __init__(self, service, cache):
+        self.service = service
+        self.cache = cache
+
+    async def respond(self, request, operation):
+        """
+        Отвечает JSON-результатом операции с кэшем и ETag
+
+        Args:
+            operation: метод StudentService, принимающий параметры запроса
+        """
+        key = request.path_qs
+        cached = self.cache.get(key)
+
+        if cached is None:
+            query = dict(request.query)
+            loop = asyncio.get_running_loop()
+            try:
+                data = await loop.run_in_executor(self.service.executor, partial(operation, query))
+            except ValueError as e:
+                return web.json_response({'error': str(e)}, status=400)
+            except QueryTimeoutError as e:
+                logger.warning("Таймаут API %s: %s", key, e)
+                return web.json_response({'error': "Запрос выполняется слишком долго, уточните фильтры"},
+                                         status=504)
+            except Exception as e:
+                logger.error("Ошибка API %s: %s", key, e)
+                return web.json_response({'error': "Ошибка базы данных"}, status=503)
+
+            body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+            etag = make_etag(body)
+            self.cache.put(key, etag, body)
+        else:
+            etag, body = cached
+
+        headers = {
+            'ETag': etag,
+            'Cache-Control': f"max-age={int(self.cache.ttl)}",
+        }
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type='application/json',
+                            charset='utf-8', headers=headers)
+
+    async def students(self, request):
+        return await self.respond(request, self.service.list_students)
+
+    async def count(self, request):
+        return await self.respond(request, self.service.count_students)
+
+    async def stats(self, request):
+        return await self.respond(request, self.service.stats)
+
+    async def departments(self, request):
+        return await self.respond(request, self.service.departments)
+
+    async def health(self, request):
+        replicas = self.service.replicas
+        return web.json_response({
+            'status': 'ok',
+            'cache': {'entries': len(self.cache.entries),
+                      'hits': self.cache.hits, 'misses': self.cache.misses},
+            'replicas': replicas.status() if replicas is not None else [],
+        })
+
+
+def create_app(config):
+    """
+    Создаёт приложение aiohttp
+
+    Args:
+        config: полная конфигурация (load_config())
+    """
+    if web is None:
+        raise RuntimeError("Для HTTP API установите aiohttp: pip install aiohttp")
+
+    api_config = config.get('api', {})
+    service = StudentService(config['database'],
+                             api_config.get('pool_min', 2), api_config.get('pool_max', 10))
+    handlers = ApiHandlers(service, ResponseCache(api_config.get('cache_ttl', 5)))
+
+    app = web.Application()
+    app.router.add_get('/api/students', handlers.students)
+    app.router.add_get('/api/students/count', handlers.count)
+    app.router.add_get('/api/stats', handlers.stats)
+    app.router.add_get('/api/departments', handlers.departments)
+    app.router.add_get('/health', handlers.health)
+
+    async def close_service(app):
+        service.close()
+
+    app.on_cleanup.append(close_service)
+    return app
+
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    from config.settings import load_config, setup_logging
+
+    config = load_config()
+    api_config = config['api']
+
+    parser = argparse.ArgumentParser(description="HTTP API базы данных студентов")
+    parser.add_argument('--host', default=api_config['host'])
+    parser.add_argument('--port', type=int, default=api_config['port'])
+    args = parser.parse_args(argv)
+
+    if web is None:
+        print("Для HTTP API установите aiohttp: pip install aiohttp", file=sys.stderr)
+        return 1
+
+    setup_logging()
+    logger.info("HTTP API на %s:%s", args.host, args.port)
+    web.run_app(create_app(config), host=args.host, port=args.port, print=None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,527 @@
+"""
+Резервное копирование и восстановление базы данных студентов
+
+Таблицы выгружаются потоками COPY в двоичном формате и сжимаются gzip
+на лету, без промежуточных Python-объектов на каждую строку. Выгрузка
+делится на части: партиционированная таблица - по партициям, крупная
+обычная таблица - по диапазонам id, остальные - целиком. Все части
+выгружаются параллельно (по соединению на часть) из одного
+экспортированного снимка (pg_export_snapshot), поэтому копия согласована
+так же, как если бы её делали одной транзакцией.
+
+Восстановление снимает внешние ключи и вторичные индексы, затем
+параллельно заменяет содержимое каждой таблицы или партиции: TRUNCATE и
+COPY FROM выполняются в одной транзакции, и неудачная загрузка
+откатывается к прежним данным. В конце пересоздаются индексы (для
+партиционированной таблицы - по партициям с ATTACH) и ограничения.
+
+Модуль не зависит от PyQt и запускается без графического интерфейса,
+например из cron (python -m app.backup create/restore/list - прежние
+имена тех же задач):
+    python -m app.cli maintenance backup --keep 14
+    python -m app.cli maintenance restore backups/20240901_020000
+    python -m app.cli maintenance backups
+"""
+
+import datetime
+import gzip
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from psycopg2 import sql
+
+from app.database import Database
+from app.utils import CountingWriter
+
+logger = logging.getLogger(__name__)
+
+# Порядок важен только для читаемости манифеста: при восстановлении
+# внешние ключи снимаются, и таблицы загружаются параллельно
+BACKUP_TABLES = ['institutes', 'departments', 'users', 'students']
+MANIFEST_FILE = 'manifest.json'
+DDL_FILE = 'restore_ddl.sql'
+COMPRESS_LEVEL = 6
+# Обычная таблица крупнее этого (по оценке планировщика) выгружается
+# параллельно по диапазонам id
+SPLIT_ROWS = 100000
+
+
+def _connect(db_config):
+    """Открывает отдельное соединение для рабочего потока"""
+    db = Database(db_config)
+    if not db.connect():
+        raise ConnectionError("Не удалось подключиться к базе данных")
+    return db
+
+
+def _run_parallel(workers, calls):
+    """
+    Выполняет вызовы (функция, аргументы...) в пуле потоков
+
+    Дожидается всех вызовов, даже если часть из них упала, и пробрасывает
+    первую ошибку; остальные записываются в журнал.
+    """
+    errors = []
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(*call) for call in calls]
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if errors:
+                    logger.error("Ещё одна ошибка параллельного шага: %s", e)
+                errors.append(e)
+    if errors:
+        raise errors[0]
+    return results
+
+
+def _table_columns(cursor, table):
+    """Возвращает список колонок таблицы в порядке их следования"""
+    cursor.execute("""
+        SELECT attname
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass
+          AND attnum > 0
+          AND NOT attisdropped
+          AND attgenerated = ''
+        ORDER BY attnum
+    """, (f"public.{table}",))
+    return [row['attname'] for row in cursor.fetchall()]
+
+
+def _leaf_partitions(cursor, table):
+    """Партиции таблицы (пустой список для обычной таблицы)"""
+    cursor.execute("""
+        SELECT child.relname
+        FROM pg_inherits inh
+        JOIN pg_class parent ON parent.oid = inh.inhparent
+        JOIN pg_class child ON child.oid = inh.inhrelid
+        WHERE parent.oid = %s::regclass AND parent.relkind = 'p'
+        ORDER BY child.relname
+    """, (f"public.{table}",))
+    return [row['relname'] for row in cursor.fetchall()]
+
+
+def _id_ranges(low, high, parts):
+    """Делит id от low до high включительно на не более parts диапазонов [начало, конец)"""
+    step = max(1, -(-(high - low + 1) // parts))
+    return [(start, min(start + step, high + 1)) for start in range(low, high + 1, step)]
+
+
+def _backup_parts(cursor, tables, chunks):
+    """
+    Делит таблицы на независимо выгружаемые части
+
+    Returns:
+        list: словари {name, relation, file[, id_range]}; name - таблица,
+              relation - откуда читать и куда загружать (таблица или партиция)
+    """
+    parts = []
+    for table in tables:
+        partitions = _leaf_partitions(cursor, table)
+        if partitions:
+            parts += [{'name': table, 'relation': partition, 'file': f"{partition}.copy.gz"}
+                      for partition in partitions]
+            continue
+
+        cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                       (f"public.{table}",))
+        if chunks > 1 and cursor.fetchone()['reltuples'] >= SPLIT_ROWS:
+            cursor.execute(sql.SQL("SELECT min(id) as low, max(id) as high FROM {}").format(
+                sql.Identifier(table)))
+            bounds = cursor.fetchone()
+            if bounds['low'] is not None:
+                parts += [{'name': table, 'relation': table, 'file': f"{table}.{number:03d}.copy.gz",
+                           'id_range': [start, end]}
+                          for number, (start, end) in enumerate(
+                              _id_ranges(bounds['low'], bounds['high'], chunks), 1)]
+                continue
+
+        parts.append({'name': table, 'relation': table, 'file': f"{table}.copy.gz"})
+    return parts
+
+
+def _dump_part(db_config, snapshot, part, target_dir):
+    """Выгружает одну часть из общего снимка в сжатый файл"""
+    started = time.perf_counter()
+    db = _connect(db_config)
+
+    try:
+        db.connection.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        # Должно быть первой командой транзакции
+        db.cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+
+        columns = _table_columns(db.cursor, part['name'])
+        select = sql.SQL("SELECT {} FROM {}").format(
+            sql.SQL(', ').join(map(sql.Identifier, columns)),
+            sql.Identifier(part['relation'])
+        )
+        if part.get('id_range'):
+            start, end = part['id_range']
+            select = sql.SQL("{} WHERE id >= {} AND id < {}").format(
+                select, sql.Literal(start), sql.Literal(end))
+        query = sql.SQL("COPY ({}) TO STDOUT (FORMAT binary)").format(select)
+
+        path = Path(target_dir) / part['file']
+        with gzip.open(path, 'wb', compresslevel=COMPRESS_LEVEL) as f:
+            writer = CountingWriter(f)
+            db.cursor.copy_expert(query, writer)
+        rows = db.cursor.rowcount
+
+        db.connection.rollback()
+    finally:
+        db.disconnect()
+
+    info = dict(part, columns=columns, rows=rows,
+                bytes_raw=writer.bytes_written,
+                bytes_compressed=path.stat().st_size,
+                seconds=round(time.perf_counter() - started, 3))
+    logger.info("Выгружено %s: %s строк, %s байт за %s с",
+                part['file'], rows, info['bytes_compressed'], info['seconds'])
+    return info
+
+
+def create_backup(db_config, backup_root='backups', tables=None, workers=None):
+    """
+    Создаёт резервную копию таблиц в новом подкаталоге backup_root
+
+    Args:
+        db_config: словарь настроек подключения (config['database'])
+        backup_root: каталог для резервных копий
+        tables: список таблиц (по умолчанию BACKUP_TABLES)
+        workers: количество параллельных соединений (по умолчанию - по ядрам)
+
+    Returns:
+        Path: каталог созданной копии
+    """
+    tables = tables or BACKUP_TABLES
+    workers = workers or os.cpu_count() or 1
+
+    target = Path(backup_root) / datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    target.mkdir(parents=True, exist_ok=False)
+    started = time.perf_counter()
+
+    # Координатор держит транзакцию открытой, пока рабочие используют снимок
+    coordinator = _connect(db_config)
+    try:
+        coordinator.connection.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        coordinator.cursor.execute("SELECT pg_export_snapshot() as snapshot, version() as version")
+        state = coordinator.cursor.fetchone()
+        snapshot = state['snapshot']
+
+        # Границы диапазонов id берутся из того же снимка, что и данные
+        parts = _backup_parts(coordinator.cursor, tables, workers)
+        logger.info("Резервное копирование в %s, снимок %s, частей: %s, потоков: %s",
+                    target, snapshot, len(parts), min(workers, len(parts)))
+
+        part_info = _run_parallel(min(workers, len(parts)), [
+            (_dump_part, db_config, snapshot, part, target) for part in parts
+        ])
+
+        coordinator.connection.rollback()
+    except Exception:
+        shutil.rmtree(target, ignore_errors=True)
+        raise
+    finally:
+        coordinator.disconnect()
+
+    manifest = {
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'snapshot': snapshot,
+        'server_version': state['version'],
+        'format': 'copy-binary-gzip',
+        'seconds': round(time.perf_counter() - started, 3),
+        # Части копии; в копиях старого формата - по одной на таблицу без relation
+        'tables': part_info,
+    }
+    with open(target / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    logger.info("Резервная копия создана за %s с: %s", manifest['seconds'], target)
+    return target
+
+
+def _load_relation(db_config, backup_dir, relation, parts):
+    """
+    Заменяет содержимое таблицы или партиции данными копии
+
+    TRUNCATE и COPY FROM выполняются одной транзакцией: при ошибке
+    загрузки в relation остаются прежние данные.
+    """
+    started = time.perf_counter()
+    db = _connect(db_config)
+
+    try:
+        db.cursor.execute(sql.SQL("TRUNCATE {}").format(sql.Identifier(relation)))
+        for part in parts:
+            query = sql.SQL("COPY {} ({}) FROM STDIN (FORMAT binary)").format(
+                sql.Identifier(relation),
+                sql.SQL(', ').join(map(sql.Identifier, part['columns']))
+            )
+            with gzip.open(Path(backup_dir) / part['file'], 'rb') as f:
+                db.cursor.copy_expert(query, f)
+        db.connection.commit()
+    except Exception:
+        db.connection.rollback()
+        raise
+    finally:
+        db.disconnect()
+
+    logger.info("%s загружена за %.3f с", relation, time.perf_counter() - started)
+
+
+def _restore_jobs(parts, extra_relations=()):
+    """
+    Группирует части копии по relation, в которую они загружаются
+
+    extra_relations - партиции базы, которых нет в копии: их нужно только
+    очистить.
+
+    Returns:
+        dict: {relation: [части]} в порядке манифеста
+    """
+    jobs = {}
+    for part in parts:
+        jobs.setdefault(part.get('relation', part['name']), []).append(part)
+    for relation in extra_relations:
+        jobs.setdefault(relation, [])
+    return jobs
+
+
+def _index_rebuild(indexes):
+    """
+    Команды пересоздания снятых индексов
+
+    pg_get_indexdef() индекса партиционированной таблицы - CREATE INDEX
+    ... ON ONLY: сам по себе он пуст и недействителен. Поэтому индексы
+    партиций строятся по их собственным определениям и подключаются к
+    родительскому через ATTACH PARTITION, как в schema.create_index_online.
+
+    Args:
+        indexes: словари {index_name, definition, children}; children -
+                 индексы партиций {index_name, definition}
+
+    Returns:
+        tuple: (родительские индексы, индексы для параллельной сборки, ATTACH)
+    """
+    parents, builds, attaches = [], [], []
+    for index in indexes:
+        if not index['children']:
+            builds.append(index['definition'])
+            continue
+        parents.append(index['definition'])
+        for child in index['children']:
+            builds.append(child['definition'])
+            attaches.append(f'ALTER INDEX "{index["index_name"]}" '
+                            f'ATTACH PARTITION "{child["index_name"]}"')
+    return parents, builds, attaches
+
+
+def _run_ddl(db_config, statement):
+    """Выполняет одну DDL-команду на отдельном соединении"""
+    Database(db_config).execute_query(statement, fetch=False, timeout=0)
+
+
+def _rebuild_indexes(db_config, rebuild, workers):
+    """Пересоздаёт индексы: сначала родительские, затем параллельно остальные, затем ATTACH"""
+    parents, builds, attaches = rebuild
+    for statement in parents:
+        _run_ddl(db_config, statement)
+    _run_parallel(workers, [(_run_ddl, db_config, statement) for statement in builds])
+    for statement in attaches:
+        _run_ddl(db_config, statement)
+
+
+def restore_backup(db_config, backup_dir, workers=None):
+    """
+    Восстанавливает таблицы из резервной копии
+
+    Содержимое таблиц из манифеста полностью заменяется данными копии.
+    Каждая таблица (партиция) заменяется в своей транзакции; если загрузка
+    не удалась, упавшие таблицы сохраняют прежние данные, индексы
+    пересоздаются, а внешние ключи - нет: их определения остаются в
+    restore_ddl.sql каталога копии.
+
+    Args:
+        db_config: словарь настроек подключения (config['database'])
+        backup_dir: каталог резервной копии (с manifest.json)
+        workers: количество параллельных соединений (по умолчанию - по ядрам)
+    """
+    backup_dir = Path(backup_dir)
+    with open(backup_dir / MANIFEST_FILE, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    parts = manifest['tables']
+    tables = list(dict.fromkeys(part['name'] for part in parts))
+    table_oids = [f"public.{table}" for table in tables]
+    started = time.perf_counter()
+
+    admin = Database(db_config)
+    with admin.transaction(timeout=0) as cursor:
+        # Все партиции копии должны существовать до того, как что-то изменится
+        relations = {part.get('relation', part['name']) for part in parts}
+        missing = []
+        for relation in sorted(relations):
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL as found", (f"public.{relation}",))
+            if not cursor.fetchone()['found']:
+                missing.append(relation)
+        if missing:
+            raise ValueError(f"В базе нет таблиц или партиций из копии: {', '.join(missing)}")
+
+        # Партиции базы, которых нет в копии, тоже очищаются
+        extra = [partition for table in tables if table not in relations
+                 for partition in _leaf_partitions(cursor, table) if partition not in relations]
+        jobs = _restore_jobs(parts, extra)
+
+        # Внешние ключи, связанные с восстанавливаемыми таблицами
+        cursor.execute("""
+            SELECT conrelid::regclass::text as table_name, conname,
+                   pg_get_constraintdef(oid) as definition
+            FROM pg_constraint
+            WHERE contype = 'f'
+              AND (conrelid = ANY(%s::regclass[]) OR confrelid = ANY(%s::regclass[]))
+              AND conparentid = 0
+        """, (table_oids, table_oids))
+        foreign_keys = cursor.fetchall()
+
+        # Вторичные индексы, не обслуживающие ограничения
+        cursor.execute("""
+            SELECT i.oid, i.relname as index_name, pg_get_indexdef(ix.indexrelid) as definition
+            FROM pg_index ix
+            JOIN pg_class i ON i.oid = ix.indexrelid
+            WHERE ix.indrelid = ANY(%s::regclass[])
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_constraint c WHERE c.conindid = ix.indexrelid
+              )
+        """, (table_oids,))
+        indexes = [dict(row, children=[]) for row in cursor.fetchall()]
+
+        # Индексы партиций, подключённые к индексам партиционированных таблиц
+        # (DROP INDEX родительского удаляет и их)
+        cursor.execute("""
+            SELECT inh.inhparent as parent, c.relname as index_name,
+                   pg_get_indexdef(c.oid) as definition
+            FROM pg_inherits inh
+            JOIN pg_class c ON c.oid = inh.inhrelid
+            WHERE inh.inhparent = ANY(%s::oid[])
+            ORDER BY c.relname
+        """, ([index['oid'] for index in indexes],))
+        by_oid = {index['oid']: index for index in indexes}
+        for child in cursor.fetchall():
+            by_oid[child['parent']]['children'].append(child)
+
+        rebuild = _index_rebuild(indexes)
+
+        # Определения сохраняем рядом с копией, чтобы их можно было
+        # применить вручную, если восстановление прервётся
+        with open(backup_dir / DDL_FILE, 'w', encoding='utf-8') as f:
+            for statements in rebuild:
+                for statement in statements:
+                    f.write(statement + ";\n")
+            for fk in foreign_keys:
+                f.write(f"ALTER TABLE {fk['table_name']} ADD CONSTRAINT "
+                        f"{fk['conname']} {fk['definition']};\n")
+
+        for fk in foreign_keys:
+            cursor.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(
+                sql.SQL(fk['table_name']), sql.Identifier(fk['conname'])))
+        for index in indexes:
+            cursor.execute(sql.SQL("DROP INDEX {}").format(sql.Identifier(index['index_name'])))
+
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    logger.info("Восстановление из %s: снято %s внешних ключей и %s индексов, частей: %s, потоков: %s",
+                backup_dir, len(foreign_keys), len(indexes), len(jobs), workers)
+
+    try:
+        _run_parallel(workers, [
+            (_load_relation, db_config, backup_dir, relation, relation_parts)
+            for relation, relation_parts in jobs.items()
+        ])
+    except Exception as e:
+        logger.error("Загрузка данных не удалась: %s. Внешние ключи не восстановлены, "
+                     "их определения - в %s", e, backup_dir / DDL_FILE)
+        try:
+            _rebuild_indexes(db_config, rebuild, workers)
+        except Exception as index_error:
+            # Не заслоняем исходную ошибку загрузки
+            logger.error("Не удалось пересоздать индексы: %s", index_error)
+        raise
+
+    _rebuild_indexes(db_config, rebuild, workers)
+
+    with admin.transaction(timeout=0) as cursor:
+        for fk in foreign_keys:
+            cursor.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {}").format(
+                sql.SQL(fk['table_name']), sql.Identifier(fk['conname']),
+                sql.SQL(fk['definition'])))
+
+        # Последовательности id догоняют загруженные данные
+        for table in tables:
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id') as seq",
+                           (f"public.{table}",))
+            row = cursor.fetchone()
+            if row and row['seq']:
+                cursor.execute(sql.SQL(
+                    "SELECT setval(%s, COALESCE((SELECT MAX(id) FROM {}), 0) + 1, false)"
+                ).format(sql.Identifier(table)), (row['seq'],))
+
+    for table in tables:
+        admin.execute_query(sql.SQL("ANALYZE {}").format(sql.Identifier(table)), fetch=False, timeout=0)
+
+    logger.info("Восстановление завершено за %.3f с", time.perf_counter() - started)
+
+
+def list_backups(backup_root='backups'):
+    """
+    Возвращает список резервных копий, от новых к старым
+
+    Returns:
+        list: словари манифестов с дополнительным ключом 'path'
+    """
+    backups = []
+    root = Path(backup_root)
+    if not root.exists():
+        return backups
+
+    for manifest_path in sorted(root.glob(f"*/{MANIFEST_FILE}"), reverse=True):
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest['path'] = manifest_path.parent
+        backups.append(manifest)
+    return backups
+
+
+def prune_backups(backup_root='backups', keep=7):
+    """Удаляет старые резервные копии, оставляя keep последних"""
+    removed = []
+    for manifest in list_backups(backup_root)[keep:]:
+        shutil.rmtree(manifest['path'])
+        removed.append(manifest['path'])
+        logger.info("Удалена старая резервная копия %s", manifest['path'])
+    return removed
+
+
+# Команды python -m app.backup -> задачи python -m app.cli maintenance
+CLI_TASKS = {
+    'create': 'backup',
+    'restore': 'restore',
+    'list': 'backups',
+}
+
+
+def main(argv=None):
+    """Прежняя точка входа командной строки - обёртка над app.cli maintenance"""
+    from app.cli import run_maintenance
+    return run_maintenance(argv, CLI_TASKS)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
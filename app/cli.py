@@ -0,0 +1,418 @@
+"""
+Командная строка для пакетных заданий без графического интерфейса
+
+Модуль не импортирует PyQt и не требует дисплея и окна входа, поэтому
+подходит для cron и скриптов. Настройки подключения берутся из .env
+так же, как в GUI (config.settings.load_config).
+
+Примеры:
+    python -m app.cli search --group ИВТ-20-1 --format csv > group.csv
+    python -m app.cli export --admission-year 2023 --gzip
+    python -m app.cli import students.csv --batch-size 2000
+    python -m app.cli stats
+    python -m app.cli maintenance partitions --years-ahead 2
+    python -m app.cli maintenance reencrypt --batch-size 5000
+    python -m app.cli maintenance migrate
+    python -m app.cli maintenance index-report
+    python -m app.cli maintenance backup --keep 14
+    python -m app.cli maintenance restore backups/20240901_020000
+"""
+
+import argparse
+import csv
+import json
+import logging
+import sys
+import time
+from itertools import islice
+
+from config.settings import load_config, setup_logging
+from app.database import Database
+from app.export import EXPORT_COLUMNS, build_export_query, export_students_csv
+from app.replicas import ReplicaSet
+from app.validation import validate_columns
+
+logger = logging.getLogger(__name__)
+
+# Поля CSV для импорта (как в форме добавления студента)
+IMPORT_FIELDS = (
+    'last_name', 'initials', 'birth_year', 'phone', 'record_book_number',
+    'admission_year', 'group_name', 'department_id', 'city_before',
+)
+DEFAULT_BATCH_SIZE = 1000
+
+# Задачи maintenance (python -m app.schema и python -m app.backup - обёртки над ними)
+MAINTENANCE_TASKS = (
+    'migrate', 'status', 'convert', 'partitions', 'indexes', 'index-report', 'bloat-report',
+    'reencrypt', 'backup', 'restore', 'backups',
+)
+
+# Аргумент командной строки -> фильтр Database.STUDENT_FILTERS
+FILTER_ARGUMENTS = {
+    'admission_year': "Год поступления",
+    'admission_year_from': "Год поступления от",
+    'admission_year_to': "Год поступления до",
+    'institute_code': "Код института",
+    'department_code': "Код кафедры",
+    'group_name': "Группа",
+    'city_before': "Город до поступления",
+}
+FILTER_FLAGS = {
+    'admission_year': '--admission-year',
+    'admission_year_from': '--year-from',
+    'admission_year_to': '--year-to',
+    'institute_code': '--institute',
+    'department_code': '--department',
+    'group_name': '--group',
+    'city_before': '--city',
+}
+
+
+def add_filter_arguments(parser):
+    """Добавляет в парсер аргументы фильтров поиска"""
+    for name, help_text in FILTER_ARGUMENTS.items():
+        parser.add_argument(FILTER_FLAGS[name], dest=name, default=None, help=help_text)
+
+
+def collect_filters(args):
+    """Собирает фильтры из разобранных аргументов"""
+    return {name: getattr(args, name) for name in FILTER_ARGUMENTS
+            if getattr(args, name) is not None}
+
+
+def command_search(db, args, config):
+    """Печатает найденных студентов построчно, по мере чтения из базы"""
+    query, params = build_export_query(db, collect_filters(args))
+    if args.limit:
+        query += " LIMIT %s"
+        params.append(args.limit)
+
+    fields = [name for _, name in EXPORT_COLUMNS]
+    out = sys.stdout
+    writer = None
+    if args.format in ('csv', 'tsv'):
+        writer = csv.writer(out, delimiter=',' if args.format == 'csv' else '\t',
+                            lineterminator='\n')
+        writer.writerow(fields)
+
+    count = 0
+    for row in db.iter_query(query, tuple(params)):
+        if writer is not None:
+            writer.writerow([row[field] for field in fields])
+        else:
+            out.write(json.dumps(row, ensure_ascii=False))
+            out.write('\n')
+        count += 1
+
+    logger.info("Поиск из командной строки: %s записей", count)
+    return 0
+
+
+def command_export(db, args, config):
+    """Выгружает студентов в CSV через COPY"""
+    filters = collect_filters(args)
+
+    if args.output == '-':
+        query, params = build_export_query(db, filters)
+        db.copy_to(query, sys.stdout.buffer, tuple(params),
+                   options="FORMAT csv, HEADER true, ENCODING 'UTF8'")
+        return 0
+
+    result = export_students_csv(db, filters, export_dir=args.dir,
+                                 compress=args.gzip, path=args.output)
+    print(f"{result.path}: {result.rows} записей, {result.bytes_written} байт, "
+          f"{result.seconds:.2f} с, {result.bytes_per_second / 1024 / 1024:.1f} МБ/с",
+          file=sys.stderr)
+    return 0
+
+
+def _department_lookup(db):
+    """Сопоставляет коды кафедр с их ID"""
+    by_code = {}
+    by_full_code = {}
+    for department in db.get_departments() or []:
+        by_full_code[(department['institute_code'], department['code'])] = department['id']
+        # Код без института однозначен, только если не повторяется
+        by_code[department['code']] = None if department['code'] in by_code else department['id']
+    return by_code, by_full_code
+
+
+def _resolve_department(row, by_code, by_full_code):
+    if row.get('department_id'):
+        return row['department_id']
+    code = (row.get('department_code') or '').strip()
+    if not code:
+        return None
+    institute = (row.get('institute_code') or '').strip()
+    if institute:
+        return by_full_code.get((institute, code), code)
+    return by_code.get(code) or code
+
+
+def command_import(db, args, config):
+    """
+    Загружает студентов из CSV пачками
+
+    Каждая пачка проверяется validate_columns; корректные строки шифруются
+    и вставляются одним INSERT, ошибки печатаются в stderr с номером строки.
+    Кафедра задаётся колонкой department_id или department_code
+    (с необязательной institute_code).
+    """
+    from app.encryption import get_encryptor
+
+    encryptor = get_encryptor(**config['encryption'])
+    by_code, by_full_code = _department_lookup(db)
+    started = time.perf_counter()
+    inserted = failed = 0
+
+    with open(args.path, newline='', encoding=args.encoding) as f:
+        reader = csv.DictReader(f, delimiter=args.delimiter)
+        missing = [field for field in IMPORT_FIELDS
+                   if field not in (reader.fieldnames or [])
+                   and not (field == 'department_id' and 'department_code' in (reader.fieldnames or []))]
+        if missing:
+            print(f"В файле нет колонок: {', '.join(missing)}", file=sys.stderr)
+            return 2
+
+        first_line = 2  # строка 1 - заголовок
+        while True:
+            batch = list(islice(reader, args.batch_size))
+            if not batch:
+                break
+
+            columns = {field: [row.get(field) for row in batch] for field in IMPORT_FIELDS}
+            columns['department_id'] = [_resolve_department(row, by_code, by_full_code) for row in batch]
+            result = validate_columns(columns)
+
+            for error in result.errors:
+                print(f"строка {first_line + error.row}: {error.field}: {error.message} ({error.value!r})",
+                      file=sys.stderr)
+
+            students = list(result.rows())
+            failed += len(batch) - len(students)
+            if students and not args.dry_run:
+                inserted += len(db.add_students_with_encryption(students, encryptor))
+            elif args.dry_run:
+                inserted += len(students)
+
+            first_line += len(batch)
+
+    seconds = time.perf_counter() - started
+    action = "Проверено" if args.dry_run else "Загружено"
+    print(f"{action}: {inserted}, с ошибками: {failed}, {seconds:.2f} с", file=sys.stderr)
+    logger.info("Импорт %s: %s записей, ошибок %s за %.2f с", args.path, inserted, failed, seconds)
+    return 1 if failed else 0
+
+
+def command_stats(db, args, config):
+    """Печатает количество студентов по годам поступления и институтам"""
+    stats = db.student_stats(collect_filters(args))
+
+    print(f"Всего студентов: {stats['total']}")
+
+    print("\nПо году поступления:")
+    for row in stats['by_year']:
+        print(f"  {row['admission_year']}\t{row['count']}")
+
+    print("\nПо институтам:")
+    for row in stats['by_institute']:
+        print(f"  {row['code']}\t{row['count']}\t{row['name']}")
+
+    return 0
+
+
+def _format_bytes(size):
+    size = float(size or 0)
+    for unit in ('Б', 'КБ', 'МБ', 'ГБ'):
+        if size < 1024 or unit == 'ГБ':
+            return f"{size:.0f} {unit}" if unit == 'Б' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _print_index_report(report):
+    print(f"Статистика с: {report['stats_reset'] or 'создания базы'}")
+    print("\nНеиспользуемые индексы:")
+    for row in report['unused']:
+        print(f"  {row['table_name']}.{row['index_name']}  {_format_bytes(row['size_bytes'])}")
+    print("\nНедостающие индексы приложения:")
+    for spec in report['missing']:
+        print(f"  {spec['name']} ON {spec['table']} {spec['columns']}")
+    print("\nНедостроенные (INVALID) индексы:")
+    for row in report['invalid']:
+        print(f"  {row['table_name']}.{row['index_name']}")
+    print("\nВнешние ключи без индекса:")
+    for row in report['unindexed_foreign_keys']:
+        print(f"  {row['table_name']}.{row['column_name']} ({row['constraint_name']})")
+    print("\nТаблицы, читаемые в основном целиком:")
+    for row in report['seq_scans']:
+        print(f"  {row['table_name']}: seq_scan {row['seq_scan']}, idx_scan {row['idx_scan']}, "
+              f"строк {row['n_live_tup']}")
+
+
+def _print_bloat_report(rows):
+    for row in rows:
+        print(f"{row['table_name']:<24} мёртвых {row['n_dead_tup']:>10} "
+              f"({float(row['dead_ratio'] or 0):.1%}), "
+              f"≈{_format_bytes(row['estimated_bloat_bytes'])} из {_format_bytes(row['table_bytes'])}, "
+              f"очистка: {row['last_vacuum'] or 'никогда'}")
+
+
+def command_maintenance(db, args, config):
+    """Обслуживание: схема, партиции, индексы, шифрование, резервные копии"""
+    if args.task == 'migrate':
+        from app.schema import DEFAULT_LOCK_TIMEOUT, migrate
+        applied = migrate(db, target=args.target,
+                          lock_timeout=args.lock_timeout or DEFAULT_LOCK_TIMEOUT)
+        print(f"Применены миграции: {applied or 'нет'}")
+    elif args.task == 'status':
+        from app.schema import applied_versions, migrations
+        applied = applied_versions(db)
+        for migration in migrations(db.config.get('collation', 'ru-x-icu')):
+            mark = '✅' if migration.version in applied else '⏳'
+            print(f"{mark} {migration.version}: {migration.description}")
+    elif args.task == 'convert':
+        from app.schema import convert_students_to_partitioned
+        created = convert_students_to_partitioned(db, keep_legacy=args.keep_legacy)
+        print(f"Создано партиций: {len(created)}")
+    elif args.task == 'partitions':
+        from app.schema import ensure_upcoming_partitions
+        created = ensure_upcoming_partitions(db, years_ahead=args.years_ahead)
+        print(f"Созданы партиции на годы: {created or 'нет'}")
+    elif args.task == 'indexes':
+        from app.schema import ensure_indexes
+        built = ensure_indexes(db)
+        print(f"Построены индексы: {', '.join(built) or 'нет'}")
+    elif args.task == 'index-report':
+        from app.schema import index_report
+        _print_index_report(index_report(db))
+    elif args.task == 'bloat-report':
+        from app.schema import bloat_report
+        _print_bloat_report(bloat_report(db))
+    elif args.task == 'reencrypt':
+        from app.encryption import get_encryptor
+        encryptor = get_encryptor(**config['encryption'])
+        updated = db.reencrypt_students(encryptor, batch_size=args.batch_size)
+        print(f"Перешифровано записей ({encryptor.backend.name}): {updated}")
+    elif args.task == 'backup':
+        from app.backup import create_backup, prune_backups
+        target = create_backup(db.config, args.dir, workers=args.workers)
+        print(f"Резервная копия: {target}")
+        if args.keep:
+            prune_backups(args.dir, keep=args.keep)
+    elif args.task == 'restore':
+        from app.backup import restore_backup
+        if not args.path:
+            print("Укажите каталог резервной копии", file=sys.stderr)
+            return 2
+        restore_backup(db.config, args.path, workers=args.workers)
+        print("Восстановление завершено")
+    elif args.task == 'backups':
+        from app.backup import list_backups
+        for manifest in list_backups(args.dir):
+            size = sum(t['bytes_compressed'] for t in manifest['tables'])
+            print(f"{manifest['path']}  {manifest['created_at']}  {size} байт")
+    return 0
+
+
+# Команда: функция(db, args, config); config - уже загруженные настройки из main
+COMMANDS = {
+    'search': command_search,
+    'export': command_export,
+    'import': command_import,
+    'stats': command_stats,
+    'maintenance': command_maintenance,
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m app.cli",
+                                     description="База данных студентов без графического интерфейса")
+    parser.add_argument('--timeout', type=int, default=None,
+                        help="Таймаут запроса, мс (по умолчанию TIMEOUT_BATCH, 0 - без ограничения)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    search_parser = subparsers.add_parser('search', help="Найти студентов и вывести в stdout")
+    add_filter_arguments(search_parser)
+    search_parser.add_argument('--format', choices=('tsv', 'csv', 'jsonl'), default='tsv')
+    search_parser.add_argument('--limit', type=int, default=None)
+
+    export_parser = subparsers.add_parser('export', help="Выгрузить студентов в CSV")
+    add_filter_arguments(export_parser)
+    export_parser.add_argument('--gzip', action='store_true', help="Сжать файл gzip")
+    export_parser.add_argument('--dir', default='exports', help="Каталог выгрузок")
+    export_parser.add_argument('--output', default=None,
+                               help="Путь файла ('-' - в stdout)")
+
+    import_parser = subparsers.add_parser('import', help="Загрузить студентов из CSV")
+    import_parser.add_argument('path', help="CSV-файл с заголовком")
+    import_parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    import_parser.add_argument('--delimiter', default=',')
+    import_parser.add_argument('--encoding', default='utf-8-sig')
+    import_parser.add_argument('--dry-run', action='store_true',
+                               help="Только проверить, ничего не записывать")
+
+    stats_parser = subparsers.add_parser('stats', help="Статистика по студентам")
+    add_filter_arguments(stats_parser)
+
+    maintenance_parser = subparsers.add_parser('maintenance', help="Обслуживание базы")
+    maintenance_parser.add_argument('task', choices=MAINTENANCE_TASKS,
+                                    metavar='task', help=", ".join(MAINTENANCE_TASKS))
+    maintenance_parser.add_argument('path', nargs='?', default=None,
+                                    help="Каталог резервной копии для restore")
+    maintenance_parser.add_argument('--target', type=int, default=None,
+                                    help="Последняя применяемая миграция")
+    maintenance_parser.add_argument('--lock-timeout', default=None,
+                                    help="Сколько миграция ждёт блокировку таблицы")
+    maintenance_parser.add_argument('--keep-legacy', action='store_true',
+                                    help="convert: не удалять students_legacy после переноса")
+    maintenance_parser.add_argument('--years-ahead', type=int, default=1)
+    maintenance_parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                                    help="Размер пачки для reencrypt")
+    maintenance_parser.add_argument('--dir', default='backups', help="Каталог резервных копий")
+    maintenance_parser.add_argument('--keep', type=int, default=None,
+                                    help="Оставить только N последних копий")
+    maintenance_parser.add_argument('--workers', type=int, default=None,
+                                    help="Параллельных соединений для backup и restore")
+
+    return parser
+
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    args = build_parser().parse_args(argv)
+
+    setup_logging()
+    config = load_config()
+    timeout = config['timeouts']['batch'] if args.timeout is None else args.timeout
+    db = Database(dict(config['database'], statement_timeout=timeout),
+                  replicas=ReplicaSet.from_config(config['database']))
+
+    try:
+        return COMMANDS[args.command](db, args, config)
+    except BrokenPipeError:
+        # Вывод обрезан (например, | head) - это не ошибка
+        return 0
+    except Exception as e:
+        logger.error("Ошибка команды %s: %s", args.command, e)
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+
+
+def run_maintenance(argv, tasks):
+    """
+    Выполняет прежнюю команду python -m app.schema или app.backup
+
+    Имя команды заменяется задачей maintenance по словарю tasks, остальные
+    аргументы передаются как есть: python -m app.schema ensure-indexes -
+    то же, что python -m app.cli maintenance indexes.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    for index, argument in enumerate(argv):
+        if argument in tasks:
+            argv[index] = tasks[argument]
+            break
+    return main(['maintenance', *argv])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Колоночный кэш загруженных студентов
+
+Строки хранятся не списком словарей, а по колонкам: годы и ID - в
+типизированных массивах NumPy, строки - словарным кодированием (массив
+целых кодов + список уникальных значений). Фильтрация превращается в
+сравнение массивов кодов (маска), а сортировка по нескольким ключам -
+в один вызов np.lexsort, без Python-колбэков на каждую строку.
+"""
+
+import numpy as np
+
+INT_COLUMNS = {
+    'id': np.int64,
+    'birth_year': np.int16,
+    'admission_year': np.int16,
+}
+STRING_COLUMNS = (
+    'last_name', 'initials', 'group_name', 'city_before',
+    'department_code', 'department_name', 'institute_code', 'institute_name',
+)
+
+
+def collation_key(value):
+    """Ключ сортировки строк: без учёта регистра, ё как е"""
+    if value is None:
+        return ''
+    return value.casefold().replace('ё', 'е')
+
+
+class StringColumn:
+    """Строковая колонка со словарным кодированием"""
+
+    def __init__(self):
+        self.codes = np.empty(0, dtype=np.int32)
+        self.values = []        # код -> значение
+        self.lookup = {}        # значение -> код
+        self._ranks = None      # код -> позиция значения в алфавитном порядке
+
+    def encode(self, values):
+        """Кодирует значения, пополняя словарь"""
+        lookup = self.lookup
+        codes = np.empty(len(values), dtype=np.int32)
+        for index, value in enumerate(values):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(self.values)
+                self.values.append(value)
+                self._ranks = None
+            codes[index] = code
+        return codes
+
+    def ranks(self):
+        """Массив рангов кодов для сортировки (пересчитывается при росте словаря)"""
+        if self._ranks is None or len(self._ranks) != len(self.values):
+            order = sorted(range(len(self.values)), key=lambda code: collation_key(self.values[code]))
+            ranks = np.empty(len(self.values), dtype=np.int32)
+            ranks[order] = np.arange(len(self.values), dtype=np.int32)
+            self._ranks = ranks
+        return self._ranks
+
+
+class ColumnStore:
+    """Колоночное хранилище строк с векторной фильтрацией и сортировкой"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Удаляет все строки и словари"""
+        self.ints = {name: np.empty(0, dtype=dtype) for name, dtype in INT_COLUMNS.items()}
+        self.strings = {name: StringColumn() for name in STRING_COLUMNS}
+
+    def __len__(self):
+        return len(self.ints['id'])
+
+    @property
+    def columns(self):
+        return tuple(INT_COLUMNS) + STRING_COLUMNS
+
+    def extend(self, rows):
+        """
+        Добавляет строки в конец хранилища
+
+        Args:
+            rows: список словарей (как возвращает Database)
+        """
+        if not rows:
+            return
+
+        for name, dtype in INT_COLUMNS.items():
+            values = np.fromiter((row.get(name) or 0 for row in rows), dtype=dtype, count=len(rows))
+            self.ints[name] = np.concatenate([self.ints[name], values])
+
+        for name, column in self.strings.items():
+            codes = column.encode([row.get(name) for row in rows])
+            column.codes = np.concatenate([column.codes, codes])
+
+    def value(self, index, name):
+        """Возвращает значение колонки для строки хранилища"""
+        if name in self.ints:
+            return int(self.ints[name][index])
+        column = self.strings[name]
+        return column.values[column.codes[index]]
+
+    def row(self, index):
+        """Возвращает строку хранилища как словарь"""
+        return {name: self.value(index, name) for name in self.columns}
+
+    def positions_of_ids(self, ids):
+        """Возвращает позиции строк с указанными ID"""
+        return np.flatnonzero(np.isin(self.ints['id'], np.fromiter(ids, dtype=np.int64)))
+
+    def remove_ids(self, ids):
+        """Удаляет строки с указанными ID"""
+        keep = ~np.isin(self.ints['id'], np.fromiter(ids, dtype=np.int64))
+        for name in self.ints:
+            self.ints[name] = self.ints[name][keep]
+        for column in self.strings.values():
+            column.codes = column.codes[keep]
+
+    def update_ids(self, ids, values):
+        """
+        Записывает одинаковые значения в строки с указанными ID
+
+        Args:
+            ids: ID строк
+            values: словарь {колонка: новое значение}
+        """
+        positions = self.positions_of_ids(ids)
+        for name, value in values.items():
+            if name in self.ints:
+                self.ints[name][positions] = value
+            elif name in self.strings:
+                column = self.strings[name]
+                column.codes[positions] = column.encode([value])[0]
+
+    def distinct(self, name):
+        """Возвращает отсортированные уникальные значения колонки"""
+        if name in self.ints:
+            return [int(value) for value in np.unique(self.ints[name])]
+        column = self.strings[name]
+        used = np.unique(column.codes)
+        return sorted((column.values[code] for code in used), key=collation_key)
+
+    def mask(self, filters):
+        """
+        Строит булеву маску строк по фильтрам на равенство
+
+        Args:
+            filters: словарь {колонка: значение}; None - фильтр не задан
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for name, value in (filters or {}).items():
+            if value is None:
+                continue
+            if name in self.ints:
+                mask &= self.ints[name] == int(value)
+            else:
+                column = self.strings[name]
+                code = column.lookup.get(value)
+                if code is None:
+                    mask[:] = False
+                else:
+                    mask &= column.codes == code
+        return mask
+
+    def sort_keys(self, name):
+        """Возвращает массив, упорядочивающий строки по колонке"""
+        if name in self.ints:
+            return self.ints[name]
+        column = self.strings[name]
+        return column.ranks()[column.codes]
+
+    def select(self, filters=None, sort=None):
+        """
+        Возвращает позиции строк для отображения
+
+        Args:
+            filters: словарь фильтров (см. mask)
+            sort: список пар (колонка, по_убыванию), первая пара - главный ключ
+
+        Returns:
+            np.ndarray: позиции строк хранилища в порядке отображения
+        """
+        positions = np.flatnonzero(self.mask(filters))
+        if not sort or len(positions) == 0:
+            return positions
+
+        # np.lexsort сортирует по последнему ключу в первую очередь;
+        # ID как самый младший ключ делает порядок детерминированным
+        keys = [self.ints['id'][positions]]
+        for name, descending in reversed(sort):
+            key = self.sort_keys(name)[positions].astype(np.int64)
+            keys.append(-key if descending else key)
+        return positions[np.lexsort(keys)]
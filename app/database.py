@@ -1,46 +1,394 @@
 # app/database.py
 import psycopg2
+import psycopg2.errors
 from psycopg2 import sql
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from app.encryption import AesGcmBackend
+from app.query_cache import query_literals, query_text, referenced_tables, is_write
+from contextlib import contextmanager
 import logging
+import random
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Повтор запроса при обрыве соединения: число попыток и первая пауза, с
+# (каждая следующая пауза вдвое длиннее)
+RETRY_ATTEMPTS = 3
+RETRY_DELAY = 0.2
+# SQLSTATE, после которых запрос имеет смысл повторить на новом соединении:
+# класс 08 (ошибки соединения) и остановка/перезапуск сервера
+TRANSIENT_SQLSTATE_PREFIXES = ('08', '57P01', '57P02', '57P03')
+
+
+class QueryInterruptedError(psycopg2.OperationalError):
+    """Запрос прерван сервером по таймауту или по просьбе пользователя"""
+
+
+class QueryTimeoutError(QueryInterruptedError):
+    """Запрос не уложился в statement_timeout"""
+
+
+class QueryCancelledError(QueryInterruptedError):
+    """Запрос отменён вызовом Database.cancel()"""
+
+
+class ConcurrentUpdateError(Exception):
+    """
+    Запись изменена (или удалена) другим оператором после того, как её прочитали
+
+    Attributes:
+        student_id: ID студента
+        current: текущая строка студента из базы (None - запись удалена)
+    """
+
+    def __init__(self, student_id, current):
+        self.student_id = student_id
+        self.current = current
+        super().__init__(f"Студент с ID {student_id} изменён другим оператором"
+                         if current is not None else f"Студент с ID {student_id} удалён")
+
+    def conflicts(self, original, changes):
+        """
+        Поля, которые изменили оба оператора, и по-разному
+
+        Поля, изменённые только другим оператором, конфликтом не считаются:
+        повторное обновление записывает лишь свои поля и их не затирает.
+        Зашифрованные поля не сравниваются - форма их не показывает.
+
+        Args:
+            original: значения полей на момент чтения записи
+            changes: свои изменённые поля
+
+        Returns:
+            dict: {поле: (своё значение, текущее значение в базе)}
+        """
+        if self.current is None:
+            return {}
+        return {
+            field: (value, self.current.get(field))
+            for field, value in changes.items()
+            if field in self.current
+            and self.current[field] != original.get(field)
+            and self.current[field] != value
+        }
+
+
+def is_transient_error(error):
+    """
+    Можно ли повторить запрос после этой ошибки
+
+    Повторяются только потери соединения: ошибки libpq без SQLSTATE
+    (обрыв сокета, сервер недоступен) и ошибки сервера из класса 08.
+    Таймаут, отмена, ошибки SQL и ограничений не повторяются.
+    """
+    if isinstance(error, psycopg2.InterfaceError):
+        return True
+    # Ошибки сервера приходят подклассами из psycopg2.errors, libpq - базовым классом
+    if type(error) is psycopg2.OperationalError:
+        return True
+    if isinstance(error, psycopg2.Error) and error.pgcode:
+        return error.pgcode.startswith(TRANSIENT_SQLSTATE_PREFIXES)
+    return False
+
 
 class Database:
     """Класс для работы с базой данных PostgreSQL"""
 
-    def __init__(self, config):
+    # Поля студента, которые можно менять через форму редактирования
+    UPDATABLE_STUDENT_FIELDS = (
+        'last_name', 'initials', 'birth_year', 'phone', 'record_book_number',
+        'admission_year', 'group_name', 'department_id', 'city_before',
+    )
+    # Поля, которые хранятся только в зашифрованном виде
+    ENCRYPTED_STUDENT_FIELDS = ['phone', 'record_book_number']
+
+    # Повторная вставка записи очереди с тем же ключом ничего не делает.
+    # Уникальный индекс включает ключ партиционирования (см. schema.queue_indexes)
+    ENTRY_KEY_CONFLICT = "ON CONFLICT (entry_key, admission_year) DO NOTHING"
+    ENTRY_KEY_TEMPLATE = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s::uuid)"
+
+    # Фильтры поиска студентов: имя фильтра -> условие WHERE.
+    # Условия сравнивают "голые" колонки без функций и приведений типов,
+    # чтобы планировщик мог отсекать партиции по admission_year
+    STUDENT_FILTERS = {
+        'admission_year': "s.admission_year = %s",
+        'admission_year_from': "s.admission_year >= %s",
+        'admission_year_to': "s.admission_year <= %s",
+        'department_id': "s.department_id = %s",
+        'department_code': "d.code = %s",
+        'institute_code': "i.code = %s",
+        'group_name': "s.group_name = %s",
+        'city_before': "s.city_before = %s",
+    }
+    # Фильтры с целочисленными значениями (приводим заранее, чтобы
+    # в запрос попадал числовой литерал)
+    INTEGER_FILTERS = ('admission_year', 'admission_year_from', 'admission_year_to', 'department_id')
+
+    # Колонки для сортировки на сервере. Для каждой есть индекс (колонка, id),
+    # см. app/schema.py, поэтому первая страница читается из индекса
+    SORT_COLUMNS = (
+        'id', 'last_name', 'initials', 'birth_year',
+        'admission_year', 'group_name', 'city_before',
+    )
+    # Колонки, сравниваемые с учётом русской сортировки
+    COLLATED_SORT_COLUMNS = ('last_name',)
+    # Колонки, допускающие NULL: сортируются по COALESCE(колонка, ''),
+    # иначе сравнение (NULL, id) > (%s, %s) даёт NULL и строки без
+    # значения выпадают из постраничного обхода
+    NULLABLE_SORT_COLUMNS = ('city_before',)
+    DEFAULT_COLLATION = 'ru-x-icu'
+
+    # Справочник кафедр для форм и фильтров
+    DEPARTMENTS_QUERY = """
+        SELECT d.id, d.code, d.name,
+               i.code as institute_code, i.name as institute_name
+        FROM departments d
+        JOIN institutes i ON d.institute_id = i.id
+        ORDER BY i.code, d.code
+    """
+
+    AES_GCM_NEEDS_BYTEA = ("Шифрование aes-gcm требует колонок bytea: примените миграцию 4 "
+                           "(python -m app.cli maintenance migrate) или задайте ENCRYPTION_BACKEND=fernet")
+
+    # Пометка ключей кэша для результатов execute_batch (значения прошли через JSON)
+    BATCH_CACHE_KEY = 'json_agg'
+
+    STUDENT_VERSION_QUERY = """
+        SELECT id, last_name, initials, birth_year, admission_year,
+               group_name, city_before, department_id, version
+        FROM students
+        WHERE id = %s
+    """
+
+    def __init__(self, config, pool=None, cache=None, replicas=None):
+        """
+        Args:
+            config: настройки подключения (config['database'])
+            pool: пул соединений (см. create_pool); если задан, connect()
+                  берёт соединение из пула, а disconnect() возвращает его
+            cache: QueryCache для результатов execute_query (None - без кэша)
+            replicas: ReplicaSet для чтения с реплик (None - всё на основном сервере)
+
+        Таймаут запросов по умолчанию берётся из config['statement_timeout']
+        (мс, 0 - без ограничения); execute_query, copy_to, iter_query и
+        transaction принимают свой timeout.
+        """
         self.config = config
+        self.pool = pool
+        self.cache = cache
+        self.replicas = replicas
+        self.statement_timeout = config.get('statement_timeout', 0)
         self.connection = None
         self.cursor = None
+        # Реплика, с которой взято текущее соединение (None - основной сервер)
+        self.replica = None
+        # Защищает self.connection от cancel() из другого потока
+        self._connection_lock = threading.Lock()
+        self._cancel_requested = threading.Event()
+        # Зашифрованные колонки уже bytea (проверяется до первого True)
+        self._encrypted_bytea = False
+
+    def clone(self):
+        """
+        Новый экземпляр с теми же настройками, пулом и кэшем
+
+        Нужен для запроса в фоновом потоке: у каждого экземпляра своё
+        текущее соединение, и cancel() прерывает только его запрос.
+        """
+        return Database(self.config, pool=self.pool, cache=self.cache, replicas=self.replicas)
+
+    @staticmethod
+    def connection_params(config):
+        """Параметры psycopg2.connect для настроек подключения"""
+        return dict(
+            host=config['host'],
+            port=config['port'],
+            database=config['name'],
+            user=config['user'],
+            password=config['password'],
+            cursor_factory=RealDictCursor  # Возвращает словари вместо кортежей
+        )
+
+    @classmethod
+    def create_pool(cls, config, minconn=1, maxconn=10):
+        """
+        Создаёт потокобезопасный пул соединений
 
-    def connect(self):
-        """Устанавливает соединение с базой данных"""
+        Экземпляры Database с этим пулом можно создавать на каждый запрос:
+        соединение не открывается заново, а берётся из пула.
+        """
+        return ThreadedConnectionPool(minconn, maxconn, **cls.connection_params(config))
+
+    def connect(self, replica=None):
+        """
+        Устанавливает соединение с базой данных
+
+        Args:
+            replica: Replica, с которой читать (None - основной сервер)
+        """
         try:
-            self.connection = psycopg2.connect(
-                host=self.config['host'],
-                port=self.config['port'],
-                database=self.config['name'],
-                user=self.config['user'],
-                password=self.config['password'],
-                cursor_factory=RealDictCursor  # Возвращает словари вместо кортежей
-            )
+            if replica is not None:
+                connection = replica.getconn()
+            elif self.pool is not None:
+                connection = self.pool.getconn()
+            else:
+                connection = psycopg2.connect(**self.connection_params(self.config))
+                logger.info("Подключение к БД %s успешно", self.config['name'])
+            with self._connection_lock:
+                self.connection = connection
+            self.replica = replica
             self.cursor = self.connection.cursor()
-            logger.info(f"Подключение к БД {self.config['name']} успешно")
             return True
         except Exception as e:
-            logger.error(f"Ошибка подключения к БД: {e}")
+            logger.error("Ошибка подключения к БД: %s", e)
             return False
 
     def disconnect(self):
-        """Закрывает соединение с базой данных"""
+        """Закрывает соединение с базой данных (или возвращает его в пул)"""
         if self.cursor:
             self.cursor.close()
-        if self.connection:
-            self.connection.close()
+        with self._connection_lock:
+            connection, self.connection = self.connection, None
+        self.cursor = None
+        replica, self.replica = self.replica, None
+        if replica is not None:
+            if connection:
+                replica.putconn(connection)
+            return
+        if self.pool is not None:
+            if connection:
+                # Закрытое соединение (обрыв связи) пул выбросит сам
+                self.pool.putconn(connection, close=bool(connection.closed))
+            return
+        if connection:
+            connection.close()
         logger.info("Соединение с БД закрыто")
 
+    def cancel(self):
+        """
+        Прерывает запрос, который сейчас выполняет этот экземпляр
+
+        Вызывается из другого потока (кнопка «Отмена»). Сервер получает
+        запрос отмены по отдельному каналу, прерванный запрос завершается
+        QueryCancelledError. Следующие запросы этого экземпляра тоже
+        завершаются QueryCancelledError, поэтому для каждой отменяемой
+        операции создаётся свой экземпляр (см. clone).
+        """
+        self._cancel_requested.set()
+        with self._connection_lock:
+            if self.connection is None or self.connection.closed:
+                return
+            try:
+                self.connection.cancel()
+                logger.info("Запрос к БД отменён пользователем")
+            except psycopg2.Error as e:
+                logger.warning("Не удалось отменить запрос: %s", e)
+
+    def _open(self, retry=True, replica=False):
+        """
+        Подключается к базе для очередного запроса
+
+        Args:
+            retry: повторять подключение с паузами, если сервер временно недоступен
+            replica: запрос только читает и может выполняться на реплике
+                     (если реплики заданы и подходящая есть)
+
+        Raises:
+            QueryCancelledError: экземпляр уже отменён
+            psycopg2.OperationalError: подключиться не удалось
+        """
+        if self._cancel_requested.is_set():
+            raise QueryCancelledError("Запрос отменён")
+
+        if replica and self.replicas is not None:
+            target = self.replicas.choose()
+            if target is not None:
+                if self.connect(target):
+                    return
+                # Реплика не отвечает - читаем с основного сервера
+                self.replicas.mark_down(target)
+
+        attempts = RETRY_ATTEMPTS if retry else 1
+        for attempt in range(1, attempts + 1):
+            if self.connect():
+                return
+            if attempt == attempts:
+                raise psycopg2.OperationalError("Нет подключения к базе данных")
+            self._retry_pause(attempt)
+
+    def _timeout_ms(self, timeout):
+        return int(self.statement_timeout if timeout is None else timeout)
+
+    def _with_timeout(self, query, timeout):
+        """
+        Добавляет к запросу SET LOCAL statement_timeout
+
+        Обе команды уходят на сервер одним сообщением, так что таймаут
+        не стоит лишнего обмена с сервером. SET LOCAL действует до конца
+        транзакции и не переходит на следующий запрос соединения из пула.
+        """
+        timeout = self._timeout_ms(timeout)
+        if not timeout:
+            return query
+        prefix = sql.SQL("SET LOCAL statement_timeout = {}; ").format(sql.Literal(timeout))
+        if isinstance(query, sql.Composable):
+            return prefix + query
+        return prefix + sql.SQL(query)
+
+    def _set_timeout(self, timeout):
+        """Задаёт statement_timeout текущей транзакции открытого соединения"""
+        timeout = self._timeout_ms(timeout)
+        if not timeout:
+            return
+        try:
+            self.cursor.execute("SELECT set_config('statement_timeout', %s, true)", (f"{timeout}ms",))
+        except Exception:
+            self._abort()
+            raise
+
+    @staticmethod
+    def _retry_pause(attempt):
+        """Пауза перед повтором: экспоненциальный рост со случайным разбросом"""
+        delay = RETRY_DELAY * 2 ** (attempt - 1)
+        time.sleep(delay * random.uniform(0.5, 1.5))
+
+    def _interrupted(self, error, timeout=None):
+        """Заменяет отмену запроса сервером на QueryTimeoutError или QueryCancelledError"""
+        if not isinstance(error, psycopg2.errors.QueryCanceled):
+            return error
+        if self._cancel_requested.is_set():
+            return QueryCancelledError("Запрос отменён")
+        return QueryTimeoutError(
+            f"Запрос выполнялся дольше {self._timeout_ms(timeout) / 1000:g} с и был остановлен")
+
+    def _note_write(self):
+        """
+        Запоминает позицию журнала основного сервера после записи
+
+        Пока реплики не воспроизведут журнал до этой позиции, чтения
+        идут на основной сервер (read-your-writes).
+        """
+        if self.replicas is None or self.replica is not None or self.connection is None:
+            return
+        try:
+            self.cursor.execute("SELECT pg_current_wal_lsn()::text as lsn")
+            self.replicas.note_write(self.cursor.fetchone()['lsn'])
+        except psycopg2.Error as e:
+            logger.warning("Не удалось получить позицию журнала: %s", e)
+
+    def _abort(self):
+        """Откатывает транзакцию и освобождает соединение после ошибки"""
+        try:
+            if self.connection and not self.connection.closed:
+                self.connection.rollback()
+        except psycopg2.Error:
+            # Соединение оборвано - откатывать нечего
+            pass
+        self.disconnect()
+
     def test_connection(self):
         """Тестирует подключение к базе данных"""
         try:
@@ -49,7 +397,7 @@ class Database:
 
             self.cursor.execute("SELECT version();")
             version = self.cursor.fetchone()
-            logger.info(f"PostgreSQL версия: {version['version']}")
+            logger.info("PostgreSQL версия: %s", version['version'])
 
             # Проверяем существование таблиц
             self.cursor.execute("""
@@ -59,13 +407,13 @@ class Database:
                 ORDER BY table_name;
             """)
             tables = self.cursor.fetchall()
-            logger.info(f"Найдено таблиц: {len(tables)}")
+            logger.info("Найдено таблиц: %s", len(tables))
 
             self.disconnect()
             return True
 
         except Exception as e:
-            logger.error(f"Ошибка тестирования подключения: {e}")
+            logger.error("Ошибка тестирования подключения: %s", e)
             return False
 
     def authenticate_user(self, username, password):
@@ -85,35 +433,298 @@ class Database:
             return None
 
         except Exception as e:
-            logger.error(f"Ошибка аутентификации: {e}")
+            logger.error("Ошибка аутентификации: %s", e)
             return None
 
-    def execute_query(self, query, params=None, fetch=True):
-        """Выполняет SQL запрос"""
+    @contextmanager
+    def transaction(self, timeout=None):
+        """
+        Выполняет несколько запросов в одной транзакции
+
+        Пример:
+            with db.transaction() as cursor:
+                cursor.execute(...)
+                cursor.execute(...)
+
+        Args:
+            timeout: statement_timeout каждого запроса, мс
+                     (None - по умолчанию, 0 - без ограничения)
+
+        Yields:
+            cursor: курсор на отдельном соединении; при выходе из блока
+            транзакция фиксируется, при исключении - откатывается
+        """
+        self._open()
+        self._set_timeout(timeout)
+
         try:
-            # Всегда создаём новое соединение для каждого запроса
-            # чтобы избежать проблем с потоками
-            self.connect()
+            yield self.cursor
+            self.connection.commit()
+            # Что менялось в блоке, неизвестно - считаем, что запись была
+            self._note_write()
+        except psycopg2.errors.QueryCanceled as e:
+            self.connection.rollback()
+            raise self._interrupted(e, timeout) from e
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            self.disconnect()
+            # Какие таблицы менялись в блоке, неизвестно - сбрасываем весь кэш
+            if self.cache is not None:
+                self.cache.clear()
 
-            self.cursor.execute(query, params or ())
+    def execute_query(self, query, params=None, fetch=True, timeout=None, replica=False):
+        """
+        Выполняет SQL запрос
 
-            if fetch and self.cursor.description:
-                result = self.cursor.fetchall()
-            else:
-                result = None
-                self.connection.commit()
+        Если у Database есть кэш, результаты чтения берутся из него, а
+        запросы на запись (fetch=False, INSERT/UPDATE/DELETE и т.п.)
+        сбрасывают закэшированные результаты затронутых таблиц.
+
+        Args:
+            timeout: statement_timeout запроса, мс
+                     (None - по умолчанию, 0 - без ограничения)
+            replica: запрос только читает и может выполняться на реплике
+
+        Raises:
+            QueryTimeoutError: запрос не уложился в timeout
+            QueryCancelledError: запрос отменён через cancel()
+        """
+        if self.cache is None:
+            return self._execute_query(query, params, fetch, timeout, replica)
 
+        text = query_text(query)
+        if not fetch or is_write(text):
+            try:
+                return self._execute_query(query, params, fetch, timeout, replica)
+            finally:
+                # Сбрасываем и при ошибке: часть изменений могла зафиксироваться
+                self.cache.invalidate(referenced_tables(text))
+
+        try:
+            key = self.cache.make_key(text, params, query_literals(query))
+            hash(key)
+        except TypeError:
+            # Параметры-списки (ANY(%s)) не хешируются - выполняем без кэша
+            return self._execute_query(query, params, fetch, timeout, replica)
+
+        found, result = self.cache.get(key)
+        if found:
             return result
 
+        result = self._execute_query(query, params, fetch, timeout, replica)
+        if result is not None:
+            self.cache.put(key, referenced_tables(text), result)
+        return result
+
+    def _execute_query(self, query, params=None, fetch=True, timeout=None, replica=False):
+        """
+        Выполняет SQL запрос на новом соединении, без кэша
+
+        При потере соединения до фиксации транзакции запрос повторяется
+        на новом соединении (RETRY_ATTEMPTS попыток с растущей паузой):
+        незафиксированные изменения откатились вместе с соединением,
+        поэтому повтор безопасен и для записи. Обрыв во время COMMIT
+        не повторяется - неизвестно, зафиксировал ли сервер изменения.
+        Если соединение оборвалось на реплике, она исключается, и повтор
+        идёт на другую реплику или основной сервер.
+        """
+        for attempt in range(1, RETRY_ATTEMPTS + 1):
+            try:
+                # Всегда создаём новое соединение для каждого запроса
+                # чтобы избежать проблем с потоками
+                self._open(retry=False, replica=replica)
+
+                self.cursor.execute(self._with_timeout(query, timeout), params or ())
+
+                if fetch and self.cursor.description:
+                    result = self.cursor.fetchall()
+                else:
+                    result = None
+
+            except Exception as e:
+                if self.replica is not None and is_transient_error(e):
+                    self.replicas.mark_down(self.replica)
+                self._abort()
+                if attempt < RETRY_ATTEMPTS and is_transient_error(e):
+                    logger.warning("Соединение с БД потеряно (попытка %s из %s): %s",
+                                   attempt, RETRY_ATTEMPTS, e)
+                    self._retry_pause(attempt)
+                    continue
+                error = self._interrupted(e, timeout)
+                logger.error("Ошибка выполнения запроса: %s", error)
+                if error is e:
+                    raise
+                raise error from e
+
+            try:
+                # Фиксируем транзакцию и для запросов с RETURNING,
+                # иначе закрытие соединения откатит изменения
+                self.connection.commit()
+                if self.replicas is not None and (not fetch or is_write(query_text(query))):
+                    self._note_write()
+                return result
+            except Exception as e:
+                logger.error("Ошибка фиксации транзакции: %s", e)
+                self._abort()
+                raise
+            finally:
+                # Всегда закрываем соединение после запроса
+                self.disconnect()
+
+    def execute_batch(self, queries, timeout=None, replica=False):
+        """
+        Выполняет несколько независимых SELECT за один обмен с сервером
+
+        psycopg2 из нескольких команд в одном execute возвращает только
+        последний результат, поэтому каждый запрос становится подзапросом
+        json_agg, и все результаты приходят одной строкой:
+
+            SELECT (SELECT coalesce(json_agg(t), '[]') FROM (запрос 1) t) as r0,
+                   (SELECT coalesce(json_agg(t), '[]') FROM (запрос 2) t) as r1
+
+        Значения проходят через JSON: числа, строки и логические не
+        меняются, даты и время приходят строками ISO 8601. Запросы,
+        результат которых есть в кэше, на сервер не отправляются. Результаты
+        пакетов кэшируются отдельно от execute_query (ключ с пометкой
+        BATCH_CACHE_KEY), чтобы тот не получил строки с типами из JSON.
+
+        Запрос с третьим элементом fresh=True читается мимо кэша и не
+        кэшируется, а весь пакет тогда идёт на основной сервер: так вместе
+        со справочниками читаются данные, которые должны быть свежими
+        (например, version редактируемой строки).
+
+        Args:
+            queries: список (запрос, параметры[, fresh]); только SELECT, без ';' в конце
+            timeout: таймаут пакета, мс (см. execute_query)
+            replica: пакет можно выполнить на реплике
+
+        Returns:
+            list: списки строк-словарей в порядке queries
+        """
+        prepared = [(query[0], tuple(query[1] or ()), len(query) > 2 and query[2])
+                    for query in queries]
+        results = [None] * len(prepared)
+        keys = [None] * len(prepared)
+        pending = []
+
+        for index, (query, params, fresh) in enumerate(prepared):
+            text = query_text(query)
+            if is_write(text):
+                raise ValueError("В пакет можно включать только запросы на чтение")
+            if fresh:
+                replica = False
+            elif self.cache is not None:
+                key = (self.BATCH_CACHE_KEY,
+                       self.cache.make_key(text, params, query_literals(query)))
+                try:
+                    hash(key)
+                except TypeError:
+                    key = None
+                if key is not None:
+                    found, rows = self.cache.get(key)
+                    if found:
+                        results[index] = rows
+                        continue
+                    keys[index] = key
+            pending.append(index)
+
+        if not pending:
+            return results
+
+        columns = []
+        params = []
+        for number, index in enumerate(pending):
+            query, query_params, _ = prepared[index]
+            if not isinstance(query, sql.Composable):
+                query = sql.SQL(query)
+            columns.append(sql.SQL("(SELECT coalesce(json_agg(t), '[]'::json) FROM ({}) t) as {}").format(
+                query, sql.Identifier(f"r{number}")))
+            params.extend(query_params)
+
+        batch = sql.SQL("SELECT ") + sql.SQL(", ").join(columns)
+        row = self._execute_query(batch, tuple(params), True, timeout, replica)[0]
+
+        for number, index in enumerate(pending):
+            rows = row[f"r{number}"]
+            results[index] = rows
+            if keys[index] is not None:
+                self.cache.put(keys[index], referenced_tables(query_text(prepared[index][0])), rows)
+        return results
+
+    def copy_to(self, query, file, params=None, options="FORMAT csv, HEADER true", timeout=None,
+                replica=True):
+        """
+        Выгружает результат запроса в файл через COPY ... TO STDOUT
+
+        Строки идут из сервера в файл потоком, без создания Python-объектов
+        на каждую строку.
+
+        Args:
+            query: SELECT-запрос (строка или sql.Composable)
+            file: файл, открытый на запись в двоичном режиме
+            params: параметры запроса
+            options: параметры COPY (формат, заголовок и т.п.)
+            timeout: statement_timeout выгрузки, мс
+                     (None - по умолчанию, 0 - без ограничения)
+            replica: выгружать с реплики, если она есть
+
+        Returns:
+            int: количество выгруженных строк
+        """
+        self._open(replica=replica)
+        self._set_timeout(timeout)
+
+        try:
+            # COPY не принимает параметры, поэтому подставляем их заранее
+            encoding = psycopg2.extensions.encodings[self.connection.encoding]
+            select = self.cursor.mogrify(query, params or ()).decode(encoding)
+            copy = sql.SQL("COPY ({}) TO STDOUT WITH ({})").format(
+                sql.SQL(select), sql.SQL(options)
+            )
+            self.cursor.copy_expert(copy, file)
+            rows = self.cursor.rowcount
+            self.connection.rollback()
+            return rows
+
         except Exception as e:
-            logger.error(f"Ошибка выполнения запроса: {e}")
-            if self.connection:
-                self.connection.rollback()
-            raise
+            error = self._interrupted(e, timeout)
+            logger.error("Ошибка выгрузки COPY: %s", error)
+            self._abort()
+            if error is e:
+                raise
+            raise error from e
         finally:
-            # Всегда закрываем соединение после запроса
             self.disconnect()
 
+    def iter_query(self, query, params=None, itersize=2000, timeout=None, replica=True):
+        """
+        Перебирает строки результата, не загружая его целиком в память
+
+        Используется серверный (именованный) курсор: строки приходят
+        пачками по itersize. Соединение занято, пока генератор не исчерпан
+        или не закрыт. timeout ограничивает каждую выборку пачки отдельно.
+        Запрос выполняется на реплике, если она есть (replica=False - на
+        основном сервере).
+
+        Yields:
+            dict: строки результата
+        """
+        self._open(replica=replica)
+        self._set_timeout(timeout)
+
+        try:
+            cursor = self.connection.cursor(name='stream')
+            cursor.itersize = itersize
+            cursor.execute(query, params or ())
+            yield from cursor
+            cursor.close()
+        except psycopg2.errors.QueryCanceled as e:
+            raise self._interrupted(e, timeout) from e
+        finally:
+            self._abort()
+
     def get_students(self, limit=100):
         """Получает список студентов"""
         query = """
@@ -135,7 +746,217 @@ class Database:
             ORDER BY s.last_name 
             LIMIT %s
         """
-        return self.execute_query(query, (limit,))
+        return self.execute_query(query, (limit,), replica=True)
+
+    def build_student_filters(self, filters):
+        """
+        Строит условие WHERE для поиска студентов
+
+        Args:
+            filters: словарь {имя_фильтра: значение}, см. STUDENT_FILTERS;
+                     пустые значения пропускаются
+
+        Returns:
+            tuple: (строка условия, список параметров)
+        """
+        conditions = []
+        params = []
+
+        for name, value in (filters or {}).items():
+            if value is None or value == '':
+                continue
+            if name not in self.STUDENT_FILTERS:
+                raise ValueError(f"Неизвестный фильтр: {name}")
+            if name in self.INTEGER_FILTERS:
+                value = int(value)
+            conditions.append(self.STUDENT_FILTERS[name])
+            params.append(value)
+
+        where = " AND ".join(conditions) if conditions else "TRUE"
+        return where, params
+
+    def sort_expression(self, sort_by):
+        """Возвращает SQL-выражение колонки сортировки (с нужной collation)"""
+        if sort_by not in self.SORT_COLUMNS:
+            raise ValueError(f"Сортировка по колонке {sort_by} не поддерживается")
+        if sort_by in self.COLLATED_SORT_COLUMNS:
+            collation = self.config.get('collation', self.DEFAULT_COLLATION)
+            return sql.SQL("s.{} COLLATE {}").format(sql.Identifier(sort_by), sql.Identifier(collation))
+        if sort_by in self.NULLABLE_SORT_COLUMNS:
+            return sql.SQL("COALESCE(s.{}, '')").format(sql.Identifier(sort_by))
+        return sql.SQL("s.{}").format(sql.Identifier(sort_by))
+
+    def get_students_page(self, sort_by='last_name', descending=False, after=None,
+                          limit=100, filters=None, timeout=None):
+        """
+        Получает страницу студентов с сортировкой на сервере
+
+        Используется keyset-пагинация: следующая страница начинается строго
+        после последней строки предыдущей, поэтому база не пересчитывает
+        пропущенные строки, как при OFFSET, а продолжает обход индекса.
+
+        Args:
+            sort_by: колонка сортировки (см. SORT_COLUMNS)
+            descending: сортировка по убыванию
+            after: (значение колонки сортировки, id) последней строки
+                   предыдущей страницы или None для первой страницы;
+                   значение None колонки из NULLABLE_SORT_COLUMNS - пустая строка
+            limit: размер страницы
+            filters: словарь фильтров (см. STUDENT_FILTERS)
+            timeout: таймаут запроса, мс (см. execute_query)
+
+        Returns:
+            list: студенты страницы
+        """
+        expression = self.sort_expression(sort_by)
+        where, params = self.build_student_filters(filters)
+        conditions = [sql.SQL(where)]
+        direction = sql.SQL("DESC" if descending else "ASC")
+
+        if after is not None:
+            value, student_id = after
+            if value is None and sort_by in self.NULLABLE_SORT_COLUMNS:
+                value = ''
+            conditions.append(sql.SQL("({}, s.id) {} (%s, %s)").format(
+                expression, sql.SQL("<" if descending else ">")))
+            params.extend((value, student_id))
+
+        query = sql.SQL("""
+            SELECT 
+                s.id,
+                s.last_name,
+                s.initials,
+                s.birth_year,
+                s.admission_year,
+                s.group_name,
+                s.city_before,
+                d.code as department_code,
+                d.name as department_name,
+                i.code as institute_code,
+                i.name as institute_name
+            FROM students s
+            JOIN departments d ON s.department_id = d.id
+            JOIN institutes i ON d.institute_id = i.id
+            WHERE {where}
+            ORDER BY {expression} {direction}, s.id {direction}
+            LIMIT %s
+        """).format(
+            where=sql.SQL(" AND ").join(conditions),
+            expression=expression,
+            direction=direction,
+        )
+        params.append(limit)
+        return self.execute_query(query, tuple(params), timeout=timeout, replica=True)
+
+    def search_students(self, filters, limit=100, timeout=None):
+        """
+        Ищет студентов по фильтрам
+
+        Args:
+            filters: словарь фильтров (см. STUDENT_FILTERS)
+            limit: максимальное количество записей
+            timeout: таймаут запроса, мс (см. execute_query)
+
+        Returns:
+            list: найденные студенты
+        """
+        return self.get_students_page(filters=filters, limit=limit, timeout=timeout)
+
+    def count_students(self, filters=None):
+        """Считает студентов, подходящих под фильтры"""
+        where, params = self.build_student_filters(filters)
+        query = f"""
+            SELECT COUNT(*) as count
+            FROM students s
+            JOIN departments d ON s.department_id = d.id
+            JOIN institutes i ON d.institute_id = i.id
+            WHERE {where}
+        """
+        result = self.execute_query(query, tuple(params), replica=True)
+        return result[0]['count'] if result else 0
+
+    def student_tree_counts(self, filters=None, timeout=None):
+        """
+        Количество студентов по кафедрам - верхние уровни дерева одним запросом
+
+        Счётчики институтов складываются из строк их кафедр на клиенте.
+
+        Returns:
+            list: строки {institute_id, institute_code, institute_name,
+                  department_id, department_code, department_name, count}
+                  в порядке институтов и кафедр
+        """
+        where, params = self.build_student_filters(filters)
+        query = f"""
+            SELECT i.id as institute_id, i.code as institute_code, i.name as institute_name,
+                   d.id as department_id, d.code as department_code, d.name as department_name,
+                   COUNT(*) as count
+            FROM students s
+            JOIN departments d ON s.department_id = d.id
+            JOIN institutes i ON d.institute_id = i.id
+            WHERE {where}
+            GROUP BY i.id, i.code, i.name, d.id, d.code, d.name
+            ORDER BY i.code, d.code
+        """
+        return self.execute_query(query, tuple(params), timeout=timeout, replica=True)
+
+    def student_group_counts(self, department_id, filters=None, timeout=None):
+        """
+        Группы кафедры с количеством студентов (раскрытие кафедры в дереве)
+
+        Returns:
+            list: строки {group_name, count} по алфавиту групп
+        """
+        filters = dict(filters or {}, department_id=department_id)
+        where, params = self.build_student_filters(filters)
+        query = f"""
+            SELECT s.group_name, COUNT(*) as count
+            FROM students s
+            JOIN departments d ON s.department_id = d.id
+            JOIN institutes i ON d.institute_id = i.id
+            WHERE {where}
+            GROUP BY s.group_name
+            ORDER BY s.group_name
+        """
+        return self.execute_query(query, tuple(params), timeout=timeout, replica=True)
+
+    def student_stats(self, filters=None):
+        """
+        Считает студентов по годам поступления и институтам
+
+        Returns:
+            dict: {'total': N, 'by_year': [{admission_year, count}],
+                   'by_institute': [{code, name, count}]}
+        """
+        where, params = self.build_student_filters(filters)
+        joins = """
+            FROM students s
+            JOIN departments d ON s.department_id = d.id
+            JOIN institutes i ON d.institute_id = i.id
+        """
+
+        by_year, by_institute = self.execute_batch([
+            (f"""
+                SELECT s.admission_year, COUNT(*) as count
+                {joins}
+                WHERE {where}
+                GROUP BY s.admission_year
+                ORDER BY s.admission_year
+            """, params),
+            (f"""
+                SELECT i.code, i.name, COUNT(*) as count
+                {joins}
+                WHERE {where}
+                GROUP BY i.code, i.name
+                ORDER BY i.code
+            """, params),
+        ], replica=True)
+
+        return {
+            'total': sum(row['count'] for row in by_year),
+            'by_year': by_year,
+            'by_institute': by_institute,
+        }
 
     def add_student(self, student_data):
         """Добавляет нового студента"""
@@ -153,8 +974,8 @@ class Database:
         """Добавляет студента с шифрованием данных"""
         try:
             # Шифруем конфиденциальные поля
-            fields_to_encrypt = ['phone', 'record_book_number']
-            encrypted_data = encryptor.encrypt_fields(student_data, fields_to_encrypt)
+            self.check_encryptor(encryptor)
+            encrypted_data = encryptor.encrypt_fields(student_data, self.ENCRYPTED_STUDENT_FIELDS)
 
             query = """
                 INSERT INTO students 
@@ -181,46 +1002,453 @@ class Database:
             result = self.execute_query(query, params, fetch=True)
 
             if result:
-                logger.info(f"Добавлен студент с ID {result[0]['id']}")
+                logger.info("Добавлен студент с ID %s", result[0]['id'])
                 return result[0]['id']
             return None
 
         except Exception as e:
-            logger.error(f"Ошибка добавления студента: {e}")
+            logger.error("Ошибка добавления студента: %s", e)
             raise
 
-    def update_student_with_encryption(self, student_id, student_data, encryptor):
-        """Обновляет данные студента с шифрованием"""
+    def add_students_with_encryption(self, students, encryptor, created_by=1, keys=None):
+        """
+        Добавляет пачку студентов одним запросом в одной транзакции
+
+        Args:
+            students: список словарей с полями студента (как у add_student_with_encryption)
+            encryptor: шифратор для телефона и номера зачётки
+            created_by: ID пользователя, добавившего записи
+            keys: ключи идемпотентности записей (uuid, см. app/write_queue.py);
+                  запись с уже вставленным ключом не задваивается, а
+                  возвращается ID вставленной ранее
+
+        Returns:
+            list: ID добавленных студентов в порядке входного списка
+        """
+        if not students:
+            return []
+
+        self.check_encryptor(encryptor)
+        rows = [self._student_row(student, encryptor, created_by) for student in students]
+
+        with self.transaction() as cursor:
+            if keys is None:
+                result = execute_values(cursor, """
+                    INSERT INTO students
+                    (last_name, initials, birth_year, phone_encrypted,
+                     record_book_number_encrypted, admission_year, group_name,
+                     department_id, city_before, created_by)
+                    VALUES %s
+                    RETURNING id
+                """, rows, page_size=len(rows), fetch=True)
+                ids = [row['id'] for row in result]
+            else:
+                execute_values(cursor, f"""
+                    INSERT INTO students
+                    (last_name, initials, birth_year, phone_encrypted,
+                     record_book_number_encrypted, admission_year, group_name,
+                     department_id, city_before, created_by, entry_key)
+                    VALUES %s
+                    {self.ENTRY_KEY_CONFLICT}
+                """, [row + (self._entry_key(key),) for row, key in zip(rows, keys)],
+                    template=self.ENTRY_KEY_TEMPLATE, page_size=len(rows))
+                by_key = self._ids_by_entry_key(cursor, keys)
+                ids = [by_key[self._entry_key(key)] for key in keys]
+
+        logger.info("Добавлено студентов пакетом: %s", len(ids))
+        return ids
+
+    @staticmethod
+    def _entry_key(key):
+        """Ключ в одном виде для Python и PostgreSQL (32 шестнадцатеричные цифры)"""
+        return str(key).replace('-', '').lower()
+
+    def _ids_by_entry_key(self, cursor, keys):
+        """ID студентов, вставленных с ключами keys (в том числе раньше)"""
+        cursor.execute("""
+            SELECT id, entry_key::text as entry_key FROM students
+            WHERE entry_key = ANY(%s::uuid[])
+        """, ([self._entry_key(key) for key in keys],))
+        return {self._entry_key(row['entry_key']): row['id'] for row in cursor.fetchall()}
+
+    def add_students_with_savepoints(self, students, encryptor, created_by=1, keys=None):
+        """
+        Добавляет студентов по одному в одной транзакции, изолируя ошибки записей
+
+        Запасной путь для пакета, который add_students_with_encryption не
+        смогла вставить целиком: каждая вставка идёт под своей точкой
+        сохранения, и нарушение ограничения или неверное значение
+        откатывает только свою запись.
+
+        Args:
+            keys: ключи идемпотентности (см. add_students_with_encryption)
+
+        Returns:
+            list: для каждой записи (id, None) или (None, текст ошибки)
+        """
+        self.check_encryptor(encryptor)
+        results = []
+        keys = keys if keys is not None else [None] * len(students)
+
+        with self.transaction() as cursor:
+            for student, key in zip(students, keys):
+                try:
+                    row = self._student_row(student, encryptor, created_by)
+                except (KeyError, ValueError, TypeError) as e:
+                    results.append((None, f"Неполные данные: {e}"))
+                    continue
+
+                cursor.execute("SAVEPOINT student_row")
+                try:
+                    if key is None:
+                        cursor.execute("""
+                            INSERT INTO students
+                            (last_name, initials, birth_year, phone_encrypted,
+                             record_book_number_encrypted, admission_year, group_name,
+                             department_id, city_before, created_by)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                            RETURNING id
+                        """, row)
+                        student_id = cursor.fetchone()['id']
+                    else:
+                        cursor.execute(f"""
+                            INSERT INTO students
+                            (last_name, initials, birth_year, phone_encrypted,
+                             record_book_number_encrypted, admission_year, group_name,
+                             department_id, city_before, created_by, entry_key)
+                            VALUES {self.ENTRY_KEY_TEMPLATE}
+                            {self.ENTRY_KEY_CONFLICT}
+                        """, row + (self._entry_key(key),))
+                        student_id = self._ids_by_entry_key(cursor, [key])[self._entry_key(key)]
+                except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT student_row")
+                    results.append((None, (e.diag.message_primary or str(e)).strip()))
+                else:
+                    cursor.execute("RELEASE SAVEPOINT student_row")
+                    results.append((student_id, None))
+
+        logger.info("Добавлено студентов по одному: %s из %s",
+                    sum(1 for student_id, _ in results if student_id), len(students))
+        return results
+
+    def _student_row(self, student, encryptor, created_by):
+        """Параметры INSERT INTO students для одной записи (с шифрованием)"""
+        encrypted = encryptor.encrypt_fields(student, self.ENCRYPTED_STUDENT_FIELDS)
+        return (
+            encrypted['last_name'],
+            encrypted['initials'],
+            encrypted['birth_year'],
+            encrypted.get('phone_encrypted'),
+            encrypted.get('record_book_number_encrypted'),
+            encrypted['admission_year'],
+            encrypted['group_name'],
+            encrypted['department_id'],
+            encrypted['city_before'],
+            created_by,
+        )
+
+    def encrypted_columns_are_bytea(self):
+        """
+        Зашифрованные колонки students уже bytea (миграция 4 применена)
+
+        Читается с основного сервера мимо кэша; положительный ответ
+        запоминается - обратно миграция не откатывается.
+        """
+        if self._encrypted_bytea:
+            return True
+        columns = [f"{field}_encrypted" for field in self.ENCRYPTED_STUDENT_FIELDS]
+        types = self._execute_query("""
+            SELECT column_name, data_type FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = 'students' AND column_name = ANY(%s)
+        """, (columns,))
+        self._encrypted_bytea = bool(types) and all(row['data_type'] == 'bytea' for row in types)
+        return self._encrypted_bytea
+
+    def check_encryptor(self, encryptor):
+        """
+        Проверяет, что значения encryptor можно записать в колонки students
+
+        aes-gcm даёт байты: в колонке TEXT они сохранились бы строкой
+        '\\x...', которую уже не расшифровать, поэтому до миграции 4
+        запись таким шифратором запрещена.
+
+        Raises:
+            RuntimeError: шифратор aes-gcm, а колонки ещё TEXT
+        """
+        if encryptor.backend.name == AesGcmBackend.name and not self.encrypted_columns_are_bytea():
+            raise RuntimeError(self.AES_GCM_NEEDS_BYTEA)
+
+    def reencrypt_students(self, encryptor, batch_size=1000):
+        """
+        Перешифровывает телефоны и номера зачёток алгоритмом encryptor
+
+        Таблица обходится пачками по id, каждая пачка - отдельная
+        транзакция, поэтому прерванный проход можно запустить снова.
+        Значения, уже записанные нужным алгоритмом, не трогаются.
+        Нужны колонки bytea (миграция 4).
+
+        Returns:
+            int: количество перешифрованных записей
+        """
+        if not self.encrypted_columns_are_bytea():
+            raise RuntimeError("Зашифрованные колонки ещё не bytea - примените миграцию 4")
+        columns = [f"{field}_encrypted" for field in self.ENCRYPTED_STUDENT_FIELDS]
+
+        select = sql.SQL("""
+            SELECT id, {columns} FROM students
+            WHERE id > %s ORDER BY id LIMIT %s
+            FOR UPDATE
+        """).format(columns=sql.SQL(', ').join(map(sql.Identifier, columns)))
+        update = sql.SQL("""
+            UPDATE students s SET {assignments}
+            FROM (VALUES %s) v(id, {columns})
+            WHERE s.id = v.id
+        """).format(
+            assignments=sql.SQL(', ').join(
+                sql.SQL("{0} = v.{0}").format(sql.Identifier(column)) for column in columns),
+            columns=sql.SQL(', ').join(map(sql.Identifier, columns)),
+        )
+        template = "(%s" + ", %s::bytea" * len(columns) + ")"
+
+        last_id = 0
+        updated = 0
+        while True:
+            with self.transaction(timeout=0) as cursor:
+                cursor.execute(select, (last_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1]['id']
+
+                changes = []
+                for row in rows:
+                    values = [row[column] for column in columns]
+                    if not any(encryptor.needs_reencryption(value) for value in values):
+                        continue
+                    plaintexts = [encryptor.decrypt(value) if value else None for value in values]
+                    if any(value and plain is None for value, plain in zip(values, plaintexts)):
+                        logger.warning("Студент %s: не удалось расшифровать, пропущен", row['id'])
+                        continue
+                    encrypted = [encryptor.encrypt(plain) if plain is not None else None
+                                 for plain in plaintexts]
+                    changes.append((row['id'], *[
+                        value.encode('ascii') if isinstance(value, str) else value
+                        for value in encrypted
+                    ]))
+
+                if changes:
+                    execute_values(cursor, update, changes, template=template, page_size=len(changes))
+                    updated += len(changes)
+
+            logger.info("Перешифровано %s записей, последний id %s", updated, last_id)
+
+        return updated
+
+    def update_student_with_encryption(self, student_id, student_data, encryptor, version=None):
+        """
+        Обновляет данные студента с шифрованием
+
+        Записываются только переданные поля: телефон и номер зачётки
+        шифруются заново лишь если пришли новые значения, иначе
+        существующий шифротекст в БД остаётся нетронутым.
+
+        Оптимистичная блокировка: если передана version (колонка version,
+        прочитанная вместе с записью), UPDATE проходит только при
+        неизменной версии. Каждое обновление увеличивает version, поэтому
+        правка другого оператора между чтением и записью даёт
+        ConcurrentUpdateError вместо молчаливой перезаписи.
+
+        Args:
+            student_id: ID студента
+            student_data: словарь изменённых полей
+            encryptor: экземпляр DataEncryptor
+            version: версия записи на момент чтения (None - без проверки)
+
+        Returns:
+            bool: True, если запись обновлена (или изменений нет)
+
+        Raises:
+            ConcurrentUpdateError: запись изменена или удалена после чтения
+        """
         try:
-            # Шифруем конфиденциальные поля, если они предоставлены
-            fields_to_encrypt = ['phone', 'record_book_number']
-            encrypted_data = encryptor.encrypt_fields(student_data, fields_to_encrypt)
+            # Пустые конфиденциальные поля не шифруем и не перезаписываем
+            changes = {
+                field: value for field, value in student_data.items()
+                if field in self.UPDATABLE_STUDENT_FIELDS
+                and not (field in self.ENCRYPTED_STUDENT_FIELDS and not value)
+            }
 
-            # Строим динамический запрос
-            set_parts = []
-            params = []
+            if not changes:
+                logger.info("Студент с ID %s: изменений нет", student_id)
+                return True
 
-            for field, value in encrypted_data.items():
-                if field != 'id':
-                    set_parts.append(f"{field} = %s")
-                    params.append(value)
+            # Шифруем только те конфиденциальные поля, что реально изменились
+            if any(field in changes for field in self.ENCRYPTED_STUDENT_FIELDS):
+                self.check_encryptor(encryptor)
+            encrypted_data = encryptor.encrypt_fields(changes, self.ENCRYPTED_STUDENT_FIELDS)
 
+            set_parts = [
+                sql.SQL("{} = %s").format(sql.Identifier(field))
+                for field in encrypted_data
+            ]
+            params = list(encrypted_data.values())
             params.append(student_id)
+            condition = sql.SQL("id = %s")
+            if version is not None:
+                condition = sql.SQL("id = %s AND version = %s")
+                params.append(version)
 
-            query = f"""
+            query = sql.SQL("""
                 UPDATE students 
-                SET {', '.join(set_parts)}, updated_at = CURRENT_TIMESTAMP
-                WHERE id = %s
-                RETURNING id
-            """
+                SET {}, updated_at = CURRENT_TIMESTAMP, version = version + 1
+                WHERE {}
+                RETURNING id, version
+            """).format(sql.SQL(', ').join(set_parts), condition)
 
             result = self.execute_query(query, tuple(params), fetch=True)
 
             if result:
-                logger.info(f"Обновлён студент с ID {student_id}")
+                logger.info("Обновлён студент с ID %s: %s", student_id, ', '.join(encrypted_data))
                 return True
+            if version is not None:
+                raise ConcurrentUpdateError(student_id, self.get_student_version(student_id))
             return False
 
+        except ConcurrentUpdateError as e:
+            logger.warning("%s (прочитана версия %s)", e, version)
+            raise
         except Exception as e:
-            logger.error(f"Ошибка обновления студента: {e}")
-            raise
\ No newline at end of file
+            logger.error("Ошибка обновления студента: %s", e)
+            raise
+
+    def get_student_version(self, student_id):
+        """
+        Текущие поля формы и версия студента с основного сервера
+
+        Читается мимо кэша и реплик: устаревшая версия дала бы ложный
+        конфликт при сохранении (см. update_student_with_encryption).
+
+        Returns:
+            dict или None, если студента нет
+        """
+        result = self._execute_query(self.STUDENT_VERSION_QUERY, (student_id,))
+        return result[0] if result else None
+
+    def get_student_for_edit(self, student_id):
+        """
+        Данные формы редактирования одним обменом с сервером
+
+        Строка студента с version читается как в get_student_version - с
+        основного сервера мимо кэша; список кафедр берётся из кэша, если он
+        там есть, иначе идёт в тот же пакет.
+
+        Returns:
+            tuple: (строка студента или None, список кафедр)
+        """
+        rows, departments = self.execute_batch([
+            (self.STUDENT_VERSION_QUERY, (student_id,), True),
+            (self.DEPARTMENTS_QUERY, None),
+        ])
+        return (rows[0] if rows else None), departments
+
+    def get_phones(self, student_ids, timeout=None):
+        """
+        Зашифрованные телефоны студентов для показа по запросу
+
+        Args:
+            student_ids: ID студентов (видимые строки таблицы)
+
+        Returns:
+            list: строки {id, phone_encrypted}; phone_encrypted - str (TEXT)
+                  или memoryview (bytea), см. DataEncryptor.decrypt
+        """
+        student_ids = list(student_ids)
+        if not student_ids:
+            return []
+        return self.execute_query(
+            "SELECT id, phone_encrypted FROM students WHERE id = ANY(%s)",
+            (student_ids,), timeout=timeout, replica=True)
+
+    def get_departments(self):
+        """Получает список кафедр с институтами"""
+        return self.execute_query(self.DEPARTMENTS_QUERY, replica=True)
+
+    def delete_students(self, student_ids):
+        """
+        Удаляет группу студентов одним запросом
+
+        Args:
+            student_ids: список ID студентов
+
+        Returns:
+            list: ID действительно удалённых студентов
+        """
+        student_ids = list(student_ids)
+        if not student_ids:
+            return []
+
+        query = "DELETE FROM students WHERE id = ANY(%s) RETURNING id"
+        result = self.execute_query(query, (student_ids,))
+        deleted = [row['id'] for row in result or []]
+        logger.info("Удалено студентов: %s", len(deleted))
+        return deleted
+
+    def move_students(self, student_ids, group_name=None, department_id=None):
+        """
+        Переводит группу студентов в другую группу и/или на другую кафедру
+
+        Args:
+            student_ids: список ID студентов
+            group_name: новая группа (None - не менять)
+            department_id: новая кафедра (None - не менять)
+
+        Returns:
+            list: ID обновлённых студентов
+        """
+        values = {}
+        if group_name is not None:
+            values['group_name'] = group_name
+        if department_id is not None:
+            values['department_id'] = department_id
+        return self._update_students_batch(student_ids, values)
+
+    def set_admission_year(self, student_ids, admission_year):
+        """
+        Меняет год поступления у группы студентов
+
+        Args:
+            student_ids: список ID студентов
+            admission_year: новый год поступления
+
+        Returns:
+            list: ID обновлённых студентов
+        """
+        return self._update_students_batch(student_ids, {'admission_year': admission_year})
+
+    def _update_students_batch(self, student_ids, values):
+        """
+        Обновляет одинаковые значения у набора студентов одним UPDATE
+
+        Версия строк увеличивается, чтобы открытые формы этих студентов
+        получили конфликт, а не перезаписали групповое изменение.
+        """
+        student_ids = list(student_ids)
+        if not student_ids or not values:
+            return []
+
+        set_parts = [
+            sql.SQL("{} = %s").format(sql.Identifier(field))
+            for field in values
+        ]
+        query = sql.SQL("""
+            UPDATE students
+            SET {}, updated_at = CURRENT_TIMESTAMP, version = version + 1
+            WHERE id = ANY(%s)
+            RETURNING id
+        """).format(sql.SQL(', ').join(set_parts))
+
+        params = tuple(values.values()) + (student_ids,)
+        result = self.execute_query(query, params)
+        updated = [row['id'] for row in result or []]
+        logger.info("Групповое обновление %s: %s студентов", ', '.join(values), len(updated))
+        return updated
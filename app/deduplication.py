@@ -0,0 +1,203 @@
+"""
+Поиск дубликатов студентов
+
+Попарное сравнение всех записей - O(n²) и на 200 тысячах строк
+неприменимо, поэтому используются блокирующие ключи и хеширование:
+
+* точные дубликаты - записи с одинаковым нормализованным ключом
+  (фамилия, инициалы, год рождения, группа) попадают в одну корзину словаря;
+* нечёткие дубликаты - внутри блока (инициалы, год рождения, группа)
+  фамилии индексируются по всем вариантам с одной удалённой буквой
+  (symmetric delete). Кандидатами становятся только фамилии с общим
+  вариантом, и лишь они проверяются расстоянием Дамерау-Левенштейна.
+"""
+
+import logging
+import time
+from collections import defaultdict
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+MAX_DISTANCE = 1
+
+
+class DuplicateGroup(NamedTuple):
+    """Группа предполагаемых дубликатов"""
+    kind: str           # 'exact' или 'fuzzy'
+    student_ids: list
+    description: str
+
+
+def normalize_name(value):
+    """Нормализует фамилию для сравнения: регистр, ё/е, пробелы и дефисы"""
+    return (value or '').casefold().replace('ё', 'е').replace(' ', '').replace('-', '')
+
+
+def _normalize_key_part(value):
+    return (str(value) if value is not None else '').casefold().replace(' ', '')
+
+
+def _deletion_variants(name):
+    """Все варианты строки с одной удалённой буквой, включая саму строку"""
+    variants = {name}
+    for index in range(len(name)):
+        variants.add(name[:index] + name[index + 1:])
+    return variants
+
+
+def edit_distance(a, b, limit=MAX_DISTANCE):
+    """
+    Расстояние Дамерау-Левенштейна (с перестановкой соседних букв)
+
+    Вычисление прекращается, как только расстояние превысило limit;
+    в этом случае возвращается limit + 1.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class _UnionFind:
+    """Система непересекающихся множеств для склейки пар в группы"""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+
+def find_duplicates(students, max_distance=MAX_DISTANCE):
+    """
+    Находит точные и нечёткие дубликаты
+
+    Args:
+        students: итерируемое словарей с ключами id, last_name, initials,
+                  birth_year, group_name
+        max_distance: допустимое расстояние между фамилиями (0 - только точные)
+
+    Returns:
+        list: список DuplicateGroup, сначала точные, затем нечёткие
+    """
+    # Блок -> нормализованная фамилия -> ID студентов
+    blocks = defaultdict(lambda: defaultdict(list))
+    display = {}
+
+    for student in students:
+        block = (
+            _normalize_key_part(student['initials']).replace('.', ''),
+            student['birth_year'],
+            _normalize_key_part(student['group_name']),
+        )
+        name = normalize_name(student['last_name'])
+        blocks[block][name].append(student['id'])
+        display.setdefault((block, name), student)
+
+    groups = []
+
+    # Точные дубликаты - корзины с несколькими записями
+    for block, names in blocks.items():
+        for name, student_ids in names.items():
+            if len(student_ids) > 1:
+                sample = display[(block, name)]
+                groups.append(DuplicateGroup(
+                    'exact', sorted(student_ids),
+                    f"{sample['last_name']} {sample['initials']}, "
+                    f"{sample['birth_year']}, {sample['group_name']}"
+                ))
+
+    if max_distance <= 0:
+        return groups
+
+    # Нечёткие дубликаты - только внутри блоков с разными фамилиями
+    for block, names in blocks.items():
+        if len(names) < 2:
+            continue
+
+        variant_index = defaultdict(list)
+        for name in names:
+            for variant in _deletion_variants(name):
+                variant_index[variant].append(name)
+
+        union_find = _UnionFind()
+        for candidates in variant_index.values():
+            if len(candidates) < 2:
+                continue
+            for i, first in enumerate(candidates):
+                for second in candidates[i + 1:]:
+                    if union_find.find(first) == union_find.find(second):
+                        continue
+                    if edit_distance(first, second, max_distance) <= max_distance:
+                        union_find.union(first, second)
+
+        clusters = defaultdict(list)
+        for name in names:
+            if name in union_find.parent:
+                clusters[union_find.find(name)].append(name)
+
+        for cluster_names in clusters.values():
+            if len(cluster_names) < 2:
+                continue
+            student_ids = sorted(
+                student_id for name in cluster_names for student_id in names[name]
+            )
+            spellings = ', '.join(sorted(display[(block, name)]['last_name'] for name in cluster_names))
+            sample = display[(block, cluster_names[0])]
+            groups.append(DuplicateGroup(
+                'fuzzy', student_ids,
+                f"{spellings} {sample['initials']}, {sample['birth_year']}, {sample['group_name']}"
+            ))
+
+    return groups
+
+
+def find_duplicate_students(db, max_distance=MAX_DISTANCE, timeout=None):
+    """
+    Ищет дубликаты во всей таблице students
+
+    Args:
+        db: экземпляр Database
+        max_distance: допустимое расстояние между фамилиями
+        timeout: таймаут загрузки записей, мс (см. Database.execute_query)
+
+    Returns:
+        tuple: (список DuplicateGroup, словарь {id: запись студента})
+    """
+    started = time.perf_counter()
+
+    students = db.execute_query("""
+        SELECT s.id, s.last_name, s.initials, s.birth_year, s.admission_year,
+               s.group_name, s.city_before
+        FROM students s
+    """, timeout=timeout, replica=True) or []
+    loaded = time.perf_counter()
+
+    groups = find_duplicates(students, max_distance)
+    finished = time.perf_counter()
+
+    logger.info("Поиск дубликатов: %s записей, загрузка %.2f с, анализ %.2f с, групп: %s",
+                len(students), loaded - started, finished - loaded, len(groups))
+
+    return groups, {student['id']: student for student in students}
@@ -1,22 +1,96 @@
 """
 Модуль шифрования данных для приложения
-Использует симметричное шифрование (Fernet) из библиотеки cryptography
+Использует симметричное шифрование из библиотеки cryptography
+
+Алгоритм шифрования выбирается настройкой ENCRYPTION_BACKEND:
+
+* fernet (по умолчанию) - Fernet (AES-128-CBC + HMAC-SHA256), результат -
+  строка base64 от токена Fernet; подходит для колонок TEXT и bytea;
+* aes-gcm - AES-256-GCM, результат - байты
+  VERSION_AES_GCM | nonce (12 байт) | шифртекст | тег (16 байт);
+  требует колонок bytea (миграция 4 в app/schema.py); до неё
+  Database.check_encryptor запрещает запись таким шифратором.
+
+Расшифровываются оба формата независимо от настройки: значения
+aes-gcm начинаются с байта версии, а строки Fernet - с символа base64,
+так что старые записи читаются и после смены алгоритма.
+
+Ключ один - файл ключа Fernet; ключ AES-256 выводится из него через HKDF.
 """
 
 import os
 import base64
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Первый байт значения в формате с заголовком
+VERSION_AES_GCM = 0x02
+NONCE_SIZE = 12
+DEFAULT_BACKEND = 'fernet'
+
+
+class FernetBackend:
+    """Fernet с двойным base64 - исходный формат приложения"""
+
+    name = 'fernet'
+
+    def __init__(self, key):
+        self.cipher = Fernet(key)
+
+    def encrypt(self, plaintext):
+        """bytes -> str (base64 от токена Fernet)"""
+        return base64.b64encode(self.cipher.encrypt(plaintext)).decode('ascii')
+
+    def decrypt(self, value):
+        """bytes со строкой base64 -> bytes"""
+        return self.cipher.decrypt(base64.b64decode(value))
+
+
+class AesGcmBackend:
+    """AES-256-GCM без текстовой обёртки: 29 байт сверх открытого текста"""
+
+    name = 'aes-gcm'
+
+    def __init__(self, key):
+        self.cipher = AESGCM(self.derive_key(key))
+
+    @staticmethod
+    def derive_key(fernet_key):
+        """Ключ AES-256, выведенный из ключа Fernet (HKDF-SHA256)"""
+        return HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=b'student-db aes-256-gcm v2',
+        ).derive(base64.urlsafe_b64decode(fernet_key))
+
+    def encrypt(self, plaintext):
+        """bytes -> bytes с заголовком версии"""
+        nonce = os.urandom(NONCE_SIZE)
+        return bytes([VERSION_AES_GCM]) + nonce + self.cipher.encrypt(nonce, plaintext, None)
+
+    def decrypt(self, value):
+        """bytes с заголовком версии -> bytes"""
+        nonce = value[1:1 + NONCE_SIZE]
+        return self.cipher.decrypt(nonce, value[1 + NONCE_SIZE:], None)
+
+
+BACKENDS = {
+    FernetBackend.name: FernetBackend,
+    AesGcmBackend.name: AesGcmBackend,
+}
+
 
 class DataEncryptor:
     """Класс для шифрования и дешифрования данных"""
 
-    def __init__(self, key=None, password=None, salt=None):
+    def __init__(self, key=None, password=None, salt=None, backend=DEFAULT_BACKEND):
         """
         Инициализация шифратора
 
@@ -24,6 +98,7 @@ class DataEncryptor:
             key: готовый ключ Fernet (если None, будет сгенерирован)
             password: пароль для генерации ключа (если нет готового ключа)
             salt: соль для генерации ключа
+            backend: алгоритм для новых значений (см. BACKENDS)
         """
         if key:
             self.key = key
@@ -32,7 +107,13 @@ class DataEncryptor:
         else:
             self.key = Fernet.generate_key()
 
+        if backend not in BACKENDS:
+            raise ValueError(f"Неизвестный алгоритм шифрования: {backend}")
+
         self.cipher = Fernet(self.key)
+        self.fernet = FernetBackend(self.key)
+        self.aes_gcm = AesGcmBackend(self.key)
+        self.backend = self.aes_gcm if backend == AesGcmBackend.name else self.fernet
 
     @staticmethod
     def generate_key_from_password(password, salt=None):
@@ -76,10 +157,10 @@ class DataEncryptor:
             try:
                 with open(key_file, 'rb') as f:
                     key = f.read()
-                logger.info(f"Ключ загружен из {key_file}")
+                logger.info("Ключ загружен из %s", key_file)
                 return key, False
             except Exception as e:
-                logger.error(f"Ошибка загрузки ключа: {e}")
+                logger.error("Ошибка загрузки ключа: %s", e)
 
         # Создаём новый ключ
         if password:
@@ -88,7 +169,7 @@ class DataEncryptor:
             encryptor = DataEncryptor()
 
         encryptor.save_key(key_file)
-        logger.info(f"Создан новый ключ в {key_file}")
+        logger.info("Создан новый ключ в %s", key_file)
         return encryptor.key, True
 
     def encrypt(self, data):
@@ -99,16 +180,15 @@ class DataEncryptor:
             data: строка для шифрования
 
         Returns:
-            str: зашифрованная строка в base64
+            str или bytes: строка base64 (fernet) или байты с заголовком (aes-gcm)
         """
         if data is None:
             return None
 
         try:
-            encrypted = self.cipher.encrypt(data.encode('utf-8'))
-            return base64.b64encode(encrypted).decode('utf-8')
+            return self.backend.encrypt(data.encode('utf-8'))
         except Exception as e:
-            logger.error(f"Ошибка шифрования: {e}")
+            logger.error("Ошибка шифрования: %s", e)
             return None
 
     def decrypt(self, encrypted_data):
@@ -116,7 +196,8 @@ class DataEncryptor:
         Дешифрует строку данных
 
         Args:
-            encrypted_data: зашифрованная строка в base64
+            encrypted_data: значение из базы - str (TEXT) или bytes/memoryview (bytea)
+                            в любом из форматов BACKENDS
 
         Returns:
             str: расшифрованная строка или None при ошибке
@@ -125,13 +206,23 @@ class DataEncryptor:
             return None
 
         try:
-            encrypted_bytes = base64.b64decode(encrypted_data.encode('utf-8'))
-            decrypted = self.cipher.decrypt(encrypted_bytes)
-            return decrypted.decode('utf-8')
+            if isinstance(encrypted_data, str):
+                value = encrypted_data.encode('ascii')
+            else:
+                value = bytes(encrypted_data)
+            backend = self.aes_gcm if value[0] == VERSION_AES_GCM else self.fernet
+            return backend.decrypt(value).decode('utf-8')
         except Exception as e:
-            logger.error(f"Ошибка дешифрования: {e}")
+            logger.error("Ошибка дешифрования: %s", e)
             return None
 
+    def needs_reencryption(self, encrypted_data):
+        """Записано ли значение не тем алгоритмом, что выбран сейчас"""
+        if not encrypted_data:
+            return False
+        is_aes_gcm = not isinstance(encrypted_data, str) and encrypted_data[0] == VERSION_AES_GCM
+        return is_aes_gcm != (self.backend is self.aes_gcm)
+
     def encrypt_fields(self, data_dict, fields_to_encrypt):
         """
         Шифрует указанные поля в словаре
@@ -187,9 +278,9 @@ class DataEncryptor:
         try:
             with open(filename, 'wb') as f:
                 f.write(self.key)
-            logger.info(f"Ключ сохранён в {filename}")
+            logger.info("Ключ сохранён в %s", filename)
         except Exception as e:
-            logger.error(f"Ошибка сохранения ключа: {e}")
+            logger.error("Ошибка сохранения ключа: %s", e)
 
     def get_key(self):
         """
@@ -205,12 +296,13 @@ class DataEncryptor:
 _encryptor = None
 
 
-def get_encryptor(key_file='secret.key'):
+def get_encryptor(key_file='secret.key', backend=DEFAULT_BACKEND):
     """
     Возвращает глобальный экземпляр шифратора
 
     Args:
         key_file: путь к файлу с ключом
+        backend: алгоритм для новых значений (config['encryption']['backend'])
 
     Returns:
         DataEncryptor: экземпляр шифратора
@@ -219,7 +311,7 @@ def get_encryptor(key_file='secret.key'):
 
     if _encryptor is None:
         key, _ = DataEncryptor.load_or_create_key(key_file)
-        _encryptor = DataEncryptor(key=key)
+        _encryptor = DataEncryptor(key=key, backend=backend)
 
     return _encryptor
 
@@ -0,0 +1,132 @@
+"""
+Экспорт студентов в CSV для внешних систем
+
+Выгрузка идёт через COPY (SELECT ...) TO STDOUT WITH CSV HEADER: сервер
+сам форматирует строки, а клиент лишь переписывает поток байтов в файл
+(при необходимости через gzip). Промежуточных Python-объектов на каждую
+строку не создаётся, поэтому экспорт всей таблицы не упирается в память.
+
+Фильтры те же, что у поиска в главном окне (Database.STUDENT_FILTERS).
+Зашифрованные поля (телефон, номер зачётки) в CSV не попадают.
+"""
+
+import datetime
+import gzip
+import logging
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from app.utils import CountingWriter
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = 'exports'
+COMPRESS_LEVEL = 6
+
+# Колонки CSV: (SQL-выражение, заголовок)
+EXPORT_COLUMNS = [
+    ('s.id', 'id'),
+    ('s.last_name', 'last_name'),
+    ('s.initials', 'initials'),
+    ('s.birth_year', 'birth_year'),
+    ('s.admission_year', 'admission_year'),
+    ('s.group_name', 'group_name'),
+    ('s.city_before', 'city_before'),
+    ('d.code', 'department_code'),
+    ('d.name', 'department_name'),
+    ('i.code', 'institute_code'),
+    ('i.name', 'institute_name'),
+]
+
+
+class ExportResult(NamedTuple):
+    """Итог выгрузки"""
+    path: Path
+    rows: int
+    bytes_raw: int       # объём CSV до сжатия
+    bytes_written: int   # размер файла
+    seconds: float
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes_raw / self.seconds if self.seconds > 0 else 0.0
+
+
+def build_export_query(db, filters=None):
+    """
+    Строит SELECT для выгрузки
+
+    Returns:
+        tuple: (текст запроса, список параметров)
+    """
+    where, params = db.build_student_filters(filters)
+    columns = ",\n               ".join(f"{expression} AS {name}" for expression, name in EXPORT_COLUMNS)
+    query = f"""
+        SELECT {columns}
+        FROM students s
+        JOIN departments d ON s.department_id = d.id
+        JOIN institutes i ON d.institute_id = i.id
+        WHERE {where}
+        ORDER BY s.id
+    """
+    return query, params
+
+
+def export_filename(compress=False, now=None):
+    """Имя файла выгрузки с отметкой времени"""
+    now = now or datetime.datetime.now()
+    suffix = '.csv.gz' if compress else '.csv'
+    return f"students_{now.strftime('%Y%m%d_%H%M%S')}{suffix}"
+
+
+def export_students_csv(db, filters=None, export_dir=EXPORT_DIR, compress=False, path=None,
+                        timeout=None):
+    """
+    Выгружает студентов в CSV
+
+    Args:
+        db: экземпляр Database
+        filters: словарь фильтров (см. Database.STUDENT_FILTERS)
+        export_dir: каталог выгрузок
+        compress: сжимать файл gzip на лету
+        path: явный путь файла (по умолчанию - новое имя в export_dir)
+        timeout: таймаут выгрузки, мс (см. Database.copy_to)
+
+    Returns:
+        ExportResult: путь, количество строк, объём и время
+    """
+    query, params = build_export_query(db, filters)
+
+    if path is None:
+        path = Path(export_dir) / export_filename(compress)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    if compress:
+        file = gzip.open(path, 'wb', compresslevel=COMPRESS_LEVEL)
+    else:
+        file = open(path, 'wb')
+
+    try:
+        with file as f:
+            writer = CountingWriter(f)
+            rows = db.copy_to(query, writer, tuple(params),
+                              options="FORMAT csv, HEADER true, ENCODING 'UTF8'",
+                              timeout=timeout)
+    except Exception:
+        path.unlink(missing_ok=True)
+        raise
+
+    result = ExportResult(
+        path=path,
+        rows=rows,
+        bytes_raw=writer.bytes_written,
+        bytes_written=path.stat().st_size,
+        seconds=time.perf_counter() - started,
+    )
+    logger.info("Экспорт CSV %s: %s строк, %s байт за %.3f с (%.1f МБ/с)",
+                path, result.rows, result.bytes_written, result.seconds,
+                result.bytes_per_second / 1024 / 1024)
+    return result
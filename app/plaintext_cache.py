@@ -0,0 +1,82 @@
+"""
+Кэш расшифрованных значений для показа в таблице
+
+Расшифрованный телефон нужен, пока строка видна на экране. Кэш держит
+не больше max_entries значений и каждое не дольше ttl секунд с момента
+расшифровки, вытесняя давно не показанные (LRU). При блокировке окна и
+выходе кэш очищается целиком (wipe).
+
+Строки Python неизменяемы, поэтому wipe не затирает память, а только
+отпускает ссылки - кэш ограничивает, сколько открытого текста и как
+долго приложение держит сам, но не защищает от дампа памяти процесса.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 60.0        # с
+DEFAULT_MAX_ENTRIES = 200
+
+
+class PlaintextCache:
+    """Потокобезопасный кэш {ключ: открытый текст} с TTL и LRU"""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # ключ -> (истекает, значение)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Создаёт кэш по настройкам приложения
+
+        Args:
+            config: config['app'] с ключами phone_reveal_ttl и phone_reveal_cache_size
+        """
+        return cls(config.get('phone_reveal_ttl', DEFAULT_TTL),
+                   config.get('phone_reveal_cache_size', DEFAULT_MAX_ENTRIES))
+
+    def get(self, key):
+        """
+        Returns:
+            tuple: (найдено, значение)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def missing(self, keys):
+        """Ключи, которых нет в кэше (или они истекли)"""
+        now = time.monotonic()
+        with self._lock:
+            return [key for key in keys
+                    if key not in self._entries or self._entries[key][0] < now]
+
+    def discard(self, key):
+        """Убирает значение (например, после изменения телефона)"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def wipe(self):
+        """Удаляет все расшифрованные значения"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,205 @@
+"""
+Профилирование действий пользователя
+
+Режимы (переменная окружения APP_PROFILE или меню «Диагностика»):
+
+* off - профилирование выключено;
+* cprofile - детерминированный профиль cProfile, сохраняется в .prof
+  (открывается snakeviz/pstats) и краткой сводкой в .txt;
+* sampling - сэмплирующий профайлер: фоновый поток периодически снимает
+  стек профилируемого потока через sys._current_frames(). Накладные
+  расходы почти не зависят от числа вызовов, поэтому режим подходит для
+  рабочих сессий. Результат - свёрнутые стеки (формат flamegraph.pl).
+
+Независимо от режима можно включить снимки памяти tracemalloc
+(APP_TRACEMALLOC=1): до и после действия снимается снимок, а разница по
+строкам кода сохраняется в отчёт.
+
+Все отчёты пишутся в каталог logs/.
+"""
+
+import cProfile
+import datetime
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MODES = ('off', 'cprofile', 'sampling')
+DEFAULT_DIR = 'logs'
+DEFAULT_SAMPLE_INTERVAL = 0.005
+TOP_ENTRIES = 30
+TRACEMALLOC_FRAMES = 10
+
+
+class _Sampler(threading.Thread):
+    """Фоновый поток, снимающий стеки профилируемого потока"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Profiler:
+    """Профилирует отдельные действия и сохраняет отчёты в каталог логов"""
+
+    def __init__(self, mode='off', memory=False, report_dir=DEFAULT_DIR,
+                 sample_interval=DEFAULT_SAMPLE_INTERVAL):
+        self.mode = 'off'
+        self.set_mode(mode)
+        self.memory = memory
+        self.report_dir = Path(report_dir)
+        self.sample_interval = sample_interval
+        # Пути последних отчётов (новые в конце)
+        self.reports = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Создаёт профайлер по разделу 'diagnostics' конфигурации"""
+        config = config or {}
+        return cls(
+            mode=config.get('profile', 'off'),
+            memory=config.get('tracemalloc', False),
+            report_dir=config.get('dir', DEFAULT_DIR),
+            sample_interval=config.get('sample_interval', DEFAULT_SAMPLE_INTERVAL),
+        )
+
+    @property
+    def enabled(self):
+        return self.mode != 'off' or self.memory
+
+    def set_mode(self, mode):
+        """Переключает режим профилирования"""
+        if mode not in MODES:
+            logger.warning("Неизвестный режим профилирования %r, профилирование выключено", mode)
+            mode = 'off'
+        self.mode = mode
+
+    def set_memory(self, enabled):
+        """Включает или выключает снимки памяти"""
+        self.memory = enabled
+        if not enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _report_path(self, action, kind, suffix):
+        stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        return self.report_dir / f"{kind}_{action}_{stamp}{suffix}"
+
+    def _add_report(self, path):
+        self.reports.append(path)
+        del self.reports[:-20]
+        logger.info("Отчёт профилирования сохранён: %s", path)
+
+    @contextmanager
+    def profile(self, action):
+        """
+        Профилирует блок кода, если профилирование включено
+
+        Пример:
+            with profiler.profile('load'):
+                ...
+
+        Одновременно профилируется только одно действие: вложенные и
+        параллельные блоки выполняются без профилирования.
+        """
+        if not self.enabled or not self._lock.acquire(blocking=False):
+            yield
+            return
+
+        mode = self.mode
+        memory = self.memory
+        profile = sampler = before = None
+        started = time.perf_counter()
+
+        try:
+            if memory:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(TRACEMALLOC_FRAMES)
+                before = tracemalloc.take_snapshot()
+
+            if mode == 'cprofile':
+                profile = cProfile.Profile()
+                profile.enable()
+            elif mode == 'sampling':
+                sampler = _Sampler(threading.get_ident(), self.sample_interval)
+                sampler.start()
+
+            yield
+
+        finally:
+            try:
+                elapsed = time.perf_counter() - started
+                if profile is not None:
+                    profile.disable()
+                    self._save_cprofile(action, profile, elapsed)
+                if sampler is not None:
+                    sampler.stop()
+                    self._save_samples(action, sampler, elapsed)
+                if before is not None:
+                    self._save_memory(action, before, tracemalloc.take_snapshot(), elapsed)
+            except Exception as e:
+                logger.error("Не удалось сохранить отчёт профилирования: %s", e)
+            finally:
+                self._lock.release()
+
+    def _save_cprofile(self, action, profile, elapsed):
+        path = self._report_path(action, 'profile', '.prof')
+        profile.dump_stats(str(path))
+        self._add_report(path)
+
+        summary = io.StringIO()
+        summary.write(f"Действие: {action}, время: {elapsed:.3f} с\n\n")
+        pstats.Stats(profile, stream=summary).sort_stats('cumulative').print_stats(TOP_ENTRIES)
+        text_path = path.with_suffix('.txt')
+        text_path.write_text(summary.getvalue(), encoding='utf-8')
+
+    def _save_samples(self, action, sampler, elapsed):
+        path = self._report_path(action, 'samples', '.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            # Свёрнутые стеки: "внешний;...;внутренний количество"
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self._add_report(path)
+        logger.info("Сэмплирование %s: %s снимков за %.3f с", action, sampler.samples, elapsed)
+
+    def _save_memory(self, action, before, after, elapsed):
+        path = self._report_path(action, 'memory', '.txt')
+        differences = after.compare_to(before, 'lineno')
+        current, peak = tracemalloc.get_traced_memory()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"Действие: {action}, время: {elapsed:.3f} с\n")
+            f.write(f"Отслеживается: {current / 1024:.1f} КБ, пик: {peak / 1024:.1f} КБ\n\n")
+            for difference in differences[:TOP_ENTRIES]:
+                f.write(f"{difference}\n")
+        self._add_report(path)
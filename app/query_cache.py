@@ -0,0 +1,173 @@
+"""
+Кэш результатов SELECT-запросов для Database.execute_query
+
+Ключ записи - нормализованный текст запроса (пробелы схлопнуты),
+параметры и значения sql.Literal, подставленных в запрос. Записи живут не дольше ttl секунд, число записей ограничено
+(вытесняются давно не использованные). Для каждой записи запоминаются
+таблицы, из которых она прочитана: любой запрос на запись (fetch=False
+или INSERT/UPDATE/DELETE/...) сбрасывает записи затронутых таблиц.
+
+Кэш видит только записи, прошедшие через этот процесс. Изменения,
+сделанные другими пользователями, становятся видны не позже чем через ttl.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from psycopg2 import sql
+
+DEFAULT_TTL = 10
+DEFAULT_MAX_ENTRIES = 256
+
+_WHITESPACE = re.compile(r'\s+')
+_TABLE_REFERENCE = re.compile(
+    r'\b(?:FROM|JOIN|INTO|UPDATE|TABLE|ONLY)\s+((?:"[^"]+"|\w+)(?:\.(?:"[^"]+"|\w+))?)',
+    re.IGNORECASE
+)
+_WRITE_STATEMENT = re.compile(
+    r'\b(INSERT|UPDATE|DELETE|TRUNCATE|ALTER|DROP|CREATE|MERGE|COPY|SELECT\s+setval)\b',
+    re.IGNORECASE
+)
+
+
+def query_text(query):
+    """Текст запроса; для sql.Composable собирается без соединения с БД"""
+    if isinstance(query, sql.Composed):
+        return ''.join(query_text(part) for part in query.seq)
+    if isinstance(query, sql.SQL):
+        return query.string
+    if isinstance(query, sql.Identifier):
+        return '.'.join(f'"{name}"' for name in query.strings)
+    if isinstance(query, sql.Composable):
+        # Literal, Placeholder - на список таблиц не влияют
+        return ' '
+    return str(query)
+
+
+def query_literals(query):
+    """Значения sql.Literal в запросе по порядку (query_text их не показывает)"""
+    if isinstance(query, sql.Composed):
+        return tuple(value for part in query.seq for value in query_literals(part))
+    if isinstance(query, sql.Literal):
+        return (query.wrapped,)
+    return ()
+
+
+def normalize_query(text):
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def referenced_tables(text):
+    """Имена таблиц, упомянутых в запросе (без схемы и кавычек, в нижнем регистре)"""
+    tables = set()
+    for reference in _TABLE_REFERENCE.findall(text):
+        name = reference.split('.')[-1].strip('"').lower()
+        tables.add(name)
+    return tables
+
+
+def is_write(text):
+    """Похож ли запрос на изменение данных или схемы"""
+    return bool(_WRITE_STATEMENT.search(text))
+
+
+class QueryCache:
+    """Потокобезопасный кэш результатов с TTL, LRU и инвалидацией по таблицам"""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # ключ -> (истекает, таблицы, строки)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Создаёт кэш по настройкам БД или возвращает None, если кэш выключен
+
+        Args:
+            config: config['database'] с ключами cache_ttl и cache_size
+        """
+        ttl = config.get('cache_ttl', 0)
+        if not ttl or ttl <= 0:
+            return None
+        return cls(ttl, config.get('cache_size', DEFAULT_MAX_ENTRIES))
+
+    @staticmethod
+    def make_key(text, params, literals=()):
+        """
+        Ключ записи
+
+        Args:
+            literals: значения sql.Literal запроса (query_literals) - без
+                      них запросы, различающиеся только литералом, совпали бы
+        """
+        return normalize_query(text), tuple(params or ()), tuple(literals)
+
+    def get(self, key):
+        """
+        Возвращает копию закэшированного результата
+
+        Returns:
+            tuple: (найдено, строки)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            rows = entry[2]
+        # Вызывающий код может менять словари строк - отдаём копии
+        return True, [dict(row) for row in rows]
+
+    def put(self, key, tables, rows):
+        """Сохраняет результат запроса, прочитанного из tables"""
+        if not tables:
+            # Не знаем, что инвалидировать (функции, системные запросы) - не кэшируем
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, frozenset(tables),
+                                  [dict(row) for row in rows])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tables):
+        """Удаляет записи, прочитанные из любой из таблиц"""
+        tables = set(tables)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[1] & tables]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        """Удаляет все записи"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """Метрики кэша"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,271 @@
+"""
+Маршрутизация чтения на реплики PostgreSQL
+
+Тяжёлые чтения (списки, поиск, статистика, выгрузки) можно отдавать
+репликам потоковой репликации, разгружая основной сервер. Реплики
+задаются строками подключения в DB_REPLICAS (через запятую):
+
+    DB_REPLICAS=host=10.0.0.2 port=5432,host=10.0.0.3 port=5432
+
+Имя базы, пользователь и пароль, не указанные в строке, берутся из
+настроек основного сервера.
+
+Реплика используется, только если:
+
+* она отвечает и находится в режиме восстановления (pg_is_in_recovery);
+* её отставание не больше max_lag секунд;
+* она уже применила последнюю запись этого процесса (read-your-writes):
+  после каждой записи Database запоминает pg_current_wal_lsn() основного
+  сервера, и пока реплика не воспроизвела журнал до этой позиции, чтения
+  идут на основной сервер.
+
+Состояние реплик проверяется не чаще раза в check_interval секунд (пока
+чтения прижаты к основному серверу - чаще, см. PINNED_CHECK_INTERVAL).
+Проверка идёт в фоновом потоке: до недоступной реплики соединение ждёт
+до CONNECT_TIMEOUT, а выбор реплики только читает последнее известное
+состояние, поэтому главный поток GUI не замирает. До первой проверки
+чтения идут на основной сервер. Реплика, на которой оборвалось
+соединение, исключается до следующей проверки. Если подходящих реплик
+нет, чтение идёт на основной сервер.
+
+Проверка на двух локальных экземплярах:
+    pg_basebackup -D /tmp/replica -R -X stream -p 5432
+    pg_ctl -D /tmp/replica -o "-p 5433" start
+    DB_REPLICAS="host=localhost port=5433" python -m pytest tests/test_replicas.py
+"""
+
+import logging
+import threading
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_LAG = 5.0           # с
+DEFAULT_CHECK_INTERVAL = 5.0    # с
+PINNED_CHECK_INTERVAL = 0.5     # с
+CONNECT_TIMEOUT = 2             # с
+
+HEALTH_QUERY = """
+    SELECT pg_is_in_recovery() as standby,
+           pg_last_wal_replay_lsn()::text as replay_lsn,
+           CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+           END as lag
+"""
+
+
+def parse_lsn(value):
+    """Позиция в журнале 'X/Y' в виде числа (None - None)"""
+    if not value:
+        return None
+    high, low = value.split('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+class Replica:
+    """Одна реплика: строка подключения и результат последней проверки"""
+
+    def __init__(self, dsn, defaults, maxconn=None):
+        self.dsn = dsn
+        self.params = dict(defaults, dsn=dsn)
+        # Для журнала - без пароля из строки подключения
+        given = psycopg2.extensions.parse_dsn(dsn)
+        self.name = f"{given.get('host', defaults.get('host'))}:{given.get('port', defaults.get('port'))}"
+        self.maxconn = maxconn
+        self.pool = None
+        self.healthy = False
+        self.lag = None
+        self.replay_lsn = None
+        self.checked_at = None
+
+    def __repr__(self):
+        return f"Replica({self.name})"
+
+    def getconn(self):
+        if self.maxconn:
+            if self.pool is None:
+                self.pool = ThreadedConnectionPool(1, self.maxconn, **self.params)
+            return self.pool.getconn()
+        return psycopg2.connect(**self.params)
+
+    def putconn(self, connection):
+        if self.pool is not None:
+            self.pool.putconn(connection, close=bool(connection.closed))
+        else:
+            connection.close()
+
+    def check(self):
+        """Запрашивает состояние реплики; возвращает словарь HEALTH_QUERY"""
+        connection = psycopg2.connect(connect_timeout=CONNECT_TIMEOUT, **self.params)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(HEALTH_QUERY)
+                return cursor.fetchone()
+        finally:
+            connection.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.closeall()
+            self.pool = None
+
+
+class ReplicaSet:
+    """Потокобезопасный выбор реплики для чтения; общий для всех экземпляров Database"""
+
+    def __init__(self, replicas, max_lag=DEFAULT_MAX_LAG, check_interval=DEFAULT_CHECK_INTERVAL):
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        # Позиция журнала последней записи процесса на основном сервере
+        self.write_lsn = None
+        self._next = 0
+        self._lock = threading.Lock()
+        # Занят, пока идёт фоновая проверка (освобождает её поток)
+        self._check_lock = threading.Lock()
+        self._checker = None
+        self._checked_at = None
+
+    @classmethod
+    def from_config(cls, config, maxconn=None):
+        """
+        Создаёт набор реплик по настройкам БД или возвращает None, если реплик нет
+
+        Args:
+            config: config['database'] с ключами replicas, replica_max_lag,
+                    replica_check_interval
+            maxconn: размер пула соединений каждой реплики (None - без пула)
+        """
+        dsns = config.get('replicas') or []
+        if not dsns:
+            return None
+        defaults = dict(
+            host=config.get('host'),
+            port=config.get('port'),
+            database=config.get('name'),
+            user=config.get('user'),
+            password=config.get('password'),
+            cursor_factory=RealDictCursor,
+        )
+        # Параметры из строки подключения реплики важнее параметров основного сервера
+        replicas = []
+        for dsn in dsns:
+            given = psycopg2.extensions.parse_dsn(dsn)
+            if 'dbname' in given:
+                given['database'] = given.pop('dbname')
+            replica_defaults = {key: value for key, value in defaults.items()
+                                if key not in given and value is not None}
+            replicas.append(Replica(dsn, replica_defaults, maxconn))
+        return cls(replicas,
+                   config.get('replica_max_lag', DEFAULT_MAX_LAG),
+                   config.get('replica_check_interval', DEFAULT_CHECK_INTERVAL))
+
+    def note_write(self, lsn):
+        """Запоминает позицию журнала после записи (для read-your-writes)"""
+        position = parse_lsn(lsn)
+        if position is None:
+            return
+        with self._lock:
+            if self.write_lsn is None or position > self.write_lsn:
+                self.write_lsn = position
+
+    def mark_down(self, replica):
+        """Исключает реплику до следующей проверки (оборвалось соединение)"""
+        with self._lock:
+            replica.healthy = False
+        logger.warning("Реплика %s недоступна, чтение переключено", replica.name)
+
+    def _usable(self, replica):
+        if not replica.healthy:
+            return False
+        if self.write_lsn is None:
+            return True
+        return replica.replay_lsn is not None and replica.replay_lsn >= self.write_lsn
+
+    def choose(self):
+        """
+        Реплика для очередного чтения или None (читать с основного сервера)
+
+        Подходящие реплики чередуются по кругу. Состояние реплик не
+        проверяется на месте: если оно устарело, запускается фоновая
+        проверка, а этот выбор делается по прежнему состоянию.
+        """
+        self._refresh_if_stale()
+        with self._lock:
+            usable = [replica for replica in self.replicas if self._usable(replica)]
+            if not usable:
+                return None
+            self._next = (self._next + 1) % len(usable)
+            return usable[self._next]
+
+    def _refresh_if_stale(self):
+        now = time.monotonic()
+        with self._lock:
+            # Реплики живы, но ещё не догнали нашу запись - проверяем чаще
+            pinned = not any(self._usable(replica) for replica in self.replicas) and any(
+                replica.healthy for replica in self.replicas)
+            interval = PINNED_CHECK_INTERVAL if pinned else self.check_interval
+            if self._checked_at is not None and now - self._checked_at < interval:
+                return
+        # Проверяет один фоновый поток; все пока читают по прежнему состоянию
+        if not self._check_lock.acquire(blocking=False):
+            return
+        self._checker = threading.Thread(target=self._refresh_in_background,
+                                         name="replica-check", daemon=True)
+        self._checker.start()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error("Ошибка проверки реплик: %s", e)
+        finally:
+            self._check_lock.release()
+
+    def wait_refresh(self, timeout=None):
+        """Ждёт окончания запущенной фоновой проверки"""
+        checker = self._checker
+        if checker is not None:
+            checker.join(timeout)
+
+    def refresh(self):
+        """Проверяет все реплики"""
+        for replica in self.replicas:
+            try:
+                state = replica.check()
+            except psycopg2.Error as e:
+                state = None
+                logger.warning("Реплика %s не отвечает: %s", replica.name, e)
+            self._apply_state(replica, state)
+        with self._lock:
+            self._checked_at = time.monotonic()
+
+    def _apply_state(self, replica, state):
+        with self._lock:
+            was_healthy = replica.healthy
+            replica.checked_at = time.monotonic()
+            if state is None:
+                replica.healthy = False
+                return
+            replica.lag = float(state['lag']) if state['lag'] is not None else None
+            replica.replay_lsn = parse_lsn(state['replay_lsn'])
+            replica.healthy = bool(state['standby']) and replica.lag is not None \
+                and replica.lag <= self.max_lag
+        if was_healthy and not replica.healthy:
+            logger.warning("Реплика %s исключена: отставание %s с", replica.name, replica.lag)
+        elif replica.healthy and not was_healthy:
+            logger.info("Реплика %s доступна, отставание %.2f с", replica.name, replica.lag)
+
+    def status(self):
+        """Состояние реплик для диагностики"""
+        with self._lock:
+            return [{'name': replica.name, 'healthy': replica.healthy, 'lag': replica.lag,
+                     'caught_up': self._usable(replica)} for replica in self.replicas]
+
+    def close(self):
+        for replica in self.replicas:
+            replica.close()
@@ -0,0 +1,1014 @@
+"""
+Управление схемой базы данных
+
+Партиционирование таблицы students по году поступления (admission_year):
+каждая когорта хранится в отдельной партиции students_yYYYY, а записи с
+годами вне созданных диапазонов попадают в партицию students_default.
+Запросы с условием admission_year = ... читают только нужную партицию.
+
+Индексы для сортировки списка студентов на сервере: по одному на каждую
+сортируемую колонку, с id в качестве второго ключа для keyset-пагинации.
+Индексы строятся CONCURRENTLY (для партиционированной таблицы - по
+партициям с последующим ATTACH), поэтому запись в таблицу не блокируется
+и индекс можно разворачивать днём.
+
+Версионные миграции: DDL таблиц students, departments, institutes, users
+и индексы приложения; применённые версии хранятся в schema_migrations.
+
+Запуск из командной строки (python -m app.schema <команда> - прежнее
+имя тех же задач, см. CLI_TASKS):
+    python -m app.cli maintenance migrate        # применить миграции
+    python -m app.cli maintenance status         # показать версии схемы
+    python -m app.cli maintenance convert        # преобразовать students
+    python -m app.cli maintenance partitions     # создать партиции на следующий год (cron)
+    python -m app.cli maintenance indexes        # создать недостающие индексы
+    python -m app.cli maintenance index-report   # неиспользуемые/недостающие индексы
+    python -m app.cli maintenance bloat-report   # раздувание таблиц
+"""
+
+import datetime
+import hashlib
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, NamedTuple, Optional
+
+import psycopg2
+import psycopg2.errors
+
+logger = logging.getLogger(__name__)
+
+PARTITION_KEY = 'admission_year'
+DEFAULT_PARTITION = 'students_default'
+
+MIGRATIONS_TABLE = 'schema_migrations'
+# Сколько DDL ждёт блокировку, прежде чем отступить и повторить попытку
+DEFAULT_LOCK_TIMEOUT = '5s'
+LOCK_RETRIES = 5
+# Таблицы крупнее этого порога попадают в отчёты о последовательных чтениях
+LARGE_TABLE_ROWS = 10000
+# Город до поступления может быть NULL, поэтому сортируется по COALESCE
+# (см. Database.NULLABLE_SORT_COLUMNS); индекс по самой колонке заменён миграцией 7
+CITY_SORT_INDEX = 'students_city_before_key_idx'
+
+
+class IndexSpec(NamedTuple):
+    """Описание индекса, которым управляет приложение"""
+    name: str
+    table: str
+    columns: str          # часть определения после ON table, например "(group_name, id)"
+    unique: bool = False
+
+
+def sort_indexes(collation='ru-x-icu'):
+    """
+    Возвращает индексы для сортировки списка студентов
+
+    Выражения совпадают с Database.sort_expression, иначе планировщик
+    не сможет использовать индекс для ORDER BY.
+
+    Returns:
+        list: IndexSpec
+    """
+    return [
+        IndexSpec('students_last_name_ru_idx', 'students', f'(last_name COLLATE "{collation}", id)'),
+        IndexSpec('students_initials_sort_idx', 'students', '(initials, id)'),
+        IndexSpec('students_birth_year_sort_idx', 'students', '(birth_year, id)'),
+        IndexSpec('students_admission_year_sort_idx', 'students', '(admission_year, id)'),
+        IndexSpec('students_group_name_sort_idx', 'students', '(group_name, id)'),
+        IndexSpec(CITY_SORT_INDEX, 'students', "((COALESCE(city_before, '')), id)"),
+    ]
+
+
+def foreign_key_indexes():
+    """Индексы по внешним ключам: соединения и проверки ON DELETE без полного чтения"""
+    return [
+        IndexSpec('departments_institute_id_idx', 'departments', '(institute_id)'),
+        IndexSpec('students_department_id_idx', 'students', '(department_id)'),
+    ]
+
+
+def tree_indexes(collation='ru-x-icu'):
+    """
+    Индекс дерева студентов: группы кафедры и страницы группы по фамилии
+
+    Подсчёт групп кафедры читается только из индекса, а страница группы -
+    продолжение обхода индекса с ключа последней строки.
+    """
+    return [
+        IndexSpec('students_department_group_idx', 'students',
+                  f'(department_id, group_name, last_name COLLATE "{collation}", id)'),
+    ]
+
+
+def queue_indexes():
+    """
+    Ключ идемпотентности записей очереди быстрого ввода (app/write_queue.py)
+
+    Уникальный индекс партиционированной таблицы обязан включать ключ
+    партиционирования; запись очереди не меняет год, так что пара
+    (entry_key, admission_year) так же уникальна, как сам ключ.
+    """
+    return [
+        IndexSpec('students_entry_key_idx', 'students', '(entry_key, admission_year)', unique=True),
+    ]
+
+
+def performance_indexes(collation='ru-x-icu'):
+    """Все индексы, которые должны существовать для быстрой работы приложения"""
+    return foreign_key_indexes() + sort_indexes(collation)
+
+
+def ensure_sort_indexes(db, collation=None):
+    """
+    Создаёт недостающие индексы сортировки (без блокировки записи)
+
+    Args:
+        db: экземпляр Database
+        collation: collation для фамилий (по умолчанию из настроек БД)
+
+    Returns:
+        list: имена проверенных индексов
+    """
+    collation = collation or db.config.get('collation', 'ru-x-icu')
+    names = []
+    for spec in sort_indexes(collation):
+        create_index_online(db, spec)
+        names.append(spec.name)
+    logger.info("Индексы сортировки проверены: %s", len(names))
+    return names
+
+
+@contextmanager
+def _autocommit(db, lock_timeout=DEFAULT_LOCK_TIMEOUT):
+    """
+    Отдельное соединение в режиме autocommit
+
+    CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции.
+    lock_timeout не даёт DDL долго стоять в очереди за блокировкой:
+    пока он ждёт, за ним встают и обычные запросы операторов.
+
+    Соединение открывается мимо пула db и закрывается после блока:
+    autocommit и lock_timeout сеанса не достаются запросам операторов.
+    """
+    connection = psycopg2.connect(**db.connection_params(db.config))
+    try:
+        connection.autocommit = True
+        cursor = connection.cursor()
+        cursor.execute("SELECT set_config('lock_timeout', %s, false)", (lock_timeout,))
+        yield cursor
+    finally:
+        connection.close()
+
+
+def _execute_with_retry(cursor, statement, attempts=LOCK_RETRIES):
+    """Выполняет DDL, повторяя попытку, если блокировку не удалось получить за lock_timeout"""
+    for attempt in range(1, attempts + 1):
+        try:
+            cursor.execute(statement)
+            return
+        except psycopg2.errors.LockNotAvailable:
+            if attempt == attempts:
+                raise
+            logger.warning("Таблица занята, повтор через %s с: %s", attempt * 2, statement.split('\n')[0])
+            time.sleep(attempt * 2)
+
+
+def _index_state(cursor, name):
+    """None - индекса нет, True - готов, False - недостроен (INVALID)"""
+    cursor.execute("""
+        SELECT ix.indisvalid
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        JOIN pg_index ix ON ix.indexrelid = c.oid
+        WHERE n.nspname = 'public' AND c.relname = %s
+    """, (name,))
+    row = cursor.fetchone()
+    return None if row is None else row['indisvalid']
+
+
+def _partitions(cursor, table):
+    """Партиции таблицы (пустой список для обычной таблицы)"""
+    cursor.execute("""
+        SELECT child.relname
+        FROM pg_inherits inh
+        JOIN pg_class parent ON parent.oid = inh.inhparent
+        JOIN pg_class child ON child.oid = inh.inhrelid
+        JOIN pg_namespace n ON n.oid = parent.relnamespace
+        WHERE n.nspname = 'public' AND parent.relname = %s AND parent.relkind = 'p'
+        ORDER BY child.relname
+    """, (table,))
+    return [row['relname'] for row in cursor.fetchall()]
+
+
+def _child_index_name(index_name, partition):
+    """Имя индекса партиции, не длиннее 63 символов"""
+    name = f"{partition}_{index_name}"
+    if len(name) <= 63:
+        return name
+    digest = hashlib.md5(name.encode('utf-8')).hexdigest()[:8]
+    return f"{name[:54]}_{digest}"
+
+
+def _build_concurrently(cursor, name, table, columns, unique):
+    """Создаёт индекс CONCURRENTLY, пересоздавая недостроенный"""
+    state = _index_state(cursor, name)
+    if state:
+        return False
+    if state is False:
+        logger.warning("Индекс %s недостроен (INVALID), пересоздаю", name)
+        _execute_with_retry(cursor, f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+    started = time.perf_counter()
+    _execute_with_retry(cursor, f'CREATE {"UNIQUE " if unique else ""}INDEX CONCURRENTLY '
+                                f'"{name}" ON "{table}" {columns}')
+    logger.info("Индекс %s построен за %.1f с", name, time.perf_counter() - started)
+    return True
+
+
+def create_index_online(db, spec, lock_timeout=DEFAULT_LOCK_TIMEOUT):
+    """
+    Создаёт индекс, не блокируя запись в таблицу
+
+    Для обычной таблицы - CREATE INDEX CONCURRENTLY. Партиционированную
+    таблицу так индексировать нельзя, поэтому сначала создаётся пустой
+    индекс ON ONLY на родителе (только каталог), затем индекс каждой
+    партиции строится CONCURRENTLY и подключается ATTACH PARTITION;
+    когда подключены все, индекс родителя становится рабочим.
+
+    Args:
+        db: экземпляр Database
+        spec: IndexSpec
+        lock_timeout: сколько ждать блокировку перед повтором
+
+    Returns:
+        bool: True, если что-то было построено
+    """
+    with _autocommit(db, lock_timeout) as cursor:
+        partitions = _partitions(cursor, spec.table)
+        if not partitions:
+            return _build_concurrently(cursor, spec.name, spec.table, spec.columns, spec.unique)
+
+        if _index_state(cursor, spec.name):
+            return False
+
+        unique = "UNIQUE " if spec.unique else ""
+        _execute_with_retry(cursor, f'CREATE {unique}INDEX IF NOT EXISTS "{spec.name}" '
+                                    f'ON ONLY "{spec.table}" {spec.columns}')
+
+        built = False
+        for partition in partitions:
+            child = _child_index_name(spec.name, partition)
+            built |= _build_concurrently(cursor, child, partition, spec.columns, spec.unique)
+
+            cursor.execute("""
+                SELECT 1 FROM pg_inherits
+                WHERE inhrelid = to_regclass(%s) AND inhparent = to_regclass(%s)
+            """, (f'public."{child}"', f'public."{spec.name}"'))
+            if cursor.fetchone() is None:
+                _execute_with_retry(cursor, f'ALTER INDEX "{spec.name}" ATTACH PARTITION "{child}"')
+
+        return built
+
+
+def ensure_indexes(db, specs=None):
+    """
+    Создаёт недостающие индексы приложения без блокировки операторов
+
+    Returns:
+        list: имена построенных индексов
+    """
+    if specs is None:
+        collation = db.config.get('collation', 'ru-x-icu')
+        specs = performance_indexes(collation) + tree_indexes(collation) + queue_indexes()
+    built = [spec.name for spec in specs if create_index_online(db, spec)]
+    logger.info("Индексы проверены: %s, построено: %s", len(specs), len(built))
+    return built
+
+
+def partition_name(year):
+    """Возвращает имя партиции для года поступления"""
+    return f"students_y{int(year)}"
+
+
+def is_students_partitioned(db):
+    """
+    Проверяет, является ли таблица students партиционированной
+
+    Args:
+        db: экземпляр Database
+
+    Returns:
+        bool: True для партиционированной таблицы
+    """
+    result = db.execute_query("""
+        SELECT c.relkind
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relname = 'students'
+    """)
+    return bool(result) and result[0]['relkind'] == 'p'
+
+
+def convert_students_to_partitioned(db, keep_legacy=False):
+    """
+    Преобразует обычную таблицу students в партиционированную по admission_year
+
+    Всё выполняется в одной транзакции под эксклюзивной блокировкой:
+    старая таблица переименовывается в students_legacy, создаётся
+    партиционированная students с партициями на каждый встречающийся год
+    (и следующий), данные копируются, индексы и внешние ключи пересоздаются.
+    Первичный ключ становится (id, admission_year) - ключ партиционирования
+    обязан входить в уникальные ограничения.
+
+    Args:
+        db: экземпляр Database
+        keep_legacy: не удалять students_legacy после переноса
+
+    Returns:
+        list: имена созданных партиций
+    """
+    if is_students_partitioned(db):
+        logger.info("Таблица students уже партиционирована")
+        return []
+
+    created = []
+
+    with db.transaction(timeout=0) as cursor:
+        cursor.execute("LOCK TABLE students IN ACCESS EXCLUSIVE MODE")
+
+        # Ссылки на students из других таблиц остались бы на старой таблице
+        cursor.execute("""
+            SELECT conname, conrelid::regclass::text as table_name
+            FROM pg_constraint
+            WHERE contype = 'f' AND confrelid = 'public.students'::regclass
+        """)
+        references = cursor.fetchall()
+        if references:
+            names = ', '.join(f"{r['table_name']}.{r['conname']}" for r in references)
+            raise RuntimeError(f"На students ссылаются внешние ключи: {names}")
+
+        # Запоминаем определения индексов (кроме первичного ключа) и внешних ключей
+        cursor.execute("""
+            SELECT ix.indexrelid::regclass::text as index_name,
+                   pg_get_indexdef(ix.indexrelid) as index_def,
+                   ix.indisunique as is_unique
+            FROM pg_index ix
+            WHERE ix.indrelid = 'public.students'::regclass
+              AND NOT ix.indisprimary
+        """)
+        indexes = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT conname, pg_get_constraintdef(oid) as definition
+            FROM pg_constraint
+            WHERE contype = 'f' AND conrelid = 'public.students'::regclass
+        """)
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT i.relname as index_name
+            FROM pg_index ix
+            JOIN pg_class i ON i.oid = ix.indexrelid
+            WHERE ix.indrelid = 'public.students'::regclass
+        """)
+        legacy_index_names = [row['index_name'] for row in cursor.fetchall()]
+
+        cursor.execute(f"SELECT MIN({PARTITION_KEY}) as min_year, "
+                       f"MAX({PARTITION_KEY}) as max_year FROM students")
+        bounds = cursor.fetchone()
+        current_year = datetime.date.today().year
+        first_year = bounds['min_year'] or current_year
+        last_year = max(bounds['max_year'] or current_year, current_year) + 1
+
+        # Освобождаем имена таблицы и индексов
+        cursor.execute("ALTER TABLE students RENAME TO students_legacy")
+        for index_name in legacy_index_names:
+            cursor.execute(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_legacy"')
+
+        cursor.execute(f"""
+            CREATE TABLE students (
+                LIKE students_legacy
+                INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS
+                INCLUDING STORAGE INCLUDING COMMENTS
+            ) PARTITION BY RANGE ({PARTITION_KEY})
+        """)
+        cursor.execute(f"ALTER TABLE students ADD PRIMARY KEY (id, {PARTITION_KEY})")
+
+        for year in range(first_year, last_year + 1):
+            name = partition_name(year)
+            cursor.execute(f"""
+                CREATE TABLE {name} PARTITION OF students
+                FOR VALUES FROM ({year}) TO ({year + 1})
+            """)
+            created.append(name)
+
+        cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF students DEFAULT")
+        created.append(DEFAULT_PARTITION)
+
+        cursor.execute("INSERT INTO students SELECT * FROM students_legacy")
+        logger.info("Перенесено строк в партиционированную таблицу: %s", cursor.rowcount)
+
+        # Последовательность id: serial-колонка ссылается на старую
+        # последовательность, identity-колонка получила новую
+        cursor.execute("SELECT pg_get_serial_sequence('public.students', 'id') as seq")
+        new_sequence = cursor.fetchone()['seq']
+        if new_sequence:
+            cursor.execute(
+                "SELECT setval(%s, COALESCE((SELECT MAX(id) FROM students), 0) + 1, false)",
+                (new_sequence,)
+            )
+        else:
+            cursor.execute("SELECT pg_get_serial_sequence('public.students_legacy', 'id') as seq")
+            legacy_sequence = cursor.fetchone()['seq']
+            if legacy_sequence:
+                cursor.execute(f"ALTER SEQUENCE {legacy_sequence} OWNED BY students.id")
+
+        for index in indexes:
+            if index['is_unique']:
+                # Уникальный индекс без ключа партиционирования невозможен
+                logger.warning("Уникальный индекс %s не перенесён: "
+                               "он должен включать %s", index['index_name'], PARTITION_KEY)
+                continue
+            cursor.execute(index['index_def'])
+
+        for fk in foreign_keys:
+            cursor.execute(f"ALTER TABLE students ADD CONSTRAINT {fk['conname']} {fk['definition']}")
+
+        if not keep_legacy:
+            cursor.execute("DROP TABLE students_legacy")
+
+    logger.info("Таблица students партиционирована, партиций: %s", len(created))
+    return created
+
+
+def ensure_partition(db, year):
+    """
+    Создаёт партицию для года поступления, если её ещё нет
+
+    Если в партиции по умолчанию уже лежат записи этого года, они
+    переносятся в новую партицию в той же транзакции.
+
+    Args:
+        db: экземпляр Database
+        year: год поступления
+
+    Returns:
+        bool: True, если партиция была создана
+    """
+    year = int(year)
+    name = partition_name(year)
+
+    with db.transaction(timeout=0) as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL as found", (f"public.{name}",))
+        if cursor.fetchone()['found']:
+            return False
+
+        cursor.execute(f"""
+            CREATE TABLE {name} (
+                LIKE students INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+            )
+        """)
+
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL as found",
+                       (f"public.{DEFAULT_PARTITION}",))
+        if cursor.fetchone()['found']:
+            cursor.execute(f"""
+                WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION}
+                    WHERE {PARTITION_KEY} >= %s AND {PARTITION_KEY} < %s
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+            """, (year, year + 1))
+            if cursor.rowcount:
+                logger.info("Из %s перенесено строк: %s", DEFAULT_PARTITION, cursor.rowcount)
+
+        cursor.execute(f"""
+            ALTER TABLE students ATTACH PARTITION {name}
+            FOR VALUES FROM ({year}) TO ({year + 1})
+        """)
+
+    logger.info("Создана партиция %s", name)
+    return True
+
+
+def ensure_upcoming_partitions(db, years_ahead=1):
+    """
+    Создаёт партиции на текущий и следующие годы
+
+    Запускается администратором или по расписанию
+    (python -m app.cli maintenance partitions), чтобы приём следующего
+    года сразу попадал в собственную партицию, а не в партицию по
+    умолчанию. Приложение при запуске только проверяет их наличие
+    (missing_upcoming_partitions).
+
+    Args:
+        db: экземпляр Database
+        years_ahead: на сколько лет вперёд создавать партиции
+
+    Returns:
+        list: годы, для которых партиции были созданы
+    """
+    if not is_students_partitioned(db):
+        return []
+
+    current_year = datetime.date.today().year
+    created = []
+    for year in range(current_year, current_year + years_ahead + 1):
+        if ensure_partition(db, year):
+            created.append(year)
+    return created
+
+
+def missing_upcoming_partitions(db, years_ahead=1):
+    """
+    Возвращает годы, для которых ещё нет партиций (без изменения схемы)
+
+    Args:
+        db: экземпляр Database
+        years_ahead: на сколько лет вперёд проверять партиции
+
+    Returns:
+        list: годы без партиции; пустой, если students не партиционирована
+    """
+    if not is_students_partitioned(db):
+        return []
+
+    current_year = datetime.date.today().year
+    missing = []
+    for year in range(current_year, current_year + years_ahead + 1):
+        result = db.execute_query("SELECT to_regclass(%s) IS NOT NULL as found",
+                                  (f"public.{partition_name(year)}",))
+        if not result[0]['found']:
+            missing.append(year)
+    return missing
+
+
+class Migration(NamedTuple):
+    """
+    Версия схемы: DDL в одной транзакции и индексы, строящиеся онлайн
+
+    backfill(db) - заполнение данных пачками между statements и finalize;
+    finalize - короткая завершающая транзакция (например, замена колонок).
+    """
+    version: int
+    description: str
+    statements: tuple = ()
+    indexes: tuple = ()
+    backfill: Optional[Callable] = None
+    finalize: tuple = ()
+
+
+BASE_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS institutes (
+        id SERIAL PRIMARY KEY,
+        code VARCHAR(20) NOT NULL UNIQUE,
+        name VARCHAR(255) NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS departments (
+        id SERIAL PRIMARY KEY,
+        institute_id INTEGER NOT NULL REFERENCES institutes(id),
+        code VARCHAR(20) NOT NULL,
+        name VARCHAR(255) NOT NULL,
+        UNIQUE (institute_id, code)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id SERIAL PRIMARY KEY,
+        login VARCHAR(50) NOT NULL UNIQUE,
+        password_hash VARCHAR(255) NOT NULL,
+        full_name VARCHAR(255),
+        is_active BOOLEAN NOT NULL DEFAULT TRUE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS students (
+        id SERIAL PRIMARY KEY,
+        last_name VARCHAR(100) NOT NULL,
+        initials VARCHAR(10) NOT NULL,
+        birth_year INTEGER NOT NULL,
+        phone_encrypted TEXT,
+        record_book_number_encrypted TEXT,
+        admission_year INTEGER NOT NULL,
+        group_name VARCHAR(50) NOT NULL,
+        department_id INTEGER NOT NULL REFERENCES departments(id),
+        city_before VARCHAR(100),
+        created_by INTEGER REFERENCES users(id)
+    )
+    """,
+)
+
+# Колонки с константным значением по умолчанию добавляются без
+# перезаписи таблицы (PostgreSQL 11+), поэтому блокировка кратковременная
+AUDIT_COLUMNS = (
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP",
+    "ALTER TABLE students ADD COLUMN IF NOT EXISTS created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP",
+    "ALTER TABLE students ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP",
+)
+
+
+# Зашифрованные поля - байты (формат aes-gcm, см. app/encryption.py).
+# Строки Fernet сохраняются как их ASCII-байты и по-прежнему расшифровываются.
+# ALTER COLUMN ... TYPE переписал бы всю таблицу под эксклюзивной
+# блокировкой, поэтому тип меняется онлайн: рядом добавляются колонки bytea
+# (только каталог), триггер держит их в актуальном виде при записи
+# операторов, backfill_encrypted_bytes заполняет старые строки пачками, а
+# ENCRYPTED_BYTEA_SWAP в короткой транзакции подменяет колонки.
+# BEFORE-триггер на партиционированной таблице требует PostgreSQL 13+.
+ENCRYPTED_BYTEA = (
+    """
+    DO $$
+    BEGIN
+        IF (SELECT data_type FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = 'students'
+              AND column_name = 'phone_encrypted') <> 'bytea' THEN
+            ALTER TABLE students
+                ADD COLUMN IF NOT EXISTS phone_encrypted_bytes bytea,
+                ADD COLUMN IF NOT EXISTS record_book_number_encrypted_bytes bytea;
+
+            CREATE OR REPLACE FUNCTION students_encrypted_bytes_sync() RETURNS trigger AS $fn$
+            BEGIN
+                NEW.phone_encrypted_bytes := convert_to(NEW.phone_encrypted, 'UTF8');
+                NEW.record_book_number_encrypted_bytes :=
+                    convert_to(NEW.record_book_number_encrypted, 'UTF8');
+                RETURN NEW;
+            END
+            $fn$ LANGUAGE plpgsql;
+
+            DROP TRIGGER IF EXISTS students_encrypted_bytes_sync ON students;
+            CREATE TRIGGER students_encrypted_bytes_sync
+                BEFORE INSERT OR UPDATE ON students
+                FOR EACH ROW EXECUTE FUNCTION students_encrypted_bytes_sync();
+        END IF;
+    END $$
+    """,
+)
+
+ENCRYPTED_BYTEA_SWAP = (
+    """
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_schema = 'public' AND table_name = 'students'
+                     AND column_name = 'phone_encrypted_bytes') THEN
+            DROP TRIGGER IF EXISTS students_encrypted_bytes_sync ON students;
+            ALTER TABLE students
+                DROP COLUMN phone_encrypted,
+                DROP COLUMN record_book_number_encrypted;
+            ALTER TABLE students RENAME COLUMN phone_encrypted_bytes TO phone_encrypted;
+            ALTER TABLE students
+                RENAME COLUMN record_book_number_encrypted_bytes TO record_book_number_encrypted;
+            DROP FUNCTION IF EXISTS students_encrypted_bytes_sync();
+        END IF;
+    END $$
+    """,
+)
+
+# Строк в одной транзакции заполнения
+BACKFILL_BATCH = 5000
+
+
+def backfill_encrypted_bytes(db, batch_size=BACKFILL_BATCH):
+    """
+    Заполняет bytea-копии зашифрованных полей (миграция 4)
+
+    Таблица обходится пачками по id, каждая пачка - отдельная короткая
+    транзакция, поэтому операторы не ждут, а прерванный проход можно
+    запустить снова: уже заполненные строки пропускаются.
+
+    Returns:
+        int: количество заполненных строк
+    """
+    found = db.execute_query("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'students'
+          AND column_name = 'phone_encrypted_bytes'
+    """)
+    if not found:
+        return 0
+
+    last_id = 0
+    filled = 0
+    while True:
+        with db.transaction(timeout=0) as cursor:
+            cursor.execute("""
+                WITH batch AS (
+                    SELECT id FROM students WHERE id > %s ORDER BY id LIMIT %s
+                ), filled AS (
+                    UPDATE students s SET
+                        phone_encrypted_bytes = convert_to(s.phone_encrypted, 'UTF8'),
+                        record_book_number_encrypted_bytes =
+                            convert_to(s.record_book_number_encrypted, 'UTF8')
+                    FROM batch
+                    WHERE s.id = batch.id
+                      AND (s.phone_encrypted_bytes IS NULL AND s.phone_encrypted IS NOT NULL
+                           OR s.record_book_number_encrypted_bytes IS NULL
+                              AND s.record_book_number_encrypted IS NOT NULL)
+                    RETURNING 1
+                )
+                SELECT (SELECT max(id) FROM batch) as last_id,
+                       (SELECT count(*) FROM filled) as filled
+            """, (last_id, batch_size))
+            row = cursor.fetchone()
+        if row['last_id'] is None:
+            break
+        last_id = row['last_id']
+        filled += row['filled']
+        logger.info("Заполнено bytea-колонок: %s строк, последний id %s", filled, last_id)
+
+    return filled
+
+
+# Версия строки для оптимистичной блокировки (Database.update_student_with_encryption)
+ROW_VERSION = (
+    "ALTER TABLE students ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+)
+
+# Ключ записи очереди быстрого ввода: повтор пачки после падения не задваивает её
+ENTRY_KEY = (
+    "ALTER TABLE students ADD COLUMN IF NOT EXISTS entry_key uuid",
+)
+
+
+def migrations(collation='ru-x-icu'):
+    """
+    Возвращает все миграции схемы по порядку версий
+
+    Миграции только добавляются в конец; применённую миграцию не меняют.
+    Поэтому индексы миграций записаны здесь литералами, а не берутся из
+    sort_indexes() и соседних функций: те описывают нужное сейчас
+    состояние (ensure_indexes, index_report) и меняются вместе с
+    приложением, а изменение индекса - это новая миграция (как 7).
+    """
+    return [
+        Migration(1, "Базовые таблицы", BASE_TABLES),
+        Migration(2, "Служебные колонки created_at/updated_at", AUDIT_COLUMNS),
+        Migration(3, "Индексы внешних ключей и сортировки", indexes=(
+            IndexSpec('departments_institute_id_idx', 'departments', '(institute_id)'),
+            IndexSpec('students_department_id_idx', 'students', '(department_id)'),
+            IndexSpec('students_last_name_ru_idx', 'students', f'(last_name COLLATE "{collation}", id)'),
+            IndexSpec('students_initials_sort_idx', 'students', '(initials, id)'),
+            IndexSpec('students_birth_year_sort_idx', 'students', '(birth_year, id)'),
+            IndexSpec('students_admission_year_sort_idx', 'students', '(admission_year, id)'),
+            IndexSpec('students_group_name_sort_idx', 'students', '(group_name, id)'),
+            IndexSpec('students_city_before_sort_idx', 'students', '(city_before, id)'),
+        )),
+        Migration(4, "Зашифрованные поля в bytea", ENCRYPTED_BYTEA,
+                  backfill=backfill_encrypted_bytes, finalize=ENCRYPTED_BYTEA_SWAP),
+        Migration(5, "Индекс дерева кафедр и групп", indexes=(
+            IndexSpec('students_department_group_idx', 'students',
+                      f'(department_id, group_name, last_name COLLATE "{collation}", id)'),
+        )),
+        Migration(6, "Версия строки студента", ROW_VERSION),
+        Migration(7, "Сортировка по городу с пустыми значениями",
+                  ("DROP INDEX IF EXISTS students_city_before_sort_idx",), (
+            IndexSpec('students_city_before_key_idx', 'students', "((COALESCE(city_before, '')), id)"),
+        )),
+        Migration(8, "Ключ идемпотентности быстрого ввода", ENTRY_KEY, (
+            IndexSpec('students_entry_key_idx', 'students', '(entry_key, admission_year)', unique=True),
+        )),
+    ]
+
+
+# Миграции, без которых приложение не запускается: запись студентов
+# обращается к их колонкам и без них завершалась бы ошибками SQL
+# (6 - version для оптимистичной блокировки правок, 8 - entry_key очереди
+# быстрого ввода)
+REQUIRED_MIGRATIONS = (6, 8)
+
+
+def applied_versions(db):
+    """Версии уже применённых миграций (пусто, если таблицы миграций нет)"""
+    result = db.execute_query("SELECT to_regclass(%s) IS NOT NULL as found",
+                              (f"public.{MIGRATIONS_TABLE}",))
+    if not result or not result[0]['found']:
+        return set()
+    rows = db.execute_query(f"SELECT version FROM {MIGRATIONS_TABLE}") or []
+    return {row['version'] for row in rows}
+
+
+def pending_migrations(db, collation=None):
+    """Миграции, которые ещё не применены"""
+    collation = collation or db.config.get('collation', 'ru-x-icu')
+    applied = applied_versions(db)
+    return [migration for migration in migrations(collation) if migration.version not in applied]
+
+
+def _run_statements(db, statements, lock_timeout, attempts=LOCK_RETRIES):
+    """Выполняет DDL одной транзакцией, повторяя её, если блокировку не удалось получить"""
+    if not statements:
+        return
+    for attempt in range(1, attempts + 1):
+        try:
+            with db.transaction(timeout=0) as cursor:
+                cursor.execute("SELECT set_config('lock_timeout', %s, true)", (lock_timeout,))
+                for statement in statements:
+                    cursor.execute(statement)
+            return
+        except psycopg2.errors.LockNotAvailable:
+            if attempt == attempts:
+                raise
+            logger.warning("Таблица занята, повтор миграции через %s с", attempt * 2)
+            time.sleep(attempt * 2)
+
+
+def migrate(db, target=None, lock_timeout=DEFAULT_LOCK_TIMEOUT):
+    """
+    Применяет недостающие миграции
+
+    DDL каждой миграции выполняется в одной транзакции с lock_timeout,
+    данные заполняются пачками короткими транзакциями (backfill), затем
+    короткая транзакция finalize, а индексы строятся CONCURRENTLY (см.
+    create_index_online), поэтому операторы могут работать во время
+    развёртывания: ни один шаг не переписывает таблицу под блокировкой. Версия
+    записывается в schema_migrations только после успешной сборки индексов;
+    прерванную миграцию можно просто запустить снова.
+
+    Args:
+        db: экземпляр Database
+        target: последняя применяемая версия (по умолчанию - все)
+        lock_timeout: сколько ждать блокировку таблицы
+
+    Returns:
+        list: применённые версии
+    """
+    db.execute_query(f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            seconds REAL
+        )
+    """, fetch=False)
+
+    applied = []
+    for migration in pending_migrations(db):
+        if target is not None and migration.version > target:
+            break
+
+        started = time.perf_counter()
+        logger.info("Миграция %s: %s", migration.version, migration.description)
+
+        _run_statements(db, migration.statements, lock_timeout)
+        if migration.backfill is not None:
+            migration.backfill(db)
+        _run_statements(db, migration.finalize, lock_timeout)
+
+        for spec in migration.indexes:
+            create_index_online(db, spec, lock_timeout)
+
+        seconds = time.perf_counter() - started
+        db.execute_query(f"""
+            INSERT INTO {MIGRATIONS_TABLE} (version, description, seconds)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (version) DO NOTHING
+        """, (migration.version, migration.description, round(seconds, 3)), fetch=False)
+        applied.append(migration.version)
+        logger.info("Миграция %s применена за %.1f с", migration.version, seconds)
+
+    return applied
+
+
+def index_report(db, collation=None):
+    """
+    Отчёт об индексах по статистике PostgreSQL
+
+    Статистика накапливается с момента stats_reset, поэтому «неиспользуемый»
+    индекс стоит удалять только после полного учебного цикла наблюдений.
+
+    Returns:
+        dict: unused - индексы без сканирований (для партиций суммарно по
+              родительскому индексу); missing - индексы приложения, которых
+              нет; invalid - недостроенные индексы; unindexed_foreign_keys -
+              внешние ключи без индекса; seq_scans - крупные таблицы, которые
+              чаще читаются целиком, чем по индексу; stats_reset
+    """
+    collation = collation or db.config.get('collation', 'ru-x-icu')
+
+    unused = db.execute_query("""
+        SELECT COALESCE(parent_table.relname, s.relname) as table_name,
+               COALESCE(parent_index.relname, s.indexrelname) as index_name,
+               SUM(s.idx_scan) as scans,
+               SUM(pg_relation_size(s.indexrelid)) as size_bytes
+        FROM pg_stat_user_indexes s
+        JOIN pg_index i ON i.indexrelid = s.indexrelid
+        LEFT JOIN pg_inherits inh ON inh.inhrelid = s.indexrelid
+        LEFT JOIN pg_class parent_index ON parent_index.oid = inh.inhparent
+        LEFT JOIN pg_index pi ON pi.indexrelid = inh.inhparent
+        LEFT JOIN pg_class parent_table ON parent_table.oid = pi.indrelid
+        WHERE s.schemaname = 'public'
+          AND NOT i.indisunique AND NOT i.indisprimary
+        GROUP BY 1, 2
+        HAVING SUM(s.idx_scan) = 0
+        ORDER BY size_bytes DESC
+    """) or []
+
+    invalid = db.execute_query("""
+        SELECT c.relname as index_name, t.relname as table_name
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_class t ON t.oid = i.indrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND NOT i.indisvalid
+    """) or []
+
+    existing = db.execute_query("""
+        SELECT c.relname as index_name
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relkind IN ('i', 'I')
+    """) or []
+    existing = {row['index_name'] for row in existing}
+    specs = performance_indexes(collation) + tree_indexes(collation) + queue_indexes()
+    missing = [spec._asdict() for spec in specs if spec.name not in existing]
+
+    unindexed_foreign_keys = db.execute_query("""
+        SELECT t.relname as table_name, c.conname as constraint_name, a.attname as column_name
+        FROM pg_constraint c
+        JOIN pg_class t ON t.oid = c.conrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+        WHERE c.contype = 'f' AND n.nspname = 'public' AND c.conparentid = 0
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_index i
+              WHERE i.indrelid = c.conrelid AND i.indkey[0] = c.conkey[1]
+          )
+        ORDER BY 1, 2
+    """) or []
+
+    seq_scans = db.execute_query("""
+        SELECT relname as table_name, seq_scan, seq_tup_read,
+               COALESCE(idx_scan, 0) as idx_scan, n_live_tup
+        FROM pg_stat_user_tables
+        WHERE schemaname = 'public'
+          AND n_live_tup >= %s
+          AND seq_scan > COALESCE(idx_scan, 0)
+        ORDER BY seq_tup_read DESC
+    """, (LARGE_TABLE_ROWS,)) or []
+
+    stats_reset = db.execute_query("""
+        SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()
+    """)
+
+    return {
+        'unused': unused,
+        'missing': missing,
+        'invalid': invalid,
+        'unindexed_foreign_keys': unindexed_foreign_keys,
+        'seq_scans': seq_scans,
+        'stats_reset': stats_reset[0]['stats_reset'] if stats_reset else None,
+    }
+
+
+def bloat_report(db):
+    """
+    Оценка раздувания таблиц по мёртвым строкам
+
+    Оценка грубая (по pg_stat_user_tables, без расширения pgstattuple):
+    доля мёртвых строк, умноженная на размер таблицы. Большая доля при
+    давнем last_autovacuum - повод настроить автоочистку для таблицы.
+
+    Returns:
+        list: строки по таблицам, самые раздутые первыми
+    """
+    return db.execute_query("""
+        SELECT relname as table_name, n_live_tup, n_dead_tup,
+               ROUND(n_dead_tup::numeric / NULLIF(n_live_tup + n_dead_tup, 0), 3) as dead_ratio,
+               pg_relation_size(relid) as table_bytes,
+               pg_total_relation_size(relid) as total_bytes,
+               (pg_relation_size(relid) * n_dead_tup / NULLIF(n_live_tup + n_dead_tup, 0))::bigint
+                   as estimated_bloat_bytes,
+               GREATEST(last_vacuum, last_autovacuum) as last_vacuum,
+               GREATEST(last_analyze, last_autoanalyze) as last_analyze
+        FROM pg_stat_user_tables
+        WHERE schemaname = 'public'
+        ORDER BY estimated_bloat_bytes DESC NULLS LAST
+    """) or []
+
+
+# Команды python -m app.schema -> задачи python -m app.cli maintenance
+CLI_TASKS = {
+    'migrate': 'migrate',
+    'status': 'status',
+    'convert': 'convert',
+    'ensure-partitions': 'partitions',
+    'ensure-indexes': 'indexes',
+    'index-report': 'index-report',
+    'bloat-report': 'bloat-report',
+}
+
+
+def main(argv=None):
+    """Прежняя точка входа командной строки - обёртка над app.cli maintenance"""
+    from app.cli import run_maintenance
+    return run_maintenance(argv, CLI_TASKS)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
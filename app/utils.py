@@ -1,7 +1,8 @@
 import sys
 import subprocess
 from pathlib import Path
-import re
+
+from app.validation import normalize_phone, is_valid_initials
 
 
 def check_requirements():
@@ -64,6 +65,18 @@ def check_requirements():
         return True
 
 
+class CountingWriter:
+    """Обёртка над файлом, считающая записанные байты"""
+
+    def __init__(self, file):
+        self.file = file
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return self.file.write(data)
+
+
 def create_directory_structure():
     """Создает необходимые директории"""
 
@@ -80,26 +93,10 @@ def create_directory_structure():
 
 
 def validate_phone(phone):
-    """Валидирует номер телефона"""
-    import re
-
-    # Российские номера: +7 XXX XXX-XX-XX, 8 XXX XXX-XX-XX
-    pattern = r'^(\+7|8)\s?\(?\d{3}\)?[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2}$'
-
-    if re.match(pattern, phone):
-        # Нормализуем номер
-        normalized = re.sub(r'[^\d]', '', phone)
-        if normalized.startswith('8'):
-            normalized = '7' + normalized[1:]
-        elif normalized.startswith('+7'):
-            normalized = '7' + normalized[2:]
-        return normalized
-    return None
+    """Валидирует номер телефона и возвращает его в виде 7XXXXXXXXXX"""
+    return normalize_phone(phone)
 
 
 def validate_initials(initials):
     """Валидирует инициалы в формате 'И.О.'"""
-    import re
-
-    pattern = r'^[А-ЯЁ]\.\s?[А-ЯЁ]\.$'
-    return bool(re.match(pattern, initials))
\ No newline at end of file
+    return is_valid_initials(initials)
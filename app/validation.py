@@ -0,0 +1,235 @@
+"""
+Единый модуль валидации данных студентов
+
+Правила скомпилированы один раз при импорте и используются и формой
+StudentForm, и массовой загрузкой. Для больших объёмов есть пакетный
+режим validate_columns: данные передаются по колонкам, каждая колонка
+проверяется одним проходом, а ошибки возвращаются структурированно
+(номер строки, поле, сообщение).
+"""
+
+import re
+from typing import Callable, NamedTuple, Optional
+
+INITIALS_PATTERN = re.compile(r'^[А-ЯЁ]\.\s?[А-ЯЁ]\.$')
+# Российские номера: +7 XXX XXX-XX-XX, 8 XXX XXX-XX-XX
+PHONE_PATTERN = re.compile(r'^(\+7|8)\s?\(?\d{3}\)?[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2}$')
+_NON_DIGITS = re.compile(r'\D')
+_WHITESPACE = re.compile(r'\s+')
+
+MIN_ADMISSION_AGE = 16
+
+
+class FieldError(NamedTuple):
+    """Ошибка валидации одного значения"""
+    row: int
+    field: str
+    message: str
+    value: object
+
+
+class FieldRule(NamedTuple):
+    """Правило проверки поля"""
+    required_message: Optional[str]
+    normalize: Callable
+    invalid_message: str = "Некорректное значение"
+
+
+class ValidationResult(NamedTuple):
+    """Результат пакетной проверки"""
+    columns: dict    # нормализованные колонки {поле: [значения]}
+    errors: list     # список FieldError
+    valid: list      # флаги корректности строк
+
+    @property
+    def valid_count(self):
+        return sum(self.valid)
+
+    def rows(self, valid_only=True):
+        """Перебирает строки как словари (по умолчанию только корректные)"""
+        fields = list(self.columns)
+        columns = [self.columns[field] for field in fields]
+        for index, values in enumerate(zip(*columns)):
+            if valid_only and not self.valid[index]:
+                continue
+            yield dict(zip(fields, values))
+
+
+def normalize_text(value):
+    """Обрезает пробелы по краям и схлопывает повторяющиеся пробелы"""
+    return _WHITESPACE.sub(' ', str(value).strip())
+
+
+def normalize_phone(phone):
+    """
+    Приводит телефон к каноническому виду 7XXXXXXXXXX
+
+    Returns:
+        str: нормализованный номер или None, если формат неверный
+    """
+    phone = str(phone).strip()
+    if not PHONE_PATTERN.match(phone):
+        return None
+    digits = _NON_DIGITS.sub('', phone)
+    return '7' + digits[1:]
+
+
+def normalize_initials(initials):
+    """
+    Приводит инициалы к виду 'И.О.' (без пробела)
+
+    Returns:
+        str: нормализованные инициалы или None, если формат неверный
+    """
+    initials = str(initials).strip()
+    if not INITIALS_PATTERN.match(initials):
+        return None
+    return _WHITESPACE.sub('', initials)
+
+
+def _year_normalizer(low, high):
+    """Создаёт нормализатор года в допустимом диапазоне"""
+    def normalize(value):
+        try:
+            year = int(value)
+        except (TypeError, ValueError):
+            return None
+        return year if low <= year <= high else None
+    return normalize
+
+
+def _normalize_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_valid_phone(phone):
+    """Проверяет формат телефона"""
+    return bool(PHONE_PATTERN.match(phone or ''))
+
+
+def is_valid_initials(initials):
+    """Проверяет формат инициалов 'И.О.'"""
+    return bool(INITIALS_PATTERN.match(initials or ''))
+
+
+FIELD_RULES = {
+    'last_name': FieldRule("Фамилия обязательна для заполнения", normalize_text),
+    'initials': FieldRule("Инициалы обязательны для заполнения", normalize_initials,
+                          "Инициалы должны быть в формате 'И.О.'"),
+    'birth_year': FieldRule("Год рождения обязателен", _year_normalizer(1900, 2100),
+                            "Некорректный год рождения"),
+    'phone': FieldRule("Телефон обязателен для заполнения", normalize_phone,
+                       "Некорректный формат телефона"),
+    'record_book_number': FieldRule("Номер зачетной книжки обязателен", normalize_text),
+    'admission_year': FieldRule("Год поступления обязателен", _year_normalizer(2000, 2100),
+                                "Некорректный год поступления"),
+    'group_name': FieldRule("Группа обязательна для заполнения", normalize_text),
+    'department_id': FieldRule("Выберите кафедру", _normalize_id, "Некорректная кафедра"),
+    'city_before': FieldRule("Город обязателен для заполнения", normalize_text),
+}
+
+
+def _validate_column(field, values, rule, required, errors, valid):
+    """Проверяет и нормализует одну колонку"""
+    normalize = rule.normalize
+    # Повторяющиеся значения (группы, города, годы) нормализуем один раз
+    cache = {}
+
+    def normalize_cached(value):
+        if value is None or value == '':
+            return None
+        try:
+            return cache[value]
+        except KeyError:
+            result = cache[value] = normalize(value)
+            return result
+
+    normalized = list(map(normalize_cached, values))
+
+    for index in [i for i, result in enumerate(normalized) if result is None]:
+        value = values[index]
+        if value is None or value == '':
+            if not required:
+                continue
+            message = rule.required_message
+        else:
+            message = rule.invalid_message
+        errors.append(FieldError(index, field, message, value))
+        valid[index] = False
+
+    return normalized
+
+
+def validate_columns(columns, optional_fields=()):
+    """
+    Пакетно проверяет и нормализует данные, переданные по колонкам
+
+    Args:
+        columns: словарь {поле: список значений}, все списки одной длины;
+                 поля без правил передаются без изменений
+        optional_fields: поля, которые можно оставить пустыми
+
+    Returns:
+        ValidationResult: нормализованные колонки, ошибки и флаги строк
+    """
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("Колонки должны быть одинаковой длины")
+    size = lengths.pop() if lengths else 0
+
+    errors = []
+    valid = [True] * size
+    normalized = {}
+
+    for field, values in columns.items():
+        rule = FIELD_RULES.get(field)
+        if rule is None:
+            normalized[field] = list(values)
+            continue
+        required = field not in optional_fields
+        normalized[field] = _validate_column(field, values, rule, required, errors, valid)
+
+    # Межполевая проверка: возраст на момент поступления
+    if 'birth_year' in normalized and 'admission_year' in normalized:
+        births = normalized['birth_year']
+        admissions = normalized['admission_year']
+        for index, (birth, admission) in enumerate(zip(births, admissions)):
+            if birth is not None and admission is not None and admission - birth < MIN_ADMISSION_AGE:
+                errors.append(FieldError(
+                    index, 'admission_year',
+                    f"Студент не может быть младше {MIN_ADMISSION_AGE} лет при поступлении",
+                    admission
+                ))
+                valid[index] = False
+
+    errors.sort(key=lambda error: error.row)
+    return ValidationResult(normalized, errors, valid)
+
+
+def validate_record(record, optional_fields=()):
+    """
+    Проверяет одну запись (например, данные формы)
+
+    Returns:
+        list: тексты ошибок в порядке полей
+    """
+    result = validate_columns({field: [value] for field, value in record.items()},
+                              optional_fields)
+    return [error.message for error in result.errors]
+
+
+def normalize_record(record):
+    """
+    Нормализует значения одной записи
+
+    Значения, которые не удалось нормализовать, возвращаются как есть.
+    """
+    normalized = {}
+    for field, value in record.items():
+        rule = FIELD_RULES.get(field)
+        result = rule.normalize(value) if rule and value not in (None, '') else None
+        normalized[field] = value if result is None else result
+    return normalized
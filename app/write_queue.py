@@ -0,0 +1,358 @@
+"""
+Очередь отложенной записи студентов (write-behind) для быстрого ввода
+
+Форма быстрого ввода не ждёт базу: проверенная запись кладётся в
+очередь и сразу сохраняется в локальный журнал, а фоновый поток
+шифрует записи и вставляет их пачками по batch_size в одной транзакции
+(Database.add_students_with_encryption). Если пачка не прошла из-за
+данных одной из записей, она повторяется по одной записи с точками
+сохранения (Database.add_students_with_savepoints), и ошибка остаётся
+только у своей записи - её можно исправить или удалить из очереди.
+
+Журнал - весь список ожидающих записей, зашифрованный ключом
+приложения (телефоны и номера зачёток не лежат на диске открытым
+текстом). Он перезаписывается атомарно (временный файл + os.replace)
+при каждом изменении очереди, поэтому после падения приложения
+невставленные записи поднимаются при следующем запуске.
+
+При потере соединения пачка остаётся в очереди и повторяется с
+нарастающей паузой. Повтор не задваивает записи: каждая вставляется со
+своим ключом (колонка entry_key, миграция 8, ON CONFLICT DO NOTHING).
+Поэтому безопасны и оборванный COMMIT, и падение приложения между
+COMMIT и перезаписью журнала: при следующем запуске уже вставленные
+записи просто получают свои ID.
+
+Если журнал не удаётся перезаписать (диск заполнен, нет прав), фоновый
+поток продолжает работу, а ошибка показывается в status()['journal_error'].
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+
+import psycopg2
+
+from app.database import RETRY_DELAY, is_transient_error
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+# Сколько ждать следующих записей перед отправкой неполной пачки, с
+DEFAULT_FLUSH_DELAY = 1.0
+# Наибольшая пауза между попытками при недоступной базе, с
+MAX_RETRY_DELAY = 30.0
+
+
+class WriteQueue:
+    """
+    Потокобезопасная очередь записей на вставку с фоновым потоком
+
+    Записи хранятся словарями {'key', 'student', 'error'}: key - локальный
+    идентификатор записи, error - текст ошибки вставки (None - ждёт
+    отправки). listener(saved, failed) вызывается из фонового потока
+    после каждой пачки и при смене доступности базы:
+    saved - [(key, id студента)], failed - [(key, текст ошибки)].
+    """
+
+    def __init__(self, db, encryptor, journal_path, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_delay=DEFAULT_FLUSH_DELAY, created_by=1, listener=None):
+        # Свой экземпляр Database: соединение фонового потока не пересекается с окном
+        self.db = db.clone()
+        self.encryptor = encryptor
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_delay = flush_delay
+        self.created_by = created_by
+        self.listener = listener
+        self.entries = []
+        self.saved_count = 0
+        # База недоступна, пачки ждут повтора
+        self.offline = False
+        # Текст последней ошибки записи журнала (None - журнал в порядке)
+        self.journal_error = None
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._sending = []
+        self._thread = None
+
+    # ---- журнал ----
+
+    def load(self):
+        """Поднимает записи из журнала; возвращает их количество"""
+        if not os.path.exists(self.journal_path):
+            return 0
+        with open(self.journal_path, 'rb') as journal:
+            data = journal.read()
+        if not data:
+            return 0
+        text = self.encryptor.decrypt(data)
+        if text is None:
+            raise ValueError(f"Журнал {self.journal_path} не расшифровывается ключом приложения")
+        with self._condition:
+            self.entries = json.loads(text)
+            self._condition.notify_all()
+        logger.info("Из журнала очереди поднято записей: %s", len(self.entries))
+        return len(self.entries)
+
+    def _save(self):
+        """Атомарно перезаписывает журнал (вызывается под self._condition)"""
+        if not self.entries:
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            return
+        encrypted = self.encryptor.encrypt(json.dumps(self.entries, ensure_ascii=False))
+        if isinstance(encrypted, str):
+            encrypted = encrypted.encode('ascii')
+        directory = os.path.dirname(os.path.abspath(self.journal_path))
+        os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.journal_path}.tmp"
+        with open(temporary, 'wb') as journal:
+            journal.write(encrypted)
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(temporary, self.journal_path)
+
+    # ---- интерфейс формы ----
+
+    def put(self, student):
+        """
+        Ставит проверенную запись в очередь
+
+        Запись попадает в журнал на диске до возврата из метода.
+
+        Returns:
+            str: ключ записи в очереди
+        """
+        entry = {'key': uuid.uuid4().hex, 'student': dict(student), 'error': None}
+        with self._condition:
+            self.entries.append(entry)
+            try:
+                self._save()
+            except OSError:
+                self.entries.pop()
+                raise
+            self._condition.notify_all()
+        return entry['key']
+
+    def update(self, key, student):
+        """
+        Заменяет данные записи с ошибкой и снова ставит её на отправку
+
+        Если журнал не записался, запись остаётся прежней (OSError
+        пробрасывается, как в put).
+        """
+        with self._condition:
+            for entry in self.entries:
+                if entry['key'] == key and key not in self._sending:
+                    previous = entry['student'], entry['error']
+                    entry['student'] = dict(student)
+                    entry['error'] = None
+                    try:
+                        self._save()
+                    except OSError:
+                        entry['student'], entry['error'] = previous
+                        raise
+                    self._condition.notify_all()
+                    return True
+        return False
+
+    def discard(self, key):
+        """
+        Удаляет запись из очереди (кроме отправляемой прямо сейчас)
+
+        Если журнал не записался, запись остаётся в очереди (OSError).
+        """
+        with self._condition:
+            if key in self._sending:
+                return False
+            entries = self.entries
+            self.entries = [entry for entry in entries if entry['key'] != key]
+            try:
+                self._save()
+            except OSError:
+                self.entries = entries
+                raise
+        return True
+
+    def retry_failed(self):
+        """
+        Снова ставит на отправку все записи с ошибками
+
+        Если журнал не записался, ошибки записей остаются (OSError).
+        """
+        with self._condition:
+            errors = [(entry, entry['error']) for entry in self.entries]
+            for entry in self.entries:
+                entry['error'] = None
+            try:
+                self._save()
+            except OSError:
+                for entry, error in errors:
+                    entry['error'] = error
+                raise
+            self._condition.notify_all()
+
+    def snapshot(self):
+        """Копия записей очереди для показа"""
+        with self._condition:
+            return [dict(entry) for entry in self.entries]
+
+    def status(self):
+        """Счётчики для строки состояния"""
+        with self._condition:
+            failed = sum(1 for entry in self.entries if entry['error'])
+            return {
+                'pending': len(self.entries) - failed,
+                'failed': failed,
+                'saved': self.saved_count,
+                'offline': self.offline,
+                'journal_error': self.journal_error,
+            }
+
+    # ---- фоновый поток ----
+
+    def start(self):
+        """Запускает фоновый поток записи"""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Останавливает фоновый поток после текущей пачки
+
+        Неотправленные записи остаются в журнале.
+        """
+        if self._thread is None:
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def flush(self, timeout=None):
+        """
+        Ждёт отправки всех записей без ошибок
+
+        Returns:
+            bool: очередь отправлена (False - истёк timeout)
+        """
+        with self._condition:
+            self._condition.notify_all()
+            return self._condition.wait_for(
+                lambda: not any(entry['error'] is None for entry in self.entries), timeout)
+
+    def _ready(self):
+        return [entry for entry in self.entries if entry['error'] is None]
+
+    def _next_batch(self):
+        """Ждёт записи и набирает пачку; None - поток останавливается"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._stopping or self._ready())
+            if self._stopping:
+                return None
+            # Операторы вводят записи подряд - даём набраться пачке
+            if len(self._ready()) < self.batch_size:
+                self._condition.wait_for(
+                    lambda: self._stopping or len(self._ready()) >= self.batch_size,
+                    self.flush_delay)
+            batch = self._ready()[:self.batch_size]
+            self._sending = [entry['key'] for entry in batch]
+            return [dict(entry) for entry in batch]
+
+    def _run(self):
+        delay = RETRY_DELAY
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                results = self._write([entry['student'] for entry in batch],
+                                      [entry['key'] for entry in batch])
+            except psycopg2.Error as e:
+                if not is_transient_error(e):
+                    results = [(None, str(e).strip())] * len(batch)
+                else:
+                    self._set_offline(True, e)
+                    with self._condition:
+                        self._sending = []
+                        self._condition.wait_for(lambda: self._stopping, delay)
+                    delay = min(delay * 2, MAX_RETRY_DELAY)
+                    continue
+            except Exception as e:
+                # Ошибка шифрования и т.п. - не повод терять записи
+                logger.error("Ошибка отправки пачки очереди: %s", e)
+                results = [(None, str(e))] * len(batch)
+
+            delay = RETRY_DELAY
+            self._set_offline(False)
+            self._apply(batch, results)
+
+    def _write(self, students, keys):
+        """Вставляет пачку; при ошибке данных - по одной записи"""
+        try:
+            ids = self.db.add_students_with_encryption(students, self.encryptor, self.created_by,
+                                                       keys=keys)
+            return [(student_id, None) for student_id in ids]
+        except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+            logger.warning("Пачка из %s записей отклонена (%s), вставка по одной",
+                           len(students), e)
+            return self.db.add_students_with_savepoints(students, self.encryptor, self.created_by,
+                                                        keys=keys)
+
+    def _apply(self, batch, results):
+        saved = []
+        failed = []
+        errors = {}
+        for entry, (student_id, error) in zip(batch, results):
+            if student_id is not None:
+                saved.append((entry['key'], student_id))
+            else:
+                failed.append((entry['key'], error))
+                errors[entry['key']] = error
+
+        saved_keys = {key for key, _ in saved}
+        with self._condition:
+            self.entries = [entry for entry in self.entries if entry['key'] not in saved_keys]
+            for entry in self.entries:
+                if entry['key'] in errors:
+                    entry['error'] = errors[entry['key']]
+            self.saved_count += len(saved)
+            self._sending = []
+            try:
+                self._save()
+                self.journal_error = None
+            except OSError as e:
+                # Записи в памяти верны; в журнале остались уже вставленные,
+                # но их повтор после перезапуска не задвоится (entry_key)
+                logger.error("Не удалось перезаписать журнал очереди %s: %s", self.journal_path, e)
+                self.journal_error = str(e)
+            self._condition.notify_all()
+
+        if failed:
+            logger.warning("Очередь: не сохранено записей: %s", len(failed))
+        self._notify(saved, failed)
+
+    def _set_offline(self, offline, error=None):
+        with self._condition:
+            changed = self.offline != offline
+            self.offline = offline
+        if not changed:
+            return
+        if offline:
+            logger.warning("Очередь записи: база недоступна (%s), записи ждут в журнале", error)
+        else:
+            logger.info("Очередь записи: соединение восстановлено")
+        self._notify([], [])
+
+    def _notify(self, saved, failed):
+        if self.listener is not None:
+            try:
+                self.listener(saved, failed)
+            except Exception as e:
+                logger.error("Ошибка обработчика очереди: %s", e)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк алгоритмов шифрования (app/encryption.py)
+
+Для каждого алгоритма шифруются и расшифровываются N телефонов и
+номеров зачёток, как при импорте и показе набора. Печатается скорость
+(значений в секунду) и размер хранимого значения - средний и суммарный
+для N записей с двумя зашифрованными полями, то есть прирост таблицы
+students на набор.
+
+    python benchmarks/bench_encryption.py --count 200000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.encryption import BACKENDS, DataEncryptor
+
+# Один ключ для всех алгоритмов - как в приложении
+KEY = DataEncryptor().key
+
+
+def make_values(count, seed=42):
+    """Телефоны и номера зачёток в формате приложения"""
+    rng = random.Random(seed)
+    phones = [f"+7{rng.randint(9000000000, 9999999999)}" for _ in range(count)]
+    record_books = [f"{rng.randint(2015, 2025)}-{rng.randint(0, 99999):05d}" for _ in range(count)]
+    return phones + record_books
+
+
+def stored_size(value):
+    """Размер значения в колонке: строка Fernet или байты aes-gcm"""
+    return len(value.encode('ascii') if isinstance(value, str) else value)
+
+
+def bench(backend, values, repeat):
+    encryptor = DataEncryptor(key=KEY, backend=backend)
+    encrypt_times = []
+    decrypt_times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encrypted = [encryptor.encrypt(value) for value in values]
+        encrypt_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        decrypted = [encryptor.decrypt(value) for value in encrypted]
+        decrypt_times.append(time.perf_counter() - started)
+
+    assert decrypted == values
+    sizes = [stored_size(value) for value in encrypted]
+    return {
+        'encrypt': len(values) / statistics.median(encrypt_times),
+        'decrypt': len(values) / statistics.median(decrypt_times),
+        'average_size': statistics.mean(sizes),
+        'total_size': sum(sizes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк алгоритмов шифрования")
+    parser.add_argument('--count', type=int, default=50000, help="Количество студентов")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    values = make_values(args.count)
+    plain_size = statistics.mean(len(value.encode('utf-8')) for value in values)
+    print(f"Студентов: {args.count}, значений: {len(values)}, "
+          f"средний открытый текст: {plain_size:.1f} байт\n")
+
+    print(f"{'алгоритм':<10} {'шифр., знач/с':>14} {'расшифр., знач/с':>17} "
+          f"{'байт/знач':>10} {'МБ на набор':>12}")
+    for backend in BACKENDS:
+        result = bench(backend, values, args.repeat)
+        print(f"{backend:<10} {result['encrypt']:>14,.0f} {result['decrypt']:>17,.0f} "
+              f"{result['average_size']:>10.1f} {result['total_size'] / 1024 / 1024:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк запросов по когорте: обычная таблица против партиционированной
+
+Создаёт в отдельной схеме bench_partitioning три копии синтетической
+таблицы студентов и замеряет задержку типичных запросов по году
+поступления:
+    plain          - обычная таблица без индексов по году
+    plain_indexed  - обычная таблица с индексом (admission_year, last_name)
+    partitioned    - таблица, партиционированная по admission_year
+
+Рабочие таблицы приложения не затрагиваются.
+
+Запуск:
+    python benchmarks/bench_partitioning.py --rows 200000 --iterations 50
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from config.settings import load_config
+from app.database import Database
+
+SCHEMA = 'bench_partitioning'
+FIRST_YEAR = 2010
+LAST_YEAR = 2025
+
+QUERIES = {
+    'count': "SELECT COUNT(*) FROM {table} WHERE admission_year = %s",
+    'cohort_page': """
+        SELECT id, last_name, initials, group_name
+        FROM {table}
+        WHERE admission_year = %s
+        ORDER BY last_name
+        LIMIT 100
+    """,
+    'two_years': """
+        SELECT COUNT(*) FROM {table}
+        WHERE admission_year >= %s AND admission_year <= %s + 1
+    """,
+}
+
+
+def prepare(db, rows):
+    """Создаёт и заполняет тестовые таблицы"""
+
+    print(f"Подготовка данных: {rows} строк...")
+    fill = f"""
+        INSERT INTO {{table}} (id, last_name, initials, birth_year, admission_year, group_name)
+        SELECT g,
+               'Фамилия' || substr(md5(g::text), 1, 8),
+               'И.О.',
+               1990 + g %% 15,
+               {FIRST_YEAR} + g %% {LAST_YEAR - FIRST_YEAR + 1},
+               'ГР-' || (g %% 300)
+        FROM generate_series(1, %s) g
+    """
+    columns = """
+        id integer NOT NULL,
+        last_name varchar(100) NOT NULL,
+        initials varchar(10) NOT NULL,
+        birth_year integer NOT NULL,
+        admission_year integer NOT NULL,
+        group_name varchar(50) NOT NULL
+    """
+
+    with db.transaction() as cursor:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+
+        cursor.execute(f"CREATE TABLE {SCHEMA}.plain ({columns}, PRIMARY KEY (id))")
+        cursor.execute(f"CREATE TABLE {SCHEMA}.plain_indexed ({columns}, PRIMARY KEY (id))")
+        cursor.execute(f"""
+            CREATE TABLE {SCHEMA}.partitioned ({columns}, PRIMARY KEY (id, admission_year))
+            PARTITION BY RANGE (admission_year)
+        """)
+        for year in range(FIRST_YEAR, LAST_YEAR + 1):
+            cursor.execute(f"""
+                CREATE TABLE {SCHEMA}.partitioned_y{year} PARTITION OF {SCHEMA}.partitioned
+                FOR VALUES FROM ({year}) TO ({year + 1})
+            """)
+
+        for table in ('plain', 'plain_indexed', 'partitioned'):
+            cursor.execute(fill.format(table=f"{SCHEMA}.{table}"), (rows,))
+
+        cursor.execute(f"CREATE INDEX ON {SCHEMA}.plain_indexed (admission_year, last_name)")
+        cursor.execute(f"CREATE INDEX ON {SCHEMA}.partitioned (last_name)")
+
+    # Свежая статистика нужна планировщику для честного сравнения
+    db.execute_query(f"ANALYZE {SCHEMA}.plain", fetch=False)
+    db.execute_query(f"ANALYZE {SCHEMA}.plain_indexed", fetch=False)
+    db.execute_query(f"ANALYZE {SCHEMA}.partitioned", fetch=False)
+
+
+def scanned_relations(cursor, query, params):
+    """Возвращает количество таблиц/партиций в плане запроса"""
+    cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+    plan = cursor.fetchone()['QUERY PLAN'][0]['Plan']
+
+    relations = set()
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if 'Relation Name' in node:
+            relations.add(node['Relation Name'])
+        stack.extend(node.get('Plans', []))
+    return len(relations)
+
+
+def run(db, iterations):
+    """Замеряет задержку запросов и печатает таблицу результатов"""
+
+    db.connect()
+    cursor = db.cursor
+
+    print(f"\n{'запрос':<12} {'таблица':<14} {'медиана, мс':>12} {'p95, мс':>10} {'таблиц в плане':>15}")
+    print("-" * 67)
+
+    try:
+        for name, template in QUERIES.items():
+            for table in ('plain', 'plain_indexed', 'partitioned'):
+                query = template.format(table=f"{SCHEMA}.{table}")
+                timings = []
+
+                for _ in range(iterations):
+                    year = random.randint(FIRST_YEAR, LAST_YEAR - 1)
+                    params = (year, year) if name == 'two_years' else (year,)
+                    started = time.perf_counter()
+                    cursor.execute(query, params)
+                    cursor.fetchall()
+                    timings.append((time.perf_counter() - started) * 1000)
+
+                timings.sort()
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                params = (FIRST_YEAR, FIRST_YEAR) if name == 'two_years' else (FIRST_YEAR,)
+                relations = scanned_relations(cursor, query, params)
+                print(f"{name:<12} {table:<14} {statistics.median(timings):>12.2f} "
+                      f"{p95:>10.2f} {relations:>15}")
+    finally:
+        db.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк партиционирования по году поступления")
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--keep', action='store_true', help="Не удалять схему бенчмарка")
+    args = parser.parse_args()
+
+    config = load_config()
+    db = Database(config['database'])
+
+    prepare(db, args.rows)
+    run(db, args.iterations)
+
+    if not args.keep:
+        db.execute_query(f"DROP SCHEMA {SCHEMA} CASCADE", fetch=False)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
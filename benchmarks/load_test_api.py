@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест HTTP API (app/api.py)
+
+Несколько асинхронных клиентов в течение заданного времени выполняют
+смесь запросов: первая страница списка и переход по курсорам next,
+поиск по году поступления, подсчёт и статистика. Клиент запоминает ETag
+ответов и при --revalidate повторяет запросы с If-None-Match, как это
+делал бы браузер или кэширующий прокси.
+
+В конце печатается число запросов в секунду, перцентили задержки по
+видам запросов и распределение кодов ответа.
+
+Сервис должен быть запущен отдельно и подключён к локальному PostgreSQL:
+    python -m app.api --port 8080
+    python benchmarks/load_test_api.py --url http://127.0.0.1:8080 --concurrency 32 --duration 30
+
+Для сравнения с отключённым кэшем ответов запустите сервис с API_CACHE_TTL=0.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+
+try:
+    import aiohttp
+except ImportError:
+    print("Для нагрузочного теста установите aiohttp: pip install aiohttp")
+    sys.exit(1)
+
+FIRST_YEAR = 2015
+LAST_YEAR = 2025
+PAGES_TO_FOLLOW = 3
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.bytes = 0
+
+
+async def request(session, stats, etags, kind, url, params, revalidate):
+    """Выполняет один запрос и записывает задержку"""
+    key = (url, tuple(sorted(params.items())))
+    headers = {}
+    if revalidate and key in etags:
+        headers['If-None-Match'] = etags[key]
+
+    started = time.perf_counter()
+    try:
+        async with session.get(url, params=params, headers=headers) as response:
+            body = await response.read()
+            stats.latencies[kind].append(time.perf_counter() - started)
+            stats.statuses[response.status] += 1
+            stats.bytes += len(body)
+            if 'ETag' in response.headers:
+                etags[key] = response.headers['ETag']
+            if response.status == 200:
+                return await response.json(content_type=None)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        stats.errors[type(e).__name__] += 1
+    return None
+
+
+async def scenario_pages(session, base, stats, etags, revalidate):
+    """Первая страница и несколько следующих по курсору"""
+    params = {'sort': random.choice(['last_name', 'admission_year', 'group_name']), 'limit': '100'}
+    for page in range(PAGES_TO_FOLLOW):
+        data = await request(session, stats, etags, 'page' if page else 'first_page',
+                             f"{base}/api/students", params, revalidate)
+        if not data or not data.get('next'):
+            return
+        params = dict(params, after=data['next'])
+
+
+async def scenario_search(session, base, stats, etags, revalidate):
+    year = str(random.randint(FIRST_YEAR, LAST_YEAR))
+    await request(session, stats, etags, 'search', f"{base}/api/students",
+                  {'admission_year': year, 'limit': '100'}, revalidate)
+
+
+async def scenario_count(session, base, stats, etags, revalidate):
+    year = str(random.randint(FIRST_YEAR, LAST_YEAR))
+    await request(session, stats, etags, 'count', f"{base}/api/students/count",
+                  {'admission_year': year}, revalidate)
+
+
+async def scenario_stats(session, base, stats, etags, revalidate):
+    await request(session, stats, etags, 'stats', f"{base}/api/stats", {}, revalidate)
+
+
+SCENARIOS = [
+    (scenario_pages, 50),
+    (scenario_search, 30),
+    (scenario_count, 15),
+    (scenario_stats, 5),
+]
+
+
+async def client(session, base, stats, deadline, revalidate):
+    etags = {}
+    functions = [function for function, _ in SCENARIOS]
+    weights = [weight for _, weight in SCENARIOS]
+    while time.perf_counter() < deadline:
+        scenario = random.choices(functions, weights)[0]
+        await scenario(session, base, stats, etags, revalidate)
+
+
+async def run(args):
+    stats = Stats()
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            client(session, args.url.rstrip('/'), stats, deadline, args.revalidate)
+            for _ in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    return stats, elapsed
+
+
+def report(stats, elapsed, args):
+    total = sum(len(values) for values in stats.latencies.values())
+    print(f"\nКлиентов: {args.concurrency}, длительность: {elapsed:.1f} с, "
+          f"If-None-Match: {'да' if args.revalidate else 'нет'}")
+    print(f"Запросов: {total}, {total / elapsed:.1f} запр/с, "
+          f"{stats.bytes / elapsed / 1024:.1f} КБ/с")
+    print(f"Коды ответа: {dict(sorted(stats.statuses.items()))}")
+    if stats.errors:
+        print(f"Ошибки клиента: {dict(stats.errors)}")
+
+    print(f"\n{'запрос':<12} {'кол-во':>8} {'median':>10} {'p95':>10} {'p99':>10}")
+    for kind, values in sorted(stats.latencies.items()):
+        print(f"{kind:<12} {len(values):>8} "
+              f"{statistics.median(values) * 1000:>8.1f}мс "
+              f"{percentile(values, 0.95) * 1000:>8.1f}мс "
+              f"{percentile(values, 0.99) * 1000:>8.1f}мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест HTTP API")
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--revalidate', action='store_true',
+                        help="Повторять запросы с If-None-Match")
+    args = parser.parse_args()
+
+    stats, elapsed = asyncio.run(run(args))
+    report(stats, elapsed, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест: N одновременных операторов настольного приложения
+
+Каждый виртуальный оператор - поток со своим экземпляром Database и
+кэшем запросов, как отдельная копия приложения на рабочем месте: без
+пула, с новым соединением на каждый запрос. Оператор в цикле выполняет
+смесь действий главного окна со случайной паузой (--think, в среднем):
+
+    list    - первая страница списка (get_students_page)
+    search  - поиск по году поступления, группе или городу
+    add     - добавление студента с шифрованием
+    edit    - чтение записи с версией и обновление (конфликт правок
+              с другим оператором считается отдельно, не ошибкой)
+    delete  - удаление записи, добавленной тестом
+
+Число операторов увеличивается по шагам (--operators 1,5,10,25,50).
+Для каждого шага печатаются действия в секунду, перцентили задержки,
+доля ошибок и число соединений с сервером (пик и среднее по
+pg_stat_activity раз в --sample секунд) против max_connections.
+Рост прекращается, если доля ошибок превысила --max-error-rate.
+
+Записи теста помечаются группой с префиксом НАГР- и удаляются в конце.
+Запускать на локальной или тестовой базе:
+
+    python benchmarks/load_test_operators.py --operators 1,5,10,25,50 --duration 20
+    python benchmarks/load_test_operators.py --operators 50,100 --pool 20   # общий пул, как у API
+
+С --pool операторов может быть больше, чем соединений: лишние ждут
+свободное соединение (BlockingPool), а не получают ошибку. Время
+ожидания входит в задержку действия и печатается отдельной строкой.
+
+Потоки делят один GIL: на сотнях операторов часть задержки даёт сам
+клиент, поэтому смотрите и на число активных соединений на сервере.
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import psycopg2
+
+from config.settings import load_config
+from app.database import ConcurrentUpdateError, Database
+from app.encryption import get_encryptor
+from app.query_cache import QueryCache
+
+GROUP_PREFIX = 'НАГР-'
+FIRST_YEAR = 2015
+LAST_YEAR = 2025
+CITIES = ['Москва', 'Томск', 'Омск', 'Казань', 'Самара', 'Пермь']
+LAST_NAMES = ['Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев']
+
+ACTIONS = [
+    ('list', 35),
+    ('search', 30),
+    ('add', 15),
+    ('edit', 15),
+    ('delete', 5),
+]
+
+CONNECTIONS_QUERY = """
+    SELECT count(*) as total,
+           count(*) FILTER (WHERE state = 'active') as active,
+           count(*) FILTER (WHERE wait_event_type = 'Lock') as waiting
+    FROM pg_stat_activity
+    WHERE backend_type = 'client backend' AND pid <> pg_backend_pid()
+"""
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+class Stats:
+    """Результаты одного шага; потоки операторов пишут под замком"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.conflicts = 0
+        self.connections = []
+        # Ожидание соединения из пула, с (только с --pool)
+        self.pool_waits = []
+
+    def record(self, action, seconds=None, error=None):
+        with self.lock:
+            if error is None:
+                self.latencies[action].append(seconds)
+            elif isinstance(error, ConcurrentUpdateError):
+                self.conflicts += 1
+            else:
+                self.errors[f"{action}: {type(error).__name__}"] += 1
+
+    @property
+    def completed(self):
+        return sum(len(values) for values in self.latencies.values())
+
+    @property
+    def failed(self):
+        return sum(self.errors.values())
+
+
+class BlockingPool:
+    """
+    Пул соединений, в котором поток ждёт свободное соединение
+
+    ThreadedConnectionPool при исчерпании бросает PoolError, а
+    Database.connect принимает это за недоступный сервер и повторяет с
+    паузами - насыщение пула выглядело бы как ошибки подключения с
+    завышенной задержкой. Здесь лишние операторы ждут в очереди, а время
+    ожидания записывается отдельно.
+    """
+
+    def __init__(self, config, size):
+        self.size = size
+        self._pool = Database.create_pool(config, 1, size)
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._waits = []
+
+    def getconn(self):
+        started = time.perf_counter()
+        self._slots.acquire()
+        with self._lock:
+            self._waits.append(time.perf_counter() - started)
+        try:
+            return self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, connection, close=False):
+        try:
+            self._pool.putconn(connection, close=close)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+    def take_waits(self):
+        """Ожидания с прошлого вызова"""
+        with self._lock:
+            waits, self._waits = self._waits, []
+        return waits
+
+
+class Workload:
+    """Общее для операторов: кафедры, шифратор и записи, добавленные тестом"""
+
+    def __init__(self, config, departments, encryptor, pool=None, cache=True):
+        self.config = config
+        self.departments = departments
+        self.encryptor = encryptor
+        self.pool = pool
+        self.cache = cache
+        self.created = []
+        self.created_lock = threading.Lock()
+
+    def database(self):
+        cache = QueryCache.from_config(self.config) if self.cache else None
+        return Database(self.config, pool=self.pool, cache=cache)
+
+    def new_student(self, rng):
+        department = rng.choice(self.departments)
+        return {
+            'last_name': rng.choice(LAST_NAMES),
+            'initials': f"{rng.choice('АБВГДЕИКЛМНОПРС')}.{rng.choice('АБВГДЕИКЛМНОПРС')}.",
+            'birth_year': rng.randint(1995, 2007),
+            'phone': f"7{rng.randint(9000000000, 9999999999)}",
+            'record_book_number': f"{rng.randint(FIRST_YEAR, LAST_YEAR)}-{rng.randint(0, 99999):05d}",
+            'admission_year': rng.randint(FIRST_YEAR, LAST_YEAR),
+            'group_name': f"{GROUP_PREFIX}{rng.randint(1, 20)}",
+            'department_id': department['id'],
+            'city_before': rng.choice(CITIES),
+        }
+
+    def pick_created(self, rng, remove=False):
+        with self.created_lock:
+            if not self.created:
+                return None
+            index = rng.randrange(len(self.created))
+            if remove:
+                return self.created.pop(index)
+            return self.created[index]
+
+
+def perform(action, db, workload, rng, think):
+    """
+    Одно действие оператора
+
+    Returns:
+        float: сколько секунд из действия оператор «держал форму открытой»
+               (не входит в задержку) или None - действие недоступно
+               (нет записей теста)
+    """
+    pause = 0.0
+    if action == 'list':
+        db.get_students_page(limit=100)
+    elif action == 'search':
+        field = rng.choice(['admission_year', 'group_name', 'city_before'])
+        value = {
+            'admission_year': lambda: rng.randint(FIRST_YEAR, LAST_YEAR),
+            'group_name': lambda: f"{GROUP_PREFIX}{rng.randint(1, 20)}",
+            'city_before': lambda: rng.choice(CITIES),
+        }[field]()
+        db.search_students({field: value}, limit=100)
+    elif action == 'add':
+        student_id = db.add_student_with_encryption(workload.new_student(rng), workload.encryptor)
+        with workload.created_lock:
+            workload.created.append(student_id)
+    elif action == 'edit':
+        student_id = workload.pick_created(rng)
+        if student_id is None:
+            return None
+        current = db.get_student_version(student_id)
+        if current is None:
+            return None
+        # Форма открыта - за это время запись может изменить другой оператор
+        pause = rng.uniform(0, think)
+        time.sleep(pause)
+        db.update_student_with_encryption(
+            student_id, {'group_name': f"{GROUP_PREFIX}{rng.randint(1, 20)}"},
+            workload.encryptor, version=current['version'])
+    elif action == 'delete':
+        student_id = workload.pick_created(rng, remove=True)
+        if student_id is None:
+            return None
+        db.delete_students([student_id])
+    return pause
+
+
+def operator(number, workload, stats, deadline, think, seed):
+    rng = random.Random(seed * 1000 + number)
+    db = workload.database()
+    names = [name for name, _ in ACTIONS]
+    weights = [weight for _, weight in ACTIONS]
+    # Операторы начинают не одновременно
+    time.sleep(rng.uniform(0, think))
+    while time.monotonic() < deadline:
+        action = rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            pause = perform(action, db, workload, rng, think)
+            if pause is not None:
+                stats.record(action, time.perf_counter() - started - pause)
+        except Exception as e:
+            stats.record(action, error=e)
+        if think:
+            time.sleep(rng.expovariate(1 / think))
+
+
+def sample_connections(config, stats, stop, interval):
+    """Раз в interval секунд считает клиентские соединения сервера"""
+    connection = psycopg2.connect(**Database.connection_params(config))
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            while not stop.wait(interval):
+                cursor.execute(CONNECTIONS_QUERY)
+                stats.connections.append(cursor.fetchone())
+    finally:
+        connection.close()
+
+
+def run_step(workload, operators, duration, think, sample, seed):
+    stats = Stats()
+    stop = threading.Event()
+    sampler = threading.Thread(target=sample_connections,
+                               args=(workload.config, stats, stop, sample), daemon=True)
+    sampler.start()
+
+    if workload.pool is not None:
+        # Ожидания предыдущего шага и подготовки не считаем
+        workload.pool.take_waits()
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=operator, args=(number, workload, stats, deadline, think, seed),
+                                name=f"operator-{number}", daemon=True)
+               for number in range(operators)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    sampler.join()
+    if workload.pool is not None:
+        stats.pool_waits = workload.pool.take_waits()
+    return stats, elapsed
+
+
+def report_step(operators, stats, elapsed, max_connections):
+    attempts = stats.completed + stats.failed
+    error_rate = stats.failed / attempts if attempts else 0
+    print(f"\n=== Операторов: {operators}, {elapsed:.1f} с ===")
+    print(f"Действий: {stats.completed}, {stats.completed / elapsed:.1f} в секунду; "
+          f"ошибок: {stats.failed} ({error_rate:.1%}); конфликтов правок: {stats.conflicts}")
+    if stats.connections:
+        totals = [row['total'] for row in stats.connections]
+        print(f"Соединений: пик {max(totals)} из {max_connections}, "
+              f"в среднем {statistics.mean(totals):.1f}; "
+              f"активных пик {max(row['active'] for row in stats.connections)}, "
+              f"ждут блокировку пик {max(row['waiting'] for row in stats.connections)}")
+    if stats.pool_waits:
+        waited = [value for value in stats.pool_waits if value > 0.001]
+        print(f"Ожидание соединения пула: {len(waited)} из {len(stats.pool_waits)} запросов "
+              f"({len(waited) / len(stats.pool_waits):.0%}); "
+              f"median {statistics.median(stats.pool_waits) * 1000:.1f}мс, "
+              f"p95 {percentile(stats.pool_waits, 0.95) * 1000:.1f}мс, "
+              f"макс. {max(stats.pool_waits) * 1000:.1f}мс")
+    for error, count in stats.errors.most_common(5):
+        print(f"  ошибка {error}: {count}")
+
+    print(f"{'действие':<10} {'кол-во':>8} {'median':>10} {'p95':>10} {'p99':>10}")
+    for action, _ in ACTIONS:
+        values = stats.latencies.get(action)
+        if not values:
+            continue
+        print(f"{action:<10} {len(values):>8} "
+              f"{statistics.median(values) * 1000:>8.1f}мс "
+              f"{percentile(values, 0.95) * 1000:>8.1f}мс "
+              f"{percentile(values, 0.99) * 1000:>8.1f}мс")
+    return error_rate
+
+
+def summary(rows, max_connections):
+    print(f"\n=== Итог (max_connections = {max_connections}) ===")
+    print(f"{'операторов':>10} {'действ/с':>10} {'p95':>10} {'p99':>10} {'ошибки':>8} {'соед. пик':>10} "
+          f"{'пул p95':>10}")
+    for operators, stats, elapsed, error_rate in rows:
+        values = [value for values in stats.latencies.values() for value in values]
+        p95 = f"{percentile(values, 0.95) * 1000:.1f}мс" if values else '-'
+        p99 = f"{percentile(values, 0.99) * 1000:.1f}мс" if values else '-'
+        peak = max((row['total'] for row in stats.connections), default=0)
+        pool_p95 = (f"{percentile(stats.pool_waits, 0.95) * 1000:.1f}мс"
+                    if stats.pool_waits else '-')
+        print(f"{operators:>10} {stats.completed / elapsed:>10.1f} {p95:>10} {p99:>10} "
+              f"{error_rate:>8.1%} {peak:>10} {pool_p95:>10}")
+
+
+def cleanup(config):
+    db = Database(config)
+    db.execute_query("DELETE FROM students WHERE group_name LIKE %s",
+                     (f"{GROUP_PREFIX}%",), fetch=False, timeout=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест одновременных операторов")
+    parser.add_argument('--operators', default='1,5,10,25,50',
+                        help="Число операторов по шагам через запятую")
+    parser.add_argument('--duration', type=float, default=20, help="Длительность шага, с")
+    parser.add_argument('--think', type=float, default=1.0,
+                        help="Средняя пауза оператора между действиями, с (0 - без пауз)")
+    parser.add_argument('--pool', type=int, default=0,
+                        help="Общий пул соединений такого размера (0 - как в приложении, без пула)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Без кэша запросов (кэш включается QUERY_CACHE_TTL)")
+    parser.add_argument('--sample', type=float, default=0.5,
+                        help="Период замера pg_stat_activity, с")
+    parser.add_argument('--max-error-rate', type=float, default=0.5,
+                        help="Прекратить рост, когда доля ошибок выше")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    # Ошибки подключения считает тест; журнал приложения их только дублировал бы
+    logging.getLogger('app').setLevel(logging.CRITICAL)
+
+    config = load_config()
+    db_config = config['database']
+    db = Database(db_config)
+    departments = db.get_departments()
+    if not departments:
+        print("В базе нет кафедр - заполните справочники перед тестом")
+        return 1
+    max_connections = db.execute_query("SHOW max_connections")[0]['max_connections']
+
+    steps = [int(value) for value in args.operators.split(',')]
+    pool = BlockingPool(db_config, args.pool) if args.pool else None
+    cache = not args.no_cache and QueryCache.from_config(db_config) is not None
+    workload = Workload(db_config, departments, get_encryptor(**config['encryption']),
+                        pool=pool, cache=cache)
+
+    print(f"Шаги: {steps}, {args.duration:.0f} с на шаг, пауза {args.think} с, "
+          f"{'пул ' + str(args.pool) if pool else 'без пула'}, "
+          f"кэш {'включён' if cache else 'выключен'}")
+
+    rows = []
+    try:
+        for operators in steps:
+            stats, elapsed = run_step(workload, operators, args.duration, args.think,
+                                      args.sample, args.seed)
+            error_rate = report_step(operators, stats, elapsed, max_connections)
+            rows.append((operators, stats, elapsed, error_rate))
+            if error_rate > args.max_error_rate:
+                print(f"\nДоля ошибок {error_rate:.0%} - дальнейшее увеличение числа операторов прекращено")
+                break
+    finally:
+        if pool is not None:
+            pool.closeall()
+        cleanup(db_config)
+
+    summary(rows, max_connections)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
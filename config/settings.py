@@ -1,5 +1,12 @@
 import os
+import sys
+import copy
+import json
+import atexit
+import queue
+import datetime
 import logging
+import logging.handlers
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -11,14 +18,15 @@ def load_config():
     env_path = Path('.') / '.env'
 
     if not env_path.exists():
-        # Создаём пример .env файла, если его нет
+        # Создаём пример .env файла, если его нет. Сообщения идут в stderr:
+        # в stdout командная строка пишет данные (app.cli search, export --output -)
         example_path = Path('.') / '.env.example'
         if example_path.exists():
             import shutil
             shutil.copy(example_path, env_path)
-            print("📄 Создан файл .env из примера. Заполните его!")
+            print("📄 Создан файл .env из примера. Заполните его!", file=sys.stderr)
         else:
-            print("⚠️  Файл .env не найден. Использую значения по умолчанию")
+            print("⚠️  Файл .env не найден. Использую значения по умолчанию", file=sys.stderr)
 
     # Загружаем переменные окружения
     load_dotenv()
@@ -30,31 +38,185 @@ def load_config():
             'name': os.getenv('DB_NAME', 'student_db_2024'),
             'user': os.getenv('DB_USER', 'postgres'),
             'password': os.getenv('DB_PASSWORD', ''),
+            # Collation для русской сортировки фамилий (ICU)
+            'collation': os.getenv('DB_COLLATION', 'ru-x-icu'),
+            # Кэш результатов запросов: время жизни, с (0 - выключен) и размер.
+            # По умолчанию выключен: чужие правки видны только через ttl
+            'cache_ttl': float(os.getenv('QUERY_CACHE_TTL', 0)),
+            'cache_size': int(os.getenv('QUERY_CACHE_SIZE', 256)),
+            # Таймаут запроса по умолчанию, мс (0 - без ограничения)
+            'statement_timeout': int(os.getenv('DB_STATEMENT_TIMEOUT', 30000)),
+            # Реплики для чтения: строки подключения через запятую (см. app/replicas.py),
+            # допустимое отставание и период проверки, с
+            'replicas': [dsn.strip() for dsn in os.getenv('DB_REPLICAS', '').split(',') if dsn.strip()],
+            'replica_max_lag': float(os.getenv('DB_REPLICA_MAX_LAG', 5)),
+            'replica_check_interval': float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 5)),
+        },
+        # Таймауты запросов по экранам и операциям, мс (0 - без ограничения)
+        'timeouts': {
+            'page': int(os.getenv('TIMEOUT_PAGE', 10000)),
+            'search': int(os.getenv('TIMEOUT_SEARCH', 20000)),
+            'export': int(os.getenv('TIMEOUT_EXPORT', 600000)),
+            'duplicates': int(os.getenv('TIMEOUT_DUPLICATES', 120000)),
+            # Пакетные задания командной строки
+            'batch': int(os.getenv('TIMEOUT_BATCH', 0)),
         },
         'encryption': {
             'key_file': os.getenv('ENCRYPTION_KEY_FILE', 'secret.key'),
+            # Алгоритм для новых значений: fernet или aes-gcm (см. app/encryption.py)
+            'backend': os.getenv('ENCRYPTION_BACKEND', 'fernet').lower(),
         },
         'app': {
             'log_level': os.getenv('LOG_LEVEL', 'INFO'),
             'export_dir': os.getenv('EXPORT_DIR', 'exports'),
+            # Показ телефонов: сколько секунд и сколько значений держать
+            # расшифрованными (app/plaintext_cache.py)
+            'phone_reveal_ttl': float(os.getenv('PHONE_REVEAL_TTL', 60)),
+            'phone_reveal_cache_size': int(os.getenv('PHONE_REVEAL_CACHE_SIZE', 200)),
+        },
+        # Очередь быстрого ввода (app/write_queue.py): зашифрованный журнал,
+        # размер пачки и ожидание неполной пачки, с
+        'write_queue': {
+            'journal': os.getenv('WRITE_QUEUE_JOURNAL', 'pending_students.journal'),
+            'batch_size': int(os.getenv('WRITE_QUEUE_BATCH_SIZE', 50)),
+            'flush_delay': float(os.getenv('WRITE_QUEUE_FLUSH_DELAY', 1.0)),
+        },
+        'api': {
+            'host': os.getenv('API_HOST', '127.0.0.1'),
+            'port': int(os.getenv('API_PORT', 8080)),
+            'pool_min': int(os.getenv('API_POOL_MIN', 2)),
+            'pool_max': int(os.getenv('API_POOL_MAX', 10)),
+            # Время жизни закэшированного ответа, с (0 - без кэша)
+            'cache_ttl': float(os.getenv('API_CACHE_TTL', 5)),
+        },
+        'diagnostics': {
+            # off | cprofile | sampling
+            'profile': os.getenv('APP_PROFILE', 'off').lower(),
+            'tracemalloc': os.getenv('APP_TRACEMALLOC', '0').lower() in ('1', 'true', 'yes'),
+            'dir': os.getenv('PROFILE_DIR', 'logs'),
+            'sample_interval': float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.005)),
+            # Порог зависания цикла событий, с (0 - сторож выключен)
+            'stall_threshold': float(os.getenv('STALL_THRESHOLD', 0.5)),
         }
     }
 
     return config
 
 
+class JsonFormatter(logging.Formatter):
+    """Форматирует записи журнала как JSON-строки (по одной на строку файла)"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Кладёт записи в очередь фонового потока
+
+    В отличие от стандартного QueueHandler, не склеивает трассировку
+    исключения с текстом сообщения, чтобы JSON-формат получил её отдельным полем.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# Фоновый поток записи журнала (один на процесс)
+_log_listener = None
+
+
+def _create_file_handler():
+    """Создаёт обработчик файла журнала с ротацией по размеру или по времени"""
+
+    log_file = os.getenv('LOG_FILE', 'app.log')
+    backup_count = int(os.getenv('LOG_BACKUP_COUNT', 5))
+
+    if os.getenv('LOG_ROTATION', 'size').lower() == 'time':
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file,
+            when=os.getenv('LOG_ROTATE_WHEN', 'midnight'),
+            backupCount=backup_count,
+            encoding='utf-8'
+        )
+
+    return logging.handlers.RotatingFileHandler(
+        log_file,
+        maxBytes=int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+        backupCount=backup_count,
+        encoding='utf-8'
+    )
+
+
 def setup_logging():
-    """Настраивает логирование"""
+    """
+    Настраивает асинхронное логирование
+
+    Вызывающий поток только кладёт запись в очередь; запись на диск и в
+    консоль выполняет фоновый поток QueueListener, так что логирование не
+    задерживает запросы к БД и перерисовку интерфейса.
+
+    Переменные окружения:
+        LOG_LEVEL: уровень (INFO по умолчанию)
+        LOG_FILE: файл журнала (app.log)
+        LOG_FORMAT: text или json (JSON-строки для машинного разбора)
+        LOG_ROTATION: size (по размеру, LOG_MAX_BYTES) или time (LOG_ROTATE_WHEN)
+        LOG_BACKUP_COUNT: сколько старых файлов хранить
+    """
+    global _log_listener
 
     log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
+    root_logger = logging.getLogger()
+    root_logger.setLevel(getattr(logging, log_level, logging.INFO))
+
+    if _log_listener is not None:
+        return logging.getLogger(__name__)
 
-    logging.basicConfig(
-        level=getattr(logging, log_level, logging.INFO),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('app.log', encoding='utf-8'),
-            logging.StreamHandler()
-        ]
+    text_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    file_handler = _create_file_handler()
+    if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(text_formatter)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(text_formatter)
+
+    log_queue = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
     )
+    _log_listener.start()
+    # При выходе дописываем оставшиеся в очереди записи
+    atexit.register(stop_logging)
+
+    root_logger.addHandler(_QueueHandler(log_queue))
+
+    return logging.getLogger(__name__)
+
+
+def stop_logging():
+    """Останавливает фоновый поток журнала, дописав оставшиеся записи"""
+    global _log_listener
 
-    return logging.getLogger(__name__)
\ No newline at end of file
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
@@ -0,0 +1,128 @@
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+    QPushButton, QMessageBox, QTreeWidget, QTreeWidgetItem,
+    QHeaderView
+)
+from PyQt5.QtCore import Qt
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicatesDialog(QDialog):
+    """Окно просмотра найденных дубликатов студентов"""
+
+    def __init__(self, db, groups, students, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.groups = groups
+        self.students = students
+        # ID студентов, удалённых из этого окна
+        self.deleted_ids = []
+
+        self.setup_ui()
+        self.fill_tree()
+
+    def setup_ui(self):
+        """Настраивает интерфейс окна"""
+
+        self.setWindowTitle("Дубликаты студентов")
+        self.resize(900, 550)
+
+        layout = QVBoxLayout()
+
+        exact = sum(1 for group in self.groups if group.kind == 'exact')
+        fuzzy = len(self.groups) - exact
+        summary = QLabel(f"Найдено групп: точных - {exact}, похожих написаний - {fuzzy}.\n"
+                         "Отметьте лишние записи и удалите их.")
+        layout.addWidget(summary)
+
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(7)
+        self.tree.setHeaderLabels([
+            "Группа / ID", "Фамилия", "Инициалы", "Год рождения",
+            "Год поступления", "Группа", "Город"
+        ])
+        self.tree.header().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.tree)
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addStretch()
+
+        self.delete_button = QPushButton("🗑️ Удалить отмеченные")
+        self.delete_button.clicked.connect(self.delete_checked)
+        buttons_layout.addWidget(self.delete_button)
+
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.accept)
+        buttons_layout.addWidget(close_button)
+
+        layout.addLayout(buttons_layout)
+        self.setLayout(layout)
+
+    def fill_tree(self):
+        """Заполняет дерево группами дубликатов"""
+        self.tree.clear()
+        kinds = {'exact': "Точные", 'fuzzy': "Похожие"}
+
+        for group in self.groups:
+            student_ids = [sid for sid in group.student_ids if sid not in self.deleted_ids]
+            if len(student_ids) < 2:
+                continue
+
+            group_item = QTreeWidgetItem([f"{kinds[group.kind]}: {group.description}"])
+            group_item.setFirstColumnSpanned(True)
+            self.tree.addTopLevelItem(group_item)
+
+            for student_id in student_ids:
+                student = self.students[student_id]
+                item = QTreeWidgetItem([
+                    str(student_id),
+                    student['last_name'],
+                    student['initials'],
+                    str(student['birth_year']),
+                    str(student['admission_year']),
+                    student['group_name'],
+                    student['city_before'] or '',
+                ])
+                item.setData(0, Qt.UserRole, student_id)
+                item.setCheckState(0, Qt.Unchecked)
+                group_item.addChild(item)
+
+            group_item.setExpanded(True)
+
+    def checked_ids(self):
+        """Возвращает ID отмеченных записей"""
+        student_ids = []
+        for i in range(self.tree.topLevelItemCount()):
+            group_item = self.tree.topLevelItem(i)
+            for j in range(group_item.childCount()):
+                item = group_item.child(j)
+                if item.checkState(0) == Qt.Checked:
+                    student_ids.append(item.data(0, Qt.UserRole))
+        return sorted(set(student_ids))
+
+    def delete_checked(self):
+        """Удаляет отмеченные записи одним запросом"""
+        student_ids = self.checked_ids()
+        if not student_ids:
+            QMessageBox.warning(self, "Предупреждение", "Отметьте записи для удаления")
+            return
+
+        reply = QMessageBox.question(
+            self, "Подтверждение удаления",
+            f"Удалить отмеченные записи ({len(student_ids)})?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        try:
+            deleted = self.db.delete_students(student_ids)
+            self.deleted_ids.extend(deleted)
+            self.fill_tree()
+
+        except Exception as e:
+            logger.error("Ошибка удаления дубликатов: %s", e)
+            QMessageBox.critical(self, "Ошибка", f"Ошибка удаления: {e}")
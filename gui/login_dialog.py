@@ -135,12 +135,12 @@ class LoginDialog(QDialog):
             # TODO: Реализовать проверку хэша с помощью bcrypt
 
             # Если пользователь найден - успешная аутентификация
-            logger.info(f"Пользователь {username} вошел в систему")
+            logger.info("Пользователь %s вошел в систему", username)
             self.login_successful.emit(username, user.get('role', 'user'))
             self.accept()
 
         except Exception as e:
-            logger.error(f"Ошибка аутентификации: {e}")
+            logger.error("Ошибка аутентификации: %s", e)
             QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к БД: {e}")
 
     def keyPressEvent(self, event):
@@ -1,20 +1,62 @@
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QTableWidget, QTableWidgetItem,
+    QPushButton, QTableView, QTreeView, QAbstractItemView,
     QMessageBox, QMenuBar, QMenu, QStatusBar,
     QLabel, QSplitter, QHeaderView, QTabWidget,
-    QDialog
+    QDialog, QInputDialog, QApplication, QComboBox, QActionGroup
 )
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, QObject, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon
 import logging
 
 from gui.student_form import StudentForm
+from gui.duplicates_dialog import DuplicatesDialog
+from gui.widgets.student_table_model import StudentTableModel, PHONE_COLUMN, COLUMNS
+from gui.widgets.student_tree_model import StudentTreeModel
+from gui.stall_monitor import StallMonitor
+from gui.query_runner import QueryRunner
+from gui.phone_reveal import PhoneRevealer
+from gui.login_dialog import LoginDialog
+from app.database import ConcurrentUpdateError, QueryCancelledError, QueryTimeoutError
 from app.encryption import get_encryptor
+from app.deduplication import find_duplicate_students
+from app.export import export_students_csv
+from app.profiling import Profiler
+from app.write_queue import WriteQueue
+from app.plaintext_cache import PlaintextCache
 
 logger = logging.getLogger(__name__)
 
 
+# Колонки таблицы, сортируемые на сервере: номер колонки -> поле
+SORTABLE_COLUMNS = {
+    0: 'id',
+    1: 'last_name',
+    2: 'initials',
+    3: 'birth_year',
+    4: 'admission_year',
+    5: 'group_name',
+    8: 'city_before',
+}
+PAGE_SIZE = 100
+# Фильтры панели над таблицей: поле -> подпись
+LOCAL_FILTERS = {
+    'group_name': "Группа:",
+    'city_before': "Город:",
+    'admission_year': "Год поступления:",
+}
+# Подписи полей студента для окна конфликта правок
+FIELD_LABELS = dict({field: title for title, field in COLUMNS if field}, department_id="Кафедра")
+# Сколько ждать отправки очереди быстрого ввода при закрытии окна, с
+QUEUE_CLOSE_TIMEOUT = 5
+
+
+class WriteQueueSignals(QObject):
+    """Переносит уведомления очереди записи из её потока в поток окна"""
+
+    changed = pyqtSignal(list, list)
+
+
 class MainWindow(QMainWindow):
     """Главное окно приложения"""
 
@@ -22,11 +64,41 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.config = config
         self.db = db
+        # Фильтры последнего поиска (пусто - полный список)
+        self.current_filters = {}
+        # Сортировка на сервере и состояние keyset-пагинации
+        self.sort_by = 'last_name'
+        self.sort_descending = False
+        self.last_loaded = None
+        self.has_more = False
+        # Локальная сортировка загруженных строк: список (поле, по_убыванию)
+        self.local_sort = []
+        # Профилирование действий (меню «Диагностика», APP_PROFILE)
+        self.profiler = Profiler.from_config(config.get('diagnostics'))
+        # Долгие запросы выполняются в фоне с кнопкой «Отмена»;
+        # таймауты по операциям, мс (config['timeouts'])
+        self.runner = QueryRunner(self, db)
+        self.timeouts = config.get('timeouts', {})
+        self.close_requested = False
+        # Очередь отложенной записи для быстрого ввода и открытая форма ввода
+        self.write_queue = None
+        self.rapid_form = None
+        # Показ телефонов видимых строк: расшифрованные значения живут
+        # только в этом кэше и стираются при блокировке и закрытии окна
+        self.phone_cache = PlaintextCache.from_config(config.get('app', {}))
+        self.phone_revealer = None
+        # Перерисовка видимых телефонов раз в TTL: истёкшие значения
+        # запрашиваются заново, а не остаются на экране
+        self.phone_refresh_timer = QTimer(self)
+        self.phone_refresh_timer.setInterval(int(self.phone_cache.ttl * 1000))
+        self.phone_refresh_timer.timeout.connect(lambda: self.table.viewport().update())
 
         self.setup_ui()
         self.setup_menu()
         self.setup_toolbar()
         self.setup_statusbar()
+        self.setup_stall_monitor()
+        self.setup_write_queue()
 
         # Загружаем данные
         QTimer.singleShot(100, self.load_data)
@@ -50,9 +122,18 @@ class MainWindow(QMainWindow):
         control_panel = self.create_control_panel()
         main_layout.addLayout(control_panel)
 
-        # Таблица студентов
+        # Мгновенные фильтры по загруженным строкам
+        filter_panel = self.create_filter_panel()
+        main_layout.addLayout(filter_panel)
+
+        # Таблица студентов и дерево по подразделениям - на вкладках
         self.table = self.create_students_table()
-        main_layout.addWidget(self.table)
+        self.tree = self.create_students_tree()
+        self.tabs = QTabWidget()
+        self.tabs.addTab(self.table, "Список")
+        self.tabs.addTab(self.tree, "По подразделениям")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+        main_layout.addWidget(self.tabs)
 
         # Статистика
         self.stats_label = QLabel()
@@ -68,7 +149,7 @@ class MainWindow(QMainWindow):
         buttons = [
             ("➕ Добавить", self.add_student, "Добавить нового студента"),
             ("✏️ Редактировать", self.edit_student, "Редактировать выбранного студента"),
-            ("🗑️ Удалить", self.delete_student, "Удалить выбранного студента"),
+            ("🗑️ Удалить", self.delete_student, "Удалить выбранных студентов"),
             ("🔍 Поиск", self.show_search_dialog, "Поиск студентов"),
             ("📤 Экспорт", self.export_data, "Экспорт данных"),
             ("🔄 Обновить", self.load_data, "Обновить данные"),
@@ -84,35 +165,90 @@ class MainWindow(QMainWindow):
 
         return layout
 
+    def create_filter_panel(self):
+        """Создает панель мгновенных фильтров по загруженным строкам"""
+
+        layout = QHBoxLayout()
+        self.filter_boxes = {}
+
+        for field, label in LOCAL_FILTERS.items():
+            layout.addWidget(QLabel(label))
+            box = QComboBox()
+            box.setMinimumWidth(120)
+            box.addItem("Все", None)
+            box.currentIndexChanged.connect(self.apply_local_filters)
+            layout.addWidget(box)
+            self.filter_boxes[field] = box
+
+        reset_button = QPushButton("Сбросить")
+        reset_button.setToolTip("Сбросить фильтры и локальную сортировку")
+        reset_button.clicked.connect(self.reset_local_view)
+        layout.addWidget(reset_button)
+
+        layout.addStretch()
+
+        return layout
+
     def create_students_table(self):
         """Создает таблицу для отображения студентов"""
 
-        table = QTableWidget()
-        table.setColumnCount(10)
+        # Данные хранятся в колоночном кэше модели, таблица только рисует видимые строки
+        self.model = StudentTableModel(self)
 
-        # Изменяем заголовки - вместо "Имя" используем "Инициалы"
-        headers = [
-            "ID", "Фамилия", "Инициалы", "Год рождения",
-            "Год поступления", "Группа", "Институт", "Кафедра",
-            "Город", "Телефон"
-        ]
-
-        table.setHorizontalHeaderLabels(headers)
+        table = QTableView()
+        table.setModel(self.model)
 
         # Настройка таблицы
         table.setAlternatingRowColors(True)
-        table.setSelectionBehavior(QTableWidget.SelectRows)
-        table.setSelectionMode(QTableWidget.SingleSelection)
-        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
 
-        # Автоматическое растяжение колонок
+        # Ширина колонок по заголовкам: ResizeToContents на больших
+        # моделях заставил бы Qt перебирать все строки
         header = table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(QHeaderView.Interactive)
         header.setSectionResizeMode(1, QHeaderView.Stretch)  # Фамилия
-        header.setSectionResizeMode(9, QHeaderView.Stretch)  # Телефон
+        header.setSectionResizeMode(PHONE_COLUMN, QHeaderView.Stretch)  # Телефон
+
+        # Сортировка по клику на заголовок: локально, если загружен весь
+        # список, иначе на сервере
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(1, Qt.AscendingOrder)
+        header.sectionClicked.connect(self.sort_by_column)
+
+        # Следующая страница подгружается при прокрутке до конца
+        table.verticalScrollBar().valueChanged.connect(self.on_table_scrolled)
 
         return table
 
+    def create_students_tree(self):
+        """Создает дерево институт → кафедра → группа → студенты"""
+
+        # Ветки читаются из базы только при раскрытии
+        self.tree_model = StudentTreeModel(self.db, self, timeout=self.timeouts.get('page'))
+        self.tree_model.load_failed.connect(
+            lambda message: self.statusBar().showMessage(f"Не удалось загрузить ветку: {message}", 5000))
+
+        tree = QTreeView()
+        tree.setModel(self.tree_model)
+        tree.setAlternatingRowColors(True)
+        tree.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        # Удаление, перевод и смена года - для выделенных студентов, как в таблице
+        tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        # Одинаковая высота строк: Qt не измеряет каждую строку при прокрутке
+        tree.setUniformRowHeights(True)
+        tree.header().setStretchLastSection(False)
+        tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        tree.doubleClicked.connect(self.on_tree_double_clicked)
+
+        # Следующая страница группы подгружается при прокрутке до конца
+        tree.verticalScrollBar().valueChanged.connect(self.on_tree_scrolled)
+
+        return tree
+
     def setup_menu(self):
         """Настраивает меню"""
 
@@ -122,14 +258,29 @@ class MainWindow(QMainWindow):
         file_menu = menubar.addMenu("Файл")
         file_menu.addAction("Экспорт в Word", self.export_to_word)
         file_menu.addAction("Экспорт в Excel", self.export_to_excel)
+        file_menu.addAction("Экспорт в CSV", self.export_to_csv)
+        file_menu.addAction("Экспорт в CSV (gzip)", lambda: self.export_to_csv(compress=True))
         file_menu.addSeparator()
+        lock_action = file_menu.addAction("Заблокировать", self.lock_window)
+        lock_action.setShortcut("Ctrl+L")
         file_menu.addAction("Выход", self.close)
 
         # Меню Данные
         data_menu = menubar.addMenu("Данные")
         data_menu.addAction("Добавить студента", self.add_student)
+        data_menu.addAction("Быстрый ввод...", self.rapid_entry)
         data_menu.addAction("Редактировать студента", self.edit_student)
-        data_menu.addAction("Удалить студента", self.delete_student)
+        data_menu.addAction("Удалить студентов", self.delete_student)
+        data_menu.addSeparator()
+        self.reveal_action = data_menu.addAction("Показывать телефоны")
+        self.reveal_action.setCheckable(True)
+        self.reveal_action.toggled.connect(self.set_phone_reveal)
+        data_menu.addSeparator()
+        data_menu.addAction("Перевести в группу...", self.move_selected_to_group)
+        data_menu.addAction("Перевести на кафедру...", self.move_selected_to_department)
+        data_menu.addAction("Изменить год поступления...", self.change_selected_admission_year)
+        data_menu.addSeparator()
+        data_menu.addAction("Найти дубликаты...", self.show_duplicates)
         data_menu.addSeparator()
         data_menu.addAction("Обновить данные", self.load_data)
 
@@ -141,6 +292,26 @@ class MainWindow(QMainWindow):
         search_menu.addSeparator()
         search_menu.addAction("Расширенный поиск", self.show_advanced_search)
 
+        # Меню Диагностика
+        diagnostics_menu = menubar.addMenu("Диагностика")
+        modes = QActionGroup(self)
+        for mode, title in [('off', "Профилирование выключено"),
+                            ('cprofile', "Профилирование: cProfile"),
+                            ('sampling', "Профилирование: сэмплирование")]:
+            action = diagnostics_menu.addAction(title)
+            action.setCheckable(True)
+            action.setChecked(self.profiler.mode == mode)
+            action.triggered.connect(lambda checked, mode=mode: self.profiler.set_mode(mode))
+            modes.addAction(action)
+        diagnostics_menu.addSeparator()
+        memory_action = diagnostics_menu.addAction("Снимки памяти (tracemalloc)")
+        memory_action.setCheckable(True)
+        memory_action.setChecked(self.profiler.memory)
+        memory_action.toggled.connect(self.profiler.set_memory)
+        diagnostics_menu.addSeparator()
+        diagnostics_menu.addAction("Последние отчёты...", self.show_profile_reports)
+        diagnostics_menu.addAction("Статистика кэша запросов", self.show_cache_stats)
+
         # Меню Справка
         help_menu = menubar.addMenu("Справка")
         help_menu.addAction("О программе", self.show_about)
@@ -175,56 +346,424 @@ class MainWindow(QMainWindow):
         self.db_status = QLabel("БД: ❌")
         self.record_count = QLabel("Записей: 0")
 
+        self.stall_count = QLabel("Зависания: 0")
+        self.stall_count.setToolTip("Сколько раз интерфейс не отвечал дольше порога")
+
+        self.queue_status = QLabel()
+        self.queue_status.hide()
+
         self.statusBar().addPermanentWidget(self.db_status)
         self.statusBar().addPermanentWidget(self.record_count)
+        self.statusBar().addPermanentWidget(self.queue_status)
+        self.statusBar().addPermanentWidget(self.stall_count)
+
+    def setup_stall_monitor(self):
+        """Запускает сторожа зависаний цикла событий"""
+        threshold = (self.config.get('diagnostics') or {}).get('stall_threshold', 0.5)
+        self.stall_monitor = None
+        if threshold <= 0:
+            self.stall_count.hide()
+            return
+
+        self.stall_monitor = StallMonitor(threshold, self)
+        self.stall_monitor.stall_detected.connect(self.on_stall_detected)
+        self.stall_monitor.start()
+
+    def setup_write_queue(self):
+        """
+        Поднимает очередь быстрого ввода
+
+        Записи, оставшиеся в журнале после прошлого сеанса, сразу
+        отправляются в базу.
+        """
+        settings = self.config.get('write_queue', {})
+        self.queue_signals = WriteQueueSignals(self)
+        self.queue_signals.changed.connect(self.on_queue_changed)
+
+        try:
+            self.write_queue = WriteQueue(
+                self.db,
+                get_encryptor(**self.config['encryption']),
+                settings.get('journal', 'pending_students.journal'),
+                batch_size=settings.get('batch_size', 50),
+                flush_delay=settings.get('flush_delay', 1.0),
+                listener=self.queue_signals.changed.emit,
+            )
+            recovered = self.write_queue.load()
+            self.write_queue.start()
+        except Exception as e:
+            logger.error("Очередь быстрого ввода недоступна: %s", e)
+            self.write_queue = None
+            return
+
+        if recovered:
+            self.statusBar().showMessage(
+                f"Из журнала восстановлено записей: {recovered}, отправляются в базу", 5000)
+        self.update_queue_status()
+
+    def update_queue_status(self):
+        """Показывает в строке состояния неотправленные записи очереди"""
+        status = self.write_queue.status()
+        if not status['pending'] and not status['failed'] and not status['journal_error']:
+            self.queue_status.hide()
+            return
+        text = f"Очередь: {status['pending']}"
+        if status['failed']:
+            text += f", ошибок: {status['failed']}"
+        if status['offline']:
+            text += " (нет связи)"
+        if status['journal_error']:
+            text += " (журнал не записан)"
+        self.queue_status.setText(text)
+        self.queue_status.setToolTip(status['journal_error'] or "")
+        self.queue_status.show()
+
+    def on_queue_changed(self, saved, failed):
+        """Очередь отправила пачку или сменилась доступность базы"""
+        self.update_queue_status()
+        if self.rapid_form is not None:
+            self.rapid_form.refresh_queue_status()
+        elif saved:
+            # Записи из журнала прошлого сеанса дошли до базы
+            self.load_data()
+
+    def set_phone_reveal(self, enabled):
+        """Показывает телефоны видимых строк или скрывает их"""
+        if not enabled:
+            self.hide_phones()
+            return
+
+        if self.phone_revealer is None:
+            try:
+                encryptor = get_encryptor(**self.config['encryption'])
+            except Exception as e:
+                logger.error("Ошибка загрузки ключа шифрования: %s", e)
+                QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить ключ шифрования: {e}")
+                self.reveal_action.setChecked(False)
+                return
+            self.phone_revealer = PhoneRevealer(self.db, encryptor, self.phone_cache,
+                                                timeout=self.timeouts.get('page'), parent=self)
+            self.phone_revealer.revealed.connect(self.model.phones_changed)
+            self.phone_revealer.failed.connect(
+                lambda message: self.statusBar().showMessage(f"Не удалось прочитать телефоны: {message}", 5000))
+            self.model.phones_requested.connect(self.phone_revealer.request)
+
+        self.model.show_phones(self.phone_cache)
+        self.phone_refresh_timer.start()
+        logger.info("Включён показ телефонов")
+
+    def hide_phones(self):
+        """Скрывает телефоны и стирает все расшифрованные значения"""
+        self.phone_refresh_timer.stop()
+        self.model.show_phones(None)
+        if self.phone_revealer is not None:
+            # Поток останавливается до очистки, чтобы не дописать кэш после неё
+            self.phone_revealer.stop()
+        self.phone_cache.wipe()
+        self.reveal_action.blockSignals(True)
+        self.reveal_action.setChecked(False)
+        self.reveal_action.blockSignals(False)
+
+    def lock_window(self):
+        """Блокирует окно до повторного входа, стирая расшифрованные телефоны"""
+        if self.runner.busy:
+            return
+        self.hide_phones()
+        self.hide()
+        logger.info("Окно заблокировано")
+
+        if LoginDialog(self.db).exec_() == QDialog.Accepted:
+            self.show()
+            return
+        # Вход отменён - завершаем работу, как при выходе
+        self.close()
+        QApplication.instance().quit()
+
+    def on_stall_detected(self, duration, slot):
+        """Обновляет счётчик зависаний в строке состояния"""
+        self.stall_count.setText(f"Зависания: {self.stall_monitor.stall_count}")
+        self.stall_count.setToolTip(f"Последнее: {duration:.1f} с в {slot}\n"
+                                    f"{self.stall_monitor.stalls.format()}")
+
+    def closeEvent(self, event):
+        """Останавливает сторожа зависаний при закрытии окна"""
+        if self.runner.busy:
+            # Окно закроется, когда прерванный запрос вернёт управление
+            self.close_requested = True
+            self.runner.cancel()
+            event.ignore()
+            return
+        if self.stall_monitor is not None:
+            self.stall_monitor.stop()
+        self.hide_phones()
+        if self.write_queue is not None:
+            # Неотправленные записи останутся в журнале до следующего запуска
+            if not self.write_queue.status()['offline']:
+                self.write_queue.flush(QUEUE_CLOSE_TIMEOUT)
+            self.write_queue.stop(QUEUE_CLOSE_TIMEOUT)
+        super().closeEvent(event)
 
     def load_data(self):
         """Загружает данные из базы"""
+        if self.runner.busy:
+            return
+        self.current_filters = {}
+        self.reload_students()
+        if self.tree_model.populated:
+            self.reload_tree()
+
+    def on_tab_changed(self, index):
+        """Дерево читается из базы при первом открытии вкладки"""
+        if self.tabs.widget(index) is self.tree and not self.tree_model.populated:
+            self.reload_tree()
+
+    def reload_tree(self):
+        """Перечитывает счётчики институтов и кафедр"""
+        try:
+            self.tree_model.reload()
+        except Exception as e:
+            logger.error("Ошибка загрузки дерева: %s", e)
+            self.show_query_error("Не удалось загрузить подразделения", e)
+
+    def on_tree_scrolled(self, value):
+        """Подгружает следующую страницу группы, когда дерево прокручено до конца"""
+        if value == self.tree.verticalScrollBar().maximum():
+            viewport = self.tree.viewport()
+            last_row = self.tree.indexAt(viewport.rect().bottomLeft())
+            self.tree_model.fetch_more_below(last_row)
+
+    def on_tree_double_clicked(self, index):
+        """Двойной щелчок по студенту открывает форму редактирования"""
+        if self.tree_model.student_id(index) is not None:
+            self.edit_student()
+
+    def refresh_filter_choices(self):
+        """Заполняет списки фильтров значениями из загруженных строк"""
+        for field, box in self.filter_boxes.items():
+            current = box.currentData()
+            box.blockSignals(True)
+            box.clear()
+            box.addItem("Все", None)
+            for value in self.model.distinct(field):
+                if value is not None:
+                    box.addItem(str(value), value)
+            index = box.findData(current) if current is not None else 0
+            box.setCurrentIndex(max(index, 0))
+            box.blockSignals(False)
+
+    def local_filters(self):
+        """Текущие значения панели фильтров"""
+        return {field: box.currentData() for field, box in self.filter_boxes.items()}
+
+    def apply_local_filters(self):
+        """Применяет фильтры панели к загруженным строкам без запроса к серверу"""
+        self.model.apply(self.local_filters(), self.local_sort)
+        self.update_record_count()
+
+    def reset_local_view(self):
+        """Сбрасывает локальные фильтры и сортировку"""
+        for box in self.filter_boxes.values():
+            box.blockSignals(True)
+            box.setCurrentIndex(0)
+            box.blockSignals(False)
+        self.local_sort = []
+        self.model.apply({}, [])
+        self.show_sort_indicator()
+        self.update_record_count()
+
+    def run_query(self, action, label, operation):
+        """
+        Выполняет operation(db) в фоне с кнопкой «Отмена»
+
+        Args:
+            action: имя действия для профилировщика
+            label: текст окна ожидания
+            operation: функция, принимающая экземпляр Database
+        """
+        def profiled(db):
+            with self.profiler.profile(action):
+                return operation(db)
 
         try:
-            students = self.db.get_students(limit=100)
-
-            self.table.setRowCount(len(students))
-
-            for row, student in enumerate(students):
-                # Используем initials вместо first_name
-                self.table.setItem(row, 0, QTableWidgetItem(str(student['id'])))
-                self.table.setItem(row, 1, QTableWidgetItem(student['last_name']))
-                self.table.setItem(row, 2, QTableWidgetItem(student['initials']))
-                self.table.setItem(row, 3, QTableWidgetItem(str(student['birth_year'])))
-                self.table.setItem(row, 4, QTableWidgetItem(str(student['admission_year'])))
-                self.table.setItem(row, 5, QTableWidgetItem(student['group_name']))
-                self.table.setItem(row, 6, QTableWidgetItem(student['institute_name']))
-                self.table.setItem(row, 7, QTableWidgetItem(student['department_name']))
-                self.table.setItem(row, 8, QTableWidgetItem(student['city_before']))
-
-                # Телефон показываем как "зашифровано" или пустое
-                phone_item = QTableWidgetItem("***")
-                phone_item.setToolTip("Телефон зашифрован")
-                self.table.setItem(row, 9, phone_item)
-
-            # Обновляем статистику
-            self.record_count.setText(f"Записей: {len(students)}")
+            return self.runner.run(label, profiled)
+        finally:
+            if self.close_requested:
+                QTimer.singleShot(0, self.close)
+
+    def show_query_error(self, message, error):
+        """Сообщает об ошибке запроса; отмена и таймаут - без окна ошибки"""
+        if isinstance(error, QueryCancelledError):
+            self.statusBar().showMessage("Операция отменена", 3000)
+        elif isinstance(error, QueryTimeoutError):
+            QMessageBox.warning(self, "Долгий запрос",
+                                f"{error}.\nУточните фильтры поиска или повторите позже.")
+        else:
+            QMessageBox.critical(self, "Ошибка", f"{message}: {error}")
+
+    def reload_students(self):
+        """Загружает первую страницу с текущими фильтрами и сортировкой"""
+        if self.runner.busy:
+            return
+
+        action = 'search' if self.current_filters else 'load'
+        request = self.page_request(after=None)
+        try:
+            students = self.run_query(action, "Загрузка студентов...",
+                                      lambda db: db.get_students_page(**request))
+            self.remember_page(students)
+            self.show_students(students)
+
             self.db_status.setText("БД: ✅")
             self.statusBar().showMessage(f"Загружено {len(students)} записей", 3000)
 
-            logger.info(f"Загружено {len(students)} студентов")
+            logger.info("Загружено %s студентов", len(students))
 
         except Exception as e:
-            logger.error(f"Ошибка загрузки данных: {e}")
-            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить данные: {e}")
+            logger.error("Ошибка загрузки данных: %s", e)
+            self.show_query_error("Не удалось загрузить данные", e)
+
+    def page_request(self, after):
+        """
+        Параметры get_students_page для страницы после ключа after
+
+        Собираются в главном потоке, чтобы фоновый запрос не читал
+        состояние окна.
+        """
+        budget = 'search' if self.current_filters else 'page'
+        return dict(
+            sort_by=self.sort_by,
+            descending=self.sort_descending,
+            after=after,
+            limit=PAGE_SIZE,
+            filters=dict(self.current_filters),
+            timeout=self.timeouts.get(budget),
+        )
+
+    def remember_page(self, students):
+        """Запоминает ключ последней строки загруженной страницы"""
+        self.has_more = len(students) == PAGE_SIZE
+        if students:
+            last = students[-1]
+            self.last_loaded = (last[self.sort_by], last['id'])
+
+    def load_next_page(self):
+        """Догружает следующую страницу в конец таблицы"""
+        if not self.has_more or self.last_loaded is None or self.runner.busy:
+            return
+
+        request = self.page_request(after=self.last_loaded)
+        try:
+            students = self.run_query('next_page', "Загрузка следующей страницы...",
+                                      lambda db: db.get_students_page(**request))
+            self.remember_page(students)
+            self.show_students(students, append=True)
+
+        except QueryCancelledError:
+            self.statusBar().showMessage("Загрузка страницы отменена", 3000)
+        except Exception as e:
+            logger.error("Ошибка загрузки страницы: %s", e)
+            self.has_more = False
+            self.statusBar().showMessage(f"Не удалось загрузить страницу: {e}", 5000)
+
+    def on_table_scrolled(self, value):
+        """Подгружает следующую страницу, когда таблица прокручена до конца"""
+        if value == self.table.verticalScrollBar().maximum():
+            self.load_next_page()
+
+    def sort_by_column(self, column):
+        """
+        Сортирует список по колонке, на заголовок которой нажали
+
+        Если загружен весь список, строки сортируются локально в колоночном
+        кэше (Shift+клик добавляет дополнительный ключ). Иначе порядок
+        задаёт сервер: локальная сортировка неполного списка показала бы
+        не те строки.
+        """
+        header = self.table.horizontalHeader()
+        descending = header.sortIndicatorOrder() == Qt.DescendingOrder
+
+        if not self.has_more:
+            field = self.model.field_at(column)
+            if field is None:
+                # Телефон зашифрован и не сортируется
+                self.show_sort_indicator()
+                return
+
+            keys = [key for key in self.local_sort if key[0] != field]
+            if QApplication.keyboardModifiers() & Qt.ShiftModifier:
+                self.local_sort = keys + [(field, descending)]
+            else:
+                self.local_sort = [(field, descending)]
+            self.model.apply(self.local_filters(), self.local_sort)
+            self.update_record_count()
+            return
+
+        field = SORTABLE_COLUMNS.get(column)
+        if field is None:
+            # Колонки из связанных таблиц и телефон на сервере не сортируются
+            self.show_sort_indicator()
+            return
+
+        if self.runner.busy:
+            self.show_sort_indicator()
+            return
+
+        self.sort_by = field
+        self.sort_descending = descending
+        self.reload_students()
+
+    def show_sort_indicator(self):
+        """Возвращает индикатор сортировки на текущий главный ключ"""
+        if self.local_sort:
+            field, descending = self.local_sort[0]
+        else:
+            field, descending = self.sort_by, self.sort_descending
+
+        column = {v: k for k, v in SORTABLE_COLUMNS.items()}.get(field)
+        if column is None:
+            column = [self.model.field_at(i) for i in range(self.model.columnCount())].index(field)
+        self.table.horizontalHeader().setSortIndicator(
+            column, Qt.DescendingOrder if descending else Qt.AscendingOrder
+        )
+
+    def show_students(self, students, append=False):
+        """
+        Заполняет таблицу списком студентов
+
+        Args:
+            students: список студентов
+            append: добавить строки в конец, а не заменить таблицу
+        """
+        if append:
+            self.model.append_rows(students)
+            self.refresh_filter_choices()
+        else:
+            # Новый серверный порядок отменяет локальную сортировку
+            self.local_sort = []
+            self.model.set_rows(students)
+            self.refresh_filter_choices()
+            # Значения фильтров, которых нет в новых строках, сброшены на "Все"
+            self.model.apply(self.local_filters(), [])
+            self.show_sort_indicator()
+
+        self.update_record_count()
+
+    def update_record_count(self):
+        """Обновляет счётчик записей в строке состояния"""
+        suffix = "+" if self.has_more else ""
+        shown = self.model.rowCount()
+        total = self.model.total_count()
+        if shown != total:
+            self.record_count.setText(f"Записей: {shown} из {total}{suffix}")
+        else:
+            self.record_count.setText(f"Записей: {total}{suffix}")
 
     # Методы-заглушки для кнопок (реализуем позже)
     def add_student(self):
         """Открывает форму добавления нового студента"""
         try:
-            # Загружаем список кафедр
-            departments = self.db.execute_query("""
-                SELECT d.id, d.code, d.name, i.code as institute_code
-                FROM departments d
-                JOIN institutes i ON d.institute_id = i.id
-                ORDER BY i.code, d.code
-            """)
+            # Загружаем список кафедр (обычно из кэша запросов)
+            departments = self.db.get_departments()
 
             form = StudentForm(self.db, departments=departments)
 
@@ -233,7 +772,7 @@ class MainWindow(QMainWindow):
                 student_data = form.student_data
 
                 # Получаем шифратор
-                encryptor = get_encryptor()
+                encryptor = get_encryptor(**self.config['encryption'])
 
                 # Добавляем студента в БД
                 student_id = self.db.add_student_with_encryption(student_data, encryptor)
@@ -246,115 +785,342 @@ class MainWindow(QMainWindow):
                     QMessageBox.critical(self, "Ошибка", "Не удалось добавить студента")
 
         except Exception as e:
-            logger.error(f"Ошибка добавления студента: {e}")
+            logger.error("Ошибка добавления студента: %s", e)
             QMessageBox.critical(self, "Ошибка", f"Ошибка добавления: {e}")
 
+    def rapid_entry(self):
+        """
+        Открывает форму быстрого ввода
+
+        Форма не закрывается после записи: проверенные записи уходят в
+        очередь и сохраняются в базу пачками в фоне, список обновляется
+        один раз после закрытия формы.
+        """
+        if self.write_queue is None:
+            QMessageBox.warning(self, "Ошибка", "Очередь записи недоступна, подробности в журнале")
+            return
+
+        try:
+            departments = self.db.get_departments()
+        except Exception as e:
+            logger.error("Ошибка загрузки кафедр: %s", e)
+            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить кафедры: {e}")
+            return
+
+        self.rapid_form = StudentForm(self.db, departments=departments,
+                                      write_queue=self.write_queue)
+        try:
+            self.rapid_form.exec_()
+        finally:
+            self.rapid_form = None
+        self.load_data()
+
     def edit_student(self):
         """Открывает форму редактирования выбранного студента"""
-        selected_row = self.table.currentRow()
-        if selected_row == -1:
+        student_id = self.current_student_id()
+        if student_id is None:
             QMessageBox.warning(self, "Предупреждение", "Выберите студента для редактирования")
             return
 
         try:
-            # Получаем ID студента
-            student_id_item = self.table.item(selected_row, 0)
-            if not student_id_item:
-                return
-
-            student_id = int(student_id_item.text())
-
-            # Загружаем данные студента
-            query = """
-                SELECT 
-                    s.*,
-                    d.code as department_code,
-                    i.code as institute_code
-                FROM students s
-                JOIN departments d ON s.department_id = d.id
-                JOIN institutes i ON d.institute_id = i.id
-                WHERE s.id = %s
-            """
-
-            result = self.db.execute_query(query, (student_id,))
-            if not result:
+            # Строка и список кафедр - одним обменом с сервером. Строка и её
+            # version читаются с основного сервера мимо кэша: version
+            # проверяется при сохранении, и устаревшая дала бы ложный конфликт.
+            # Зашифрованные поля форма не показывает, поэтому их не читаем
+            student_data, departments = self.db.get_student_for_edit(student_id)
+            if student_data is None:
                 QMessageBox.warning(self, "Ошибка", "Студент не найден")
                 return
 
-            student_data = result[0]
-
-            # Загружаем список кафедр
-            departments = self.db.execute_query("""
-                SELECT d.id, d.code, d.name, i.code as institute_code
-                FROM departments d
-                JOIN institutes i ON d.institute_id = i.id
-                ORDER BY i.code, d.code
-            """)
-
             # Создаем форму редактирования
             form = StudentForm(self.db, student_data=student_data, departments=departments)
 
             if form.exec_() == QDialog.Accepted:
-                # Получаем обновленные данные
+                # Получаем только изменённые поля
                 updated_data = form.student_data
+                if set(updated_data) <= {'id'}:
+                    self.statusBar().showMessage("Изменений нет", 3000)
+                    return
 
                 # Получаем шифратор
-                encryptor = get_encryptor()
-
-                # Обновляем студента в БД
-                success = self.db.update_student_with_encryption(
-                    student_id, updated_data, encryptor
-                )
+                encryptor = get_encryptor(**self.config['encryption'])
+
+                # Обновляем студента в БД; при чужой правке - предлагаем объединить
+                version = student_data['version']
+                while True:
+                    try:
+                        success = self.db.update_student_with_encryption(
+                            student_id, updated_data, encryptor, version=version
+                        )
+                        break
+                    except ConcurrentUpdateError as conflict:
+                        version = self.resolve_update_conflict(
+                            conflict, form.original_values, updated_data, departments)
+                        if version is None:
+                            self.load_data()
+                            return
 
                 if success:
+                    # Старый расшифрованный телефон больше не верен
+                    self.phone_cache.discard(student_id)
                     QMessageBox.information(self, "Успех", "Данные студента обновлены")
                     self.load_data()  # Обновляем таблицу
                 else:
                     QMessageBox.critical(self, "Ошибка", "Не удалось обновить данные")
 
         except Exception as e:
-            logger.error(f"Ошибка редактирования студента: {e}")
+            logger.error("Ошибка редактирования студента: %s", e)
             QMessageBox.critical(self, "Ошибка", f"Ошибка редактирования: {e}")
 
-    def delete_student(self):
-        """Удаляет выбранного студента"""
-        selected_row = self.table.currentRow()
+    def resolve_update_conflict(self, conflict, original, changes, departments):
+        """
+        Предлагает объединить свои правки с правками другого оператора
+
+        Если другой оператор менял другие поля, правки объединяются без
+        вопросов: повторное обновление пишет только свои поля. Если оба
+        изменили одно поле, оператор выбирает, чьё значение оставить.
+
+        Returns:
+            int: версия записи для повторного обновления или None (не сохранять)
+        """
+        if conflict.current is None:
+            QMessageBox.warning(self, "Конфликт правок",
+                                "Студент удалён другим оператором, изменения не сохранены")
+            return None
+
+        conflicts = conflict.conflicts(original, changes)
+        if not conflicts:
+            self.statusBar().showMessage("Изменения объединены с правками другого оператора", 5000)
+            return conflict.current['version']
+
+        department_codes = {department['id']: f"{department['institute_code']}/{department['code']}"
+                            for department in departments}
+
+        def show(field, value):
+            if field == 'department_id':
+                return department_codes.get(value, value)
+            return value
+
+        details = "\n".join(
+            f"{FIELD_LABELS.get(field, field)}: ваше «{show(field, mine)}», "
+            f"сейчас в базе «{show(field, theirs)}»"
+            for field, (mine, theirs) in conflicts.items()
+        )
+        box = QMessageBox(self)
+        box.setIcon(QMessageBox.Warning)
+        box.setWindowTitle("Конфликт правок")
+        box.setText("Пока форма была открыта, другой оператор изменил те же поля.")
+        box.setInformativeText(details)
+        overwrite = box.addButton("Сохранить мои", QMessageBox.AcceptRole)
+        box.addButton("Оставить их", QMessageBox.RejectRole)
+        box.exec_()
+
+        if box.clickedButton() is overwrite:
+            return conflict.current['version']
+        self.statusBar().showMessage("Изменения не сохранены, оставлены правки другого оператора", 5000)
+        return None
+
+    def current_student_id(self):
+        """ID студента под курсором на открытой вкладке (None - не выбран)"""
+        if self.tabs.currentWidget() is self.tree:
+            return self.tree_model.student_id(self.tree.currentIndex())
+        selected_row = self.table.currentIndex().row()
         if selected_row == -1:
-            QMessageBox.warning(self, "Предупреждение", "Выберите студента для удаления")
+            return None
+        return self.model.student_id(selected_row)
+
+    def selected_student_ids(self):
+        """
+        ID всех выделенных студентов на открытой вкладке
+
+        В дереве выделенные институты, кафедры и группы не учитываются -
+        только строки студентов.
+        """
+        if self.tabs.currentWidget() is self.tree:
+            student_ids = (self.tree_model.student_id(index)
+                           for index in self.tree.selectionModel().selectedRows())
+            return [student_id for student_id in student_ids if student_id is not None]
+        return [self.model.student_id(index.row())
+                for index in self.table.selectionModel().selectedRows()]
+
+    def selected_student_name(self):
+        """Фамилия и инициалы первого выделенного студента на открытой вкладке"""
+        if self.tabs.currentWidget() is self.tree:
+            for index in self.tree.selectionModel().selectedRows():
+                if self.tree_model.student_id(index) is not None:
+                    return index.data()
+            return None
+        selected_row = self.table.selectionModel().selectedRows()[0].row()
+        student = self.model.student(selected_row)
+        return f"{student['last_name']} {student['initials']}"
+
+    def delete_student(self):
+        """Удаляет выделенных студентов"""
+        student_ids = self.selected_student_ids()
+        if not student_ids:
+            QMessageBox.warning(self, "Предупреждение", "Выберите студентов для удаления")
             return
 
         try:
-            # Получаем ID студента
-            student_id_item = self.table.item(selected_row, 0)
-            if not student_id_item:
-                return
-
-            student_id = int(student_id_item.text())
-
-            # Получаем информацию о студенте для подтверждения
-            last_name = self.table.item(selected_row, 1).text()
-            initials = self.table.item(selected_row, 2).text()
+            if len(student_ids) == 1:
+                question = f"Вы уверены, что хотите удалить студента:\n{self.selected_student_name()}?"
+            else:
+                question = f"Вы уверены, что хотите удалить выбранных студентов ({len(student_ids)})?"
 
             # Запрашиваем подтверждение
             reply = QMessageBox.question(
-                self, "Подтверждение удаления",
-                f"Вы уверены, что хотите удалить студента:\n{last_name} {initials}?",
+                self, "Подтверждение удаления", question,
                 QMessageBox.Yes | QMessageBox.No,
                 QMessageBox.No
             )
 
             if reply == QMessageBox.Yes:
-                # Удаляем студента
-                query = "DELETE FROM students WHERE id = %s"
-                self.db.execute_query(query, (student_id,), fetch=False)
+                # Удаляем всех выбранных одним запросом
+                deleted_ids = self.db.delete_students(student_ids)
+                self.remove_rows(deleted_ids)
 
-                QMessageBox.information(self, "Успех", "Студент удален")
-                self.load_data()  # Обновляем таблицу
+                self.statusBar().showMessage(f"Удалено студентов: {len(deleted_ids)}", 3000)
 
         except Exception as e:
-            logger.error(f"Ошибка удаления студента: {e}")
+            logger.error("Ошибка удаления студентов: %s", e)
             QMessageBox.critical(self, "Ошибка", f"Ошибка удаления: {e}")
 
+    def move_selected_to_group(self):
+        """Переводит выделенных студентов в другую группу"""
+        student_ids = self.selected_student_ids()
+        if not student_ids:
+            QMessageBox.warning(self, "Предупреждение", "Выберите студентов для перевода")
+            return
+
+        group_name, ok = QInputDialog.getText(
+            self, "Перевод в группу",
+            f"Новая группа для выбранных студентов ({len(student_ids)}):"
+        )
+        group_name = group_name.strip()
+        if not ok or not group_name:
+            return
+
+        try:
+            updated_ids = self.db.move_students(student_ids, group_name=group_name)
+            self.update_rows(updated_ids, {'group_name': group_name})
+            self.statusBar().showMessage(f"Переведено студентов: {len(updated_ids)}", 3000)
+
+        except Exception as e:
+            logger.error("Ошибка перевода студентов: %s", e)
+            QMessageBox.critical(self, "Ошибка", f"Ошибка перевода: {e}")
+
+    def move_selected_to_department(self):
+        """Переводит выделенных студентов на другую кафедру"""
+        student_ids = self.selected_student_ids()
+        if not student_ids:
+            QMessageBox.warning(self, "Предупреждение", "Выберите студентов для перевода")
+            return
+
+        try:
+            departments = self.db.get_departments() or []
+            if not departments:
+                QMessageBox.warning(self, "Предупреждение", "Список кафедр пуст")
+                return
+
+            items = [f"{d['institute_code']}/{d['code']} - {d['name']}" for d in departments]
+            choice, ok = QInputDialog.getItem(
+                self, "Перевод на кафедру",
+                f"Новая кафедра для выбранных студентов ({len(student_ids)}):",
+                items, 0, False
+            )
+            if not ok:
+                return
+
+            department = departments[items.index(choice)]
+            updated_ids = self.db.move_students(student_ids, department_id=department['id'])
+            self.update_rows(updated_ids, {
+                'institute_code': department['institute_code'],
+                'institute_name': department['institute_name'],
+                'department_code': department['code'],
+                'department_name': department['name'],
+            })
+            self.statusBar().showMessage(f"Переведено студентов: {len(updated_ids)}", 3000)
+
+        except Exception as e:
+            logger.error("Ошибка перевода студентов: %s", e)
+            QMessageBox.critical(self, "Ошибка", f"Ошибка перевода: {e}")
+
+    def change_selected_admission_year(self):
+        """Меняет год поступления у выделенных студентов"""
+        student_ids = self.selected_student_ids()
+        if not student_ids:
+            QMessageBox.warning(self, "Предупреждение", "Выберите студентов")
+            return
+
+        admission_year, ok = QInputDialog.getInt(
+            self, "Год поступления",
+            f"Новый год поступления для выбранных студентов ({len(student_ids)}):",
+            2020, 2000, 2100
+        )
+        if not ok:
+            return
+
+        try:
+            updated_ids = self.db.set_admission_year(student_ids, admission_year)
+            self.update_rows(updated_ids, {'admission_year': admission_year})
+            self.statusBar().showMessage(f"Обновлено студентов: {len(updated_ids)}", 3000)
+
+        except Exception as e:
+            logger.error("Ошибка изменения года поступления: %s", e)
+            QMessageBox.critical(self, "Ошибка", f"Ошибка обновления: {e}")
+
+    def show_duplicates(self):
+        """Ищет дубликаты студентов и показывает окно проверки"""
+        if self.runner.busy:
+            return
+
+        timeout = self.timeouts.get('duplicates')
+        try:
+            groups, students = self.run_query(
+                'duplicates', "Поиск дубликатов...",
+                lambda db: find_duplicate_students(db, timeout=timeout))
+        except Exception as e:
+            logger.error("Ошибка поиска дубликатов: %s", e)
+            self.show_query_error("Ошибка поиска дубликатов", e)
+            return
+
+        if not groups:
+            QMessageBox.information(self, "Дубликаты", "Дубликаты не найдены")
+            return
+
+        dialog = DuplicatesDialog(self.db, groups, students, self)
+        dialog.exec_()
+
+        if dialog.deleted_ids:
+            self.remove_rows(dialog.deleted_ids)
+
+    def remove_rows(self, student_ids):
+        """
+        Убирает из таблицы строки удалённых студентов без перезагрузки
+
+        Дерево, если его открывали, перечитывается: меняются счётчики
+        подразделений и групп.
+        """
+        self.model.remove_ids(student_ids)
+        self.update_record_count()
+        if student_ids and self.tree_model.populated:
+            self.reload_tree()
+
+    def update_rows(self, student_ids, values):
+        """
+        Обновляет ячейки изменённых студентов без перезагрузки
+
+        Дерево, если его открывали, перечитывается (см. remove_rows).
+
+        Args:
+            student_ids: ID обновлённых студентов
+            values: словарь {поле: новое значение}
+        """
+        self.model.update_ids(student_ids, values)
+        self.update_record_count()
+        if student_ids and self.tree_model.populated:
+            self.reload_tree()
+
     def show_search_dialog(self):
         QMessageBox.information(self, "Поиск", "Функция поиска")
 
@@ -362,7 +1128,23 @@ class MainWindow(QMainWindow):
         QMessageBox.information(self, "Экспорт", "Функция экспорта")
 
     def search_by_field(self, field):
-        QMessageBox.information(self, "Поиск", f"Поиск по полю: {field}")
+        """Ищет студентов по значению одного поля"""
+        prompts = {
+            'admission_year': "Год поступления:",
+            'department_code': "Код кафедры:",
+            'city_before': "Город проживания до поступления:",
+        }
+
+        if field == 'admission_year':
+            value, ok = QInputDialog.getInt(self, "Поиск", prompts[field], 2020, 2000, 2100)
+        else:
+            value, ok = QInputDialog.getText(self, "Поиск", prompts[field])
+            value = value.strip()
+        if not ok or value == '' or self.runner.busy:
+            return
+
+        self.current_filters = {field: value}
+        self.reload_students()
 
     def show_advanced_search(self):
         QMessageBox.information(self, "Расширенный поиск", "Функция расширенного поиска")
@@ -373,6 +1155,60 @@ class MainWindow(QMainWindow):
     def export_to_excel(self):
         QMessageBox.information(self, "Экспорт", "Экспорт в Excel")
 
+    def export_to_csv(self, compress=False):
+        """Выгружает студентов по текущим фильтрам поиска в CSV в каталоге exports"""
+        if self.runner.busy:
+            return
+
+        filters = dict(self.current_filters)
+        timeout = self.timeouts.get('export')
+        try:
+            result = self.run_query(
+                'export', "Выгрузка в CSV...",
+                lambda db: export_students_csv(db, filters, compress=compress, timeout=timeout))
+        except Exception as e:
+            logger.error("Ошибка экспорта в CSV: %s", e)
+            self.show_query_error("Ошибка экспорта", e)
+            return
+
+        QMessageBox.information(
+            self, "Экспорт",
+            f"Выгружено записей: {result.rows}\n"
+            f"Файл: {result.path}\n"
+            f"Размер: {result.bytes_written / 1024:.1f} КБ, "
+            f"{result.bytes_per_second / 1024 / 1024:.1f} МБ/с"
+        )
+
+    def show_profile_reports(self):
+        """Показывает пути последних отчётов профилирования"""
+        if not self.profiler.reports:
+            QMessageBox.information(
+                self, "Диагностика",
+                "Отчётов пока нет.\n"
+                "Включите профилирование в меню «Диагностика» и повторите медленное действие."
+            )
+            return
+
+        reports = "\n".join(str(path) for path in reversed(self.profiler.reports[-10:]))
+        QMessageBox.information(self, "Диагностика", f"Последние отчёты:\n{reports}")
+
+    def show_cache_stats(self):
+        """Показывает метрики кэша результатов запросов"""
+        if self.db.cache is None:
+            QMessageBox.information(self, "Кэш запросов",
+                                    "Кэш выключен. Чтобы включить, задайте QUERY_CACHE_TTL, с")
+            return
+
+        stats = self.db.cache.stats()
+        QMessageBox.information(
+            self, "Кэш запросов",
+            f"Записей: {stats['entries']}\n"
+            f"Попаданий: {stats['hits']}, промахов: {stats['misses']} "
+            f"({stats['hit_rate']:.0%})\n"
+            f"Сброшено при записи: {stats['invalidations']}\n"
+            f"Вытеснено: {stats['evictions']}"
+        )
+
     def show_about(self):
         QMessageBox.about(self, "О программе",
                           "База данных студентов\n\n"
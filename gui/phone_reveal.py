@@ -0,0 +1,89 @@
+"""
+Расшифровка телефонов видимых строк в фоновом потоке
+
+Таблица просит телефоны только тех строк, которые рисует (см.
+StudentTableModel.phones_requested), то есть видимых на экране. Поток
+читает их шифротексты одним запросом, расшифровывает и кладёт в
+PlaintextCache, а таблица перерисовывает колонку. При быстрой прокрутке
+устаревший запрос заменяется новым, поэтому расшифровывается не больше
+экрана строк за раз и никогда - вся таблица.
+"""
+
+import logging
+import threading
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+
+class PhoneRevealer(QThread):
+    """Поток расшифровки телефонов по запросу"""
+
+    # ID студентов, чьи телефоны появились в кэше
+    revealed = pyqtSignal(list)
+    # Текст ошибки чтения
+    failed = pyqtSignal(str)
+
+    def __init__(self, db, encryptor, cache, timeout=None, parent=None):
+        super().__init__(parent)
+        # Свой экземпляр Database: поток не делит соединение с окном
+        self.db = db.clone()
+        self.encryptor = encryptor
+        self.cache = cache
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self._pending = None
+        self._stopping = False
+
+    def request(self, student_ids):
+        """Просит расшифровать телефоны; непрочитанный прошлый запрос отбрасывается"""
+        student_ids = self.cache.missing(student_ids)
+        if not student_ids:
+            return
+        with self._condition:
+            self._pending = student_ids
+            self._condition.notify_all()
+        if not self.isRunning():
+            self._stopping = False
+            self.start()
+
+    def stop(self):
+        """Останавливает поток, прерывая текущий запрос"""
+        with self._condition:
+            self._stopping = True
+            self._pending = None
+            self._condition.notify_all()
+        self.db.cancel()
+        self.wait()
+        # Отменённый экземпляр больше не выполняет запросов - следующему запуску нужен новый
+        self.db = self.db.clone()
+
+    def run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._stopping or self._pending)
+                if self._stopping:
+                    return
+                student_ids, self._pending = self._pending, None
+
+            # Пока запрос ждал, часть значений могла попасть в кэш
+            student_ids = self.cache.missing(student_ids)
+            if not student_ids:
+                continue
+            try:
+                rows = self.db.get_phones(student_ids, timeout=self.timeout)
+            except Exception as e:
+                if not self._stopping:
+                    logger.error("Ошибка чтения телефонов: %s", e)
+                    self.failed.emit(str(e))
+                continue
+
+            phones = {row['id']: row['phone_encrypted'] for row in rows}
+            for student_id in student_ids:
+                # Пустой, нерасшифровываемый телефон или удалённый студент -
+                # пустая строка, чтобы таблица не запрашивала его снова
+                encrypted = phones.get(student_id)
+                phone = self.encryptor.decrypt(encrypted) if encrypted else None
+                self.cache.put(student_id, phone or '')
+            self.revealed.emit(student_ids)
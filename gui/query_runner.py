@@ -0,0 +1,99 @@
+"""
+Выполнение долгих запросов в фоновом потоке с кнопкой «Отмена»
+
+Операция получает собственный экземпляр Database (Database.clone) и
+выполняется в QThread, а главный поток крутит вложенный цикл событий,
+так что окно перерисовывается и не считается зависшим. Если операция
+длится дольше PROGRESS_DELAY мс, появляется окно с кнопкой «Отмена»,
+которая вызывает Database.cancel() - сервер прерывает запрос, и
+операция завершается QueryCancelledError.
+"""
+
+import logging
+
+from PyQt5.QtCore import Qt, QThread, QEventLoop
+from PyQt5.QtWidgets import QProgressDialog
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_DELAY = 400  # мс
+
+
+class _Worker(QThread):
+    """Поток, выполняющий operation(db) и запоминающий результат или ошибку"""
+
+    def __init__(self, operation, db, parent=None):
+        super().__init__(parent)
+        self.operation = operation
+        self.db = db
+        self.result = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.result = self.operation(self.db)
+        except Exception as e:
+            self.error = e
+
+
+class QueryRunner:
+    """Запускает операции с базой в фоне, по одной за раз"""
+
+    def __init__(self, parent, db):
+        self.parent = parent
+        self.db = db
+        self._worker = None
+
+    @property
+    def busy(self):
+        return self._worker is not None
+
+    def cancel(self):
+        """Прерывает выполняемую операцию"""
+        if self._worker is not None:
+            self._worker.db.cancel()
+
+    def run(self, label, operation):
+        """
+        Выполняет operation(db) в фоновом потоке и ждёт её, не блокируя окно
+
+        Args:
+            label: текст окна ожидания
+            operation: функция, принимающая экземпляр Database
+
+        Returns:
+            результат operation
+
+        Raises:
+            RuntimeError: уже выполняется другая операция
+            исключение operation (QueryCancelledError при отмене)
+        """
+        if self.busy:
+            raise RuntimeError("Дождитесь завершения текущей операции")
+
+        db = self.db.clone()
+        worker = _Worker(operation, db)
+        self._worker = worker
+
+        dialog = QProgressDialog(label, "Отмена", 0, 0, self.parent)
+        dialog.setWindowTitle("Подождите")
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(PROGRESS_DELAY)
+        dialog.setAutoReset(False)
+        dialog.canceled.connect(db.cancel)
+
+        loop = QEventLoop()
+        worker.finished.connect(loop.quit)
+        worker.start()
+        dialog.setValue(0)
+        loop.exec_()
+
+        dialog.canceled.disconnect(db.cancel)
+        dialog.close()
+        dialog.deleteLater()
+        worker.wait()
+        self._worker = None
+
+        if worker.error is not None:
+            raise worker.error
+        return worker.result
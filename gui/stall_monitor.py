@@ -0,0 +1,159 @@
+"""
+Сторож зависаний цикла событий Qt
+
+Таймер-пульс в главном потоке срабатывает каждые HEARTBEAT_INTERVAL мс.
+Если цикл событий занят (долгий слот, запрос к БД в главном потоке),
+пульс опаздывает. Фоновый поток следит за временем последнего пульса и,
+как только задержка превысила порог, снимает стек главного потока через
+sys._current_frames() - это показывает, какой слот держит окно.
+
+Когда пульс возобновился, зависание записывается в журнал вместе с
+длительностью, слотом и стеком, а задержки всех пульсов и длительности
+зависаний накапливаются в гистограммах.
+"""
+
+import bisect
+import logging
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 50      # мс
+DEFAULT_THRESHOLD = 0.5      # с
+# Верхние границы корзин гистограмм, с
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+STALL_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0)
+# Каталоги, код из которых считается «своим» при поиске слота в стеке
+PROJECT_PACKAGES = ('gui', 'app')
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными корзинами"""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.maximum = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.maximum = max(self.maximum, value)
+
+    def format(self):
+        """Строка вида '<=0.5с: 3, <=1с: 1, >5с: 0'"""
+        labels = [f"<={bound:g}с" for bound in self.bounds] + [f">{self.bounds[-1]:g}с"]
+        return ", ".join(f"{label}: {count}" for label, count in zip(labels, self.counts) if count)
+
+
+def find_slot(stack):
+    """
+    Определяет слот по стеку главного потока
+
+    Qt вызывает слот прямо из цикла событий, поэтому слотом считается
+    самый внешний кадр из пакетов проекта.
+
+    Args:
+        stack: список traceback.FrameSummary от внешнего кадра к внутреннему
+    """
+    for frame in stack:
+        if Path(frame.filename).parent.name in PROJECT_PACKAGES:
+            return f"{Path(frame.filename).stem}.{frame.name}"
+    return "неизвестно"
+
+
+class StallMonitor(QObject):
+    """Измеряет задержку цикла событий и фиксирует зависания"""
+
+    # длительность, с; слот
+    stall_detected = pyqtSignal(float, str)
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, parent=None):
+        super().__init__(parent)
+        self.threshold = threshold
+        self.interval = HEARTBEAT_INTERVAL / 1000
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.stalls = Histogram(STALL_BUCKETS)
+        self.last_slot = None
+
+        self._main_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        # (время пульса, стек) - снимок, сделанный сторожем во время зависания
+        self._capture = None
+        self._stop_event = threading.Event()
+        self._watchdog = None
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(HEARTBEAT_INTERVAL)
+        self._timer.timeout.connect(self._beat)
+
+    @property
+    def stall_count(self):
+        return self.stalls.total
+
+    def start(self):
+        """Запускает пульс и фоновый поток-сторож"""
+        self._last_beat = time.monotonic()
+        self._stop_event.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="stall-watchdog", daemon=True)
+        self._watchdog.start()
+        self._timer.start()
+        logger.info("Сторож зависаний запущен, порог %.2f с", self.threshold)
+
+    def stop(self):
+        """Останавливает сторожа и пишет итоговые гистограммы в журнал"""
+        self._timer.stop()
+        self._stop_event.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+        logger.info("Задержка цикла событий (%s пульсов, максимум %.3f с): %s",
+                    self.latency.total, self.latency.maximum, self.latency.format())
+        if self.stalls.total:
+            logger.info("Зависания (%s): %s", self.stalls.total, self.stalls.format())
+
+    def _watch(self):
+        """Фоновый поток: снимает стек главного потока, пока он не отвечает"""
+        while not self._stop_event.wait(self.interval):
+            beat = self._last_beat
+            if time.monotonic() - beat < self.threshold:
+                continue
+            if self._capture is not None and self._capture[0] == beat:
+                continue
+
+            frame = sys._current_frames().get(self._main_thread_id)
+            if frame is not None:
+                self._capture = (beat, traceback.extract_stack(frame))
+
+    def _beat(self):
+        """Пульс в главном потоке: измеряет, насколько он опоздал"""
+        now = time.monotonic()
+        previous = self._last_beat
+        self._last_beat = now
+
+        delay = max(0.0, now - previous - self.interval)
+        self.latency.add(delay)
+        if delay < self.threshold:
+            return
+
+        capture = self._capture
+        stack = capture[1] if capture is not None and capture[0] == previous else []
+        self._record_stall(delay, stack)
+
+    def _record_stall(self, duration, stack):
+        self.stalls.add(duration)
+        self.last_slot = find_slot(stack) if stack else "неизвестно"
+
+        logger.warning("Зависание интерфейса %.2f с, слот: %s\n%s",
+                       duration, self.last_slot,
+                       ''.join(traceback.format_list(stack)) if stack else "(стек не снят)")
+        logger.info("Гистограмма зависаний: %s", self.stalls.format())
+
+        self.stall_detected.emit(duration, self.last_slot)
@@ -1,12 +1,16 @@
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel,
     QLineEdit, QPushButton, QMessageBox, QComboBox,
-    QGroupBox, QFormLayout, QSpinBox, QDialogButtonBox
+    QGroupBox, QFormLayout, QSpinBox, QDialogButtonBox, QListWidget,
+    QListWidgetItem
 )
 from PyQt5.QtCore import Qt, pyqtSignal
-import re
 import logging
 
+from app.validation import (
+    is_valid_initials, is_valid_phone, validate_record, normalize_record
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,12 +19,20 @@ class StudentForm(QDialog):
 
     student_saved = pyqtSignal(dict)  # сигнал с данными студента
 
-    def __init__(self, db, student_data=None, departments=None):
+    def __init__(self, db, student_data=None, departments=None, write_queue=None):
         super().__init__()
         self.db = db
         self.student_data = student_data or {}
         self.departments = departments or []
         self.is_edit_mode = bool(student_data)
+        # Быстрый ввод: форма не закрывается, записи уходят в очередь
+        # отложенной записи (app/write_queue.py)
+        self.write_queue = write_queue
+        self.is_rapid_mode = write_queue is not None and not self.is_edit_mode
+        # Ключ записи очереди, которую исправляют после ошибки вставки
+        self.correcting_key = None
+        # Значения полей сразу после загрузки - с ними сравниваем при сохранении
+        self.original_values = {}
 
         self.setup_ui()
         self.load_departments()
@@ -31,9 +43,14 @@ class StudentForm(QDialog):
     def setup_ui(self):
         """Настраивает интерфейс формы"""
 
-        title = "Редактирование студента" if self.is_edit_mode else "Добавление студента"
+        if self.is_rapid_mode:
+            title = "Быстрый ввод студентов"
+        elif self.is_edit_mode:
+            title = "Редактирование студента"
+        else:
+            title = "Добавление студента"
         self.setWindowTitle(title)
-        self.setFixedSize(500, 600)
+        self.setFixedSize(500, 780 if self.is_rapid_mode else 600)
 
         layout = QVBoxLayout()
 
@@ -104,10 +121,18 @@ class StudentForm(QDialog):
         extra_group.setLayout(extra_layout)
         layout.addWidget(extra_group)
 
+        if self.is_rapid_mode:
+            layout.addWidget(self.create_queue_group())
+
         # Кнопки
-        button_box = QDialogButtonBox(
-            QDialogButtonBox.Ok | QDialogButtonBox.Cancel
-        )
+        if self.is_rapid_mode:
+            button_box = QDialogButtonBox(QDialogButtonBox.Close)
+            self.queue_button = button_box.addButton("Добавить в очередь", QDialogButtonBox.AcceptRole)
+            self.queue_button.setDefault(True)
+        else:
+            button_box = QDialogButtonBox(
+                QDialogButtonBox.Ok | QDialogButtonBox.Cancel
+            )
         button_box.accepted.connect(self.validate_and_save)
         button_box.rejected.connect(self.reject)
 
@@ -119,6 +144,96 @@ class StudentForm(QDialog):
         self.initials_input.textChanged.connect(self.validate_initials)
         self.phone_input.textChanged.connect(self.validate_phone)
 
+    def create_queue_group(self):
+        """Состояние очереди быстрого ввода и записи, которые не удалось сохранить"""
+        queue_group = QGroupBox("Очередь записи")
+        queue_layout = QVBoxLayout()
+
+        self.queue_status = QLabel()
+        queue_layout.addWidget(self.queue_status)
+
+        self.failed_list = QListWidget()
+        self.failed_list.setToolTip("Двойной щелчок - загрузить запись в форму для исправления")
+        self.failed_list.itemDoubleClicked.connect(self.correct_failed_entry)
+        queue_layout.addWidget(self.failed_list)
+
+        buttons = QHBoxLayout()
+        for text, slot in [("Исправить", lambda: self.correct_failed_entry(self.failed_list.currentItem())),
+                           ("Удалить из очереди", self.discard_failed_entry),
+                           ("Повторить все", self.retry_failed_entries)]:
+            button = QPushButton(text)
+            button.setAutoDefault(False)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        queue_layout.addLayout(buttons)
+
+        queue_group.setLayout(queue_layout)
+        self.refresh_queue_status()
+        return queue_group
+
+    def refresh_queue_status(self):
+        """Обновляет счётчики очереди и список записей с ошибками"""
+        if not self.is_rapid_mode:
+            return
+        status = self.write_queue.status()
+        text = (f"Ожидают записи: {status['pending']}, сохранено: {status['saved']}, "
+                f"ошибок: {status['failed']}")
+        if status['offline']:
+            text += "\nБаза недоступна - записи сохранены локально и будут отправлены позже"
+        if status['journal_error']:
+            text += f"\nНе удалось записать журнал очереди: {status['journal_error']}"
+        self.queue_status.setText(text)
+
+        self.failed_list.clear()
+        for entry in self.write_queue.snapshot():
+            if not entry['error']:
+                continue
+            student = entry['student']
+            item = QListWidgetItem(f"{student.get('last_name', '')} {student.get('initials', '')}, "
+                                   f"{student.get('group_name', '')}: {entry['error']}")
+            item.setData(Qt.UserRole, entry)
+            self.failed_list.addItem(item)
+        self.failed_list.setVisible(self.failed_list.count() > 0)
+
+    def correct_failed_entry(self, item):
+        """Загружает запись с ошибкой в форму; следующее сохранение заменит её в очереди"""
+        if item is None:
+            return
+        entry = item.data(Qt.UserRole)
+        self.fill_fields(entry['student'])
+        self.phone_input.setText(entry['student'].get('phone', ''))
+        self.record_book_input.setText(entry['student'].get('record_book_number', ''))
+        self.correcting_key = entry['key']
+        self.queue_button.setText("Сохранить исправление")
+        self.last_name_input.setFocus()
+
+    def discard_failed_entry(self):
+        """Удаляет выбранную запись с ошибкой из очереди"""
+        item = self.failed_list.currentItem()
+        if item is None:
+            return
+        key = item.data(Qt.UserRole)['key']
+        try:
+            discarded = self.write_queue.discard(key)
+        except OSError as e:
+            logger.error("Не удалось записать журнал очереди: %s", e)
+            QMessageBox.critical(self, "Ошибка", f"Запись не удалена из очереди: {e}")
+            return
+        if discarded and key == self.correcting_key:
+            self.correcting_key = None
+            self.queue_button.setText("Добавить в очередь")
+        self.refresh_queue_status()
+
+    def retry_failed_entries(self):
+        """Снова отправляет записи с ошибками (например, после добавления кафедры)"""
+        try:
+            self.write_queue.retry_failed()
+        except OSError as e:
+            logger.error("Не удалось записать журнал очереди: %s", e)
+            QMessageBox.critical(self, "Ошибка", f"Записи не поставлены на повтор: {e}")
+            return
+        self.refresh_queue_status()
+
     def load_departments(self):
         """Загружает список кафедр из базы данных"""
         try:
@@ -138,86 +253,113 @@ class StudentForm(QDialog):
                 self.department_combo.addItem(display_text, dept['id'])
 
         except Exception as e:
-            logger.error(f"Ошибка загрузки кафедр: {e}")
+            logger.error("Ошибка загрузки кафедр: %s", e)
 
     def load_student_data(self):
         """Загружает данные студента для редактирования"""
         try:
-            self.last_name_input.setText(self.student_data.get('last_name', ''))
-            self.initials_input.setText(self.student_data.get('initials', ''))
-            self.birth_year_spin.setValue(self.student_data.get('birth_year', 2000))
-            # Телефон и номер зачётки зашифрованы - не показываем
+            self.fill_fields(self.student_data)
+            # Телефон и номер зачётки зашифрованы - не показываем.
+            # Пустое поле при сохранении означает "оставить как есть"
             self.phone_input.setText("")
+            self.phone_input.setPlaceholderText("Не изменять")
             self.record_book_input.setText("")
-            self.admission_year_spin.setValue(self.student_data.get('admission_year', 2020))
-            self.group_input.setText(self.student_data.get('group_name', ''))
-            self.city_input.setText(self.student_data.get('city_before', ''))
-
-            # Устанавливаем кафедру
-            dept_id = self.student_data.get('department_id')
-            if dept_id:
-                for i in range(self.department_combo.count()):
-                    if self.department_combo.itemData(i) == dept_id:
-                        self.department_combo.setCurrentIndex(i)
-                        break
+            self.record_book_input.setPlaceholderText("Не изменять")
+
+            self.original_values = self.collect_form_values()
 
         except Exception as e:
-            logger.error(f"Ошибка загрузки данных студента: {e}")
+            logger.error("Ошибка загрузки данных студента: %s", e)
+
+    def fill_fields(self, data):
+        """Заполняет поля формы (кроме телефона и зачётки) значениями записи"""
+        self.last_name_input.setText(data.get('last_name', ''))
+        self.initials_input.setText(data.get('initials', ''))
+        self.birth_year_spin.setValue(data.get('birth_year', 2000))
+        self.admission_year_spin.setValue(data.get('admission_year', 2020))
+        self.group_input.setText(data.get('group_name', ''))
+        self.city_input.setText(data.get('city_before', ''))
+
+        # Устанавливаем кафедру
+        dept_id = data.get('department_id')
+        if dept_id:
+            for i in range(self.department_combo.count()):
+                if self.department_combo.itemData(i) == dept_id:
+                    self.department_combo.setCurrentIndex(i)
+                    break
+
+    def clear_personal_fields(self):
+        """
+        Очищает личные данные для следующей записи быстрого ввода
+
+        Год поступления, группа, кафедра и город остаются: в списке
+        зачисления они обычно одни на много студентов подряд.
+        """
+        for field in (self.last_name_input, self.initials_input,
+                      self.phone_input, self.record_book_input):
+            field.clear()
+        self.last_name_input.setFocus()
 
     def validate_initials(self, text):
         """Валидирует инициалы"""
-        pattern = r'^[А-ЯЁ]\.\s?[А-ЯЁ]\.$'
-        if text and not re.match(pattern, text):
+        if text and not is_valid_initials(text):
             self.initials_input.setStyleSheet("border: 1px solid red;")
         else:
             self.initials_input.setStyleSheet("")
 
     def validate_phone(self, text):
         """Валидирует номер телефона"""
-        pattern = r'^(\+7|8)\s?\(?\d{3}\)?[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2}$'
-        if text and not re.match(pattern, text):
+        if text and not is_valid_phone(text):
             self.phone_input.setStyleSheet("border: 1px solid red;")
         else:
             self.phone_input.setStyleSheet("")
 
     def validate_form(self):
         """Проверяет корректность заполнения формы"""
-        errors = []
-
-        # Проверка обязательных полей
-        if not self.last_name_input.text().strip():
-            errors.append("Фамилия обязательна для заполнения")
-
-        if not self.initials_input.text().strip():
-            errors.append("Инициалы обязательны для заполнения")
-        elif not re.match(r'^[А-ЯЁ]\.\s?[А-ЯЁ]\.$', self.initials_input.text()):
-            errors.append("Инициалы должны быть в формате 'И.О.'")
-
-        if not self.phone_input.text().strip():
-            errors.append("Телефон обязателен для заполнения")
-        elif not re.match(r'^(\+7|8)\s?\(?\d{3}\)?[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2}$',
-                          self.phone_input.text()):
-            errors.append("Некорректный формат телефона")
-
-        if not self.record_book_input.text().strip():
-            errors.append("Номер зачетной книжки обязателен")
-
-        if not self.group_input.text().strip():
-            errors.append("Группа обязательна для заполнения")
-
-        if self.department_combo.currentIndex() == -1:
-            errors.append("Выберите кафедру")
-
-        if not self.city_input.text().strip():
-            errors.append("Город обязателен для заполнения")
+        # При редактировании пустые телефон и зачётка означают "не менять"
+        optional = ('phone', 'record_book_number') if self.is_edit_mode else ()
+        return validate_record(self.collect_form_values(raw=True), optional)
+
+    def collect_form_values(self, raw=False):
+        """
+        Собирает текущие значения всех полей формы
+
+        Args:
+            raw: вернуть значения как введены, без нормализации
+                 (телефон к виду 7XXXXXXXXXX, инициалы к виду 'И.О.')
+        """
+        values = {
+            'last_name': self.last_name_input.text().strip(),
+            'initials': self.initials_input.text().strip(),
+            'birth_year': self.birth_year_spin.value(),
+            'phone': self.phone_input.text().strip(),
+            'record_book_number': self.record_book_input.text().strip(),
+            'admission_year': self.admission_year_spin.value(),
+            'group_name': self.group_input.text().strip(),
+            'department_id': self.department_combo.currentData(),
+            'city_before': self.city_input.text().strip(),
+        }
+        return values if raw else normalize_record(values)
+
+    def changed_fields(self):
+        """
+        Возвращает только поля, изменённые относительно загруженной записи
+
+        Returns:
+            dict: {поле: новое_значение}
+        """
+        current = self.collect_form_values()
+        changed = {
+            field: value for field, value in current.items()
+            if value != self.original_values.get(field)
+        }
 
-        # Проверка возраста
-        birth_year = self.birth_year_spin.value()
-        admission_year = self.admission_year_spin.value()
-        if admission_year - birth_year < 16:
-            errors.append("Студент не может быть младше 16 лет при поступлении")
+        # Пустые телефон и зачётка означают, что шифротекст в БД не трогаем
+        for field in ('phone', 'record_book_number'):
+            if not changed.get(field):
+                changed.pop(field, None)
 
-        return errors
+        return changed
 
     def validate_and_save(self):
         """Проверяет форму и сохраняет данные"""
@@ -228,22 +370,37 @@ class StudentForm(QDialog):
                                 "Исправьте следующие ошибки:\n\n• " + "\n• ".join(errors))
             return
 
-        # Подготовка данных
-        student_data = {
-            'last_name': self.last_name_input.text().strip(),
-            'initials': self.initials_input.text().strip(),
-            'birth_year': self.birth_year_spin.value(),
-            'phone': self.phone_input.text().strip(),
-            'record_book_number': self.record_book_input.text().strip(),
-            'admission_year': self.admission_year_spin.value(),
-            'group_name': self.group_input.text().strip(),
-            'department_id': self.department_combo.currentData(),
-            'city_before': self.city_input.text().strip(),
-        }
+        if self.is_rapid_mode:
+            self.queue_record()
+            return
+
+        # Подготовка данных: при редактировании - только изменённые поля
+        if self.is_edit_mode:
+            student_data = self.changed_fields()
+            if 'id' in self.student_data:
+                student_data['id'] = self.student_data['id']
+        else:
+            student_data = self.collect_form_values()
+
+        self.student_data = student_data
+        self.student_saved.emit(student_data)
+        self.accept()
 
-        # Если это редактирование, добавляем ID
-        if self.is_edit_mode and 'id' in self.student_data:
-            student_data['id'] = self.student_data['id']
+    def queue_record(self):
+        """Кладёт запись в очередь отложенной записи и готовит форму к следующей"""
+        student_data = self.collect_form_values()
+        try:
+            if self.correcting_key is not None:
+                self.write_queue.update(self.correcting_key, student_data)
+            else:
+                self.write_queue.put(student_data)
+        except OSError as e:
+            logger.error("Не удалось записать журнал очереди: %s", e)
+            QMessageBox.critical(self, "Ошибка", f"Запись не поставлена в очередь: {e}")
+            return
 
+        self.correcting_key = None
+        self.queue_button.setText("Добавить в очередь")
         self.student_saved.emit(student_data)
-        self.accept()
\ No newline at end of file
+        self.clear_personal_fields()
+        self.refresh_queue_status()
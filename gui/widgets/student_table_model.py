@@ -0,0 +1,212 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, pyqtSignal
+import numpy as np
+
+from app.column_store import ColumnStore
+
+# Колонки таблицы: (заголовок, поле ColumnStore или None для телефона)
+COLUMNS = [
+    ("ID", 'id'),
+    ("Фамилия", 'last_name'),
+    ("Инициалы", 'initials'),
+    ("Год рождения", 'birth_year'),
+    ("Год поступления", 'admission_year'),
+    ("Группа", 'group_name'),
+    ("Институт", 'institute_name'),
+    ("Кафедра", 'department_name'),
+    ("Город", 'city_before'),
+    ("Телефон", None),
+]
+PHONE_COLUMN = 9
+# Сколько копить запросы телефонов отрисованных строк перед отправкой, мс
+PHONE_REQUEST_DELAY = 50
+
+
+class StudentTableModel(QAbstractTableModel):
+    """
+    Модель таблицы студентов поверх колоночного кэша
+
+    Модель не хранит строки сама: она показывает позиции ColumnStore в
+    порядке self.view. Локальные фильтры и сортировка пересчитывают только
+    массив view (маска + lexsort), а Qt запрашивает лишь видимые ячейки.
+
+    Телефоны показываются как "***". В режиме показа (show_phones)
+    значения берутся из PlaintextCache; для строк без значения модель
+    копит ID и отправляет их сигналом phones_requested - раз Qt
+    запрашивает только видимые ячейки, это ровно строки на экране.
+    """
+
+    # ID студентов, чьи телефоны нужно расшифровать
+    phones_requested = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = ColumnStore()
+        self.view = np.empty(0, dtype=np.int64)
+        self.filters = {}
+        self.sort = []
+        # PlaintextCache в режиме показа телефонов (None - телефоны скрыты)
+        self.phones = None
+        self._requested = set()
+        self._request_timer = QTimer(self)
+        self._request_timer.setSingleShot(True)
+        self._request_timer.setInterval(PHONE_REQUEST_DELAY)
+        self._request_timer.timeout.connect(self._send_phone_requests)
+
+    # ---- интерфейс QAbstractTableModel ----
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.view)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        field = COLUMNS[index.column()][1]
+
+        if role == Qt.DisplayRole:
+            if field is None:
+                return self.phone(index.row())
+            value = self.store.value(self.view[index.row()], field)
+            return '' if value is None else str(value)
+
+        if role == Qt.ToolTipRole and field is None and self.phones is None:
+            return "Телефон зашифрован"
+
+        return None
+
+    # ---- показ телефонов ----
+
+    def phone(self, row):
+        """Телефон строки: "***", расшифрованное значение или "…" (ещё расшифровывается)"""
+        if self.phones is None:
+            return "***"
+        student_id = self.store.value(self.view[row], 'id')
+        found, value = self.phones.get(student_id)
+        if found:
+            return value
+        self._requested.add(student_id)
+        if not self._request_timer.isActive():
+            self._request_timer.start()
+        return "…"
+
+    def _send_phone_requests(self):
+        requested, self._requested = list(self._requested), set()
+        if requested and self.phones is not None:
+            self.phones_requested.emit(requested)
+
+    def show_phones(self, cache):
+        """Включает показ телефонов из cache (None - скрыть телефоны)"""
+        self.phones = cache
+        self._requested = set()
+        self.phones_changed()
+
+    def phones_changed(self, student_ids=None):
+        """Перерисовывает колонку телефона (Qt перерисует только видимые строки)"""
+        if len(self.view):
+            self.dataChanged.emit(self.index(0, PHONE_COLUMN),
+                                  self.index(len(self.view) - 1, PHONE_COLUMN),
+                                  [Qt.DisplayRole])
+
+    # ---- загрузка и точечные изменения ----
+
+    def set_rows(self, students):
+        """Заменяет все строки модели"""
+        self.beginResetModel()
+        self.store.clear()
+        self.store.extend(students)
+        self.view = self.store.select(self.filters, self.sort)
+        self.endResetModel()
+
+    def append_rows(self, students):
+        """Добавляет следующую страницу строк"""
+        if not students:
+            return
+
+        if self.filters or self.sort:
+            # Новые строки должны встать на свои места - пересчитываем порядок
+            self.beginResetModel()
+            self.store.extend(students)
+            self.view = self.store.select(self.filters, self.sort)
+            self.endResetModel()
+            return
+
+        first = len(self.store)
+        self.beginInsertRows(QModelIndex(), len(self.view), len(self.view) + len(students) - 1)
+        self.store.extend(students)
+        self.view = np.concatenate([self.view, np.arange(first, len(self.store))])
+        self.endInsertRows()
+
+    def remove_ids(self, student_ids):
+        """Убирает строки удалённых студентов"""
+        self.beginResetModel()
+        self.store.remove_ids(student_ids)
+        self.view = self.store.select(self.filters, self.sort)
+        self.endResetModel()
+
+    def update_ids(self, student_ids, values):
+        """
+        Записывает новые значения в строки студентов
+
+        Args:
+            student_ids: ID студентов
+            values: словарь {поле: значение}
+        """
+        self.store.update_ids(student_ids, values)
+        if self.filters or self.sort:
+            # Изменённые строки могли выпасть из фильтра или сменить место
+            self.beginResetModel()
+            self.view = self.store.select(self.filters, self.sort)
+            self.endResetModel()
+        elif len(self.view):
+            self.dataChanged.emit(self.index(0, 0),
+                                  self.index(len(self.view) - 1, len(COLUMNS) - 1))
+
+    # ---- локальные фильтры и сортировка ----
+
+    def apply(self, filters=None, sort=None):
+        """
+        Фильтрует и сортирует загруженные строки без обращения к серверу
+
+        Args:
+            filters: словарь {поле: значение}
+            sort: список пар (поле, по_убыванию)
+        """
+        self.beginResetModel()
+        self.filters = {name: value for name, value in (filters or {}).items() if value is not None}
+        self.sort = list(sort or [])
+        self.view = self.store.select(self.filters, self.sort)
+        self.endResetModel()
+
+    def clear_sort(self):
+        """Возвращает порядок, в котором строки пришли с сервера"""
+        self.apply(self.filters, [])
+
+    # ---- доступ к строкам ----
+
+    def field_at(self, column):
+        """Поле ColumnStore для колонки таблицы (None для телефона)"""
+        return COLUMNS[column][1]
+
+    def student_id(self, row):
+        """ID студента в строке таблицы"""
+        return self.store.value(self.view[row], 'id')
+
+    def student(self, row):
+        """Данные студента в строке таблицы"""
+        return self.store.row(self.view[row])
+
+    def total_count(self):
+        """Количество загруженных строк (без учёта локального фильтра)"""
+        return len(self.store)
+
+    def distinct(self, field):
+        """Уникальные значения поля среди загруженных строк"""
+        return self.store.distinct(field)
@@ -0,0 +1,209 @@
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex, pyqtSignal
+import logging
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# Уровни дерева
+INSTITUTE, DEPARTMENT, GROUP, STUDENT = range(4)
+# Студентов за одну подгрузку внутри группы (примерно экран строк)
+PAGE_SIZE = 100
+HEADERS = ("Подразделение", "Студентов")
+
+
+class TreeNode:
+    """Узел дерева: институт, кафедра, группа или студент"""
+
+    __slots__ = ('level', 'key', 'label', 'count', 'parent', 'row', 'children', 'loaded', 'after')
+
+    def __init__(self, level, key, label, count=None, parent=None):
+        self.level = level
+        self.key = key
+        self.label = label
+        self.count = count
+        self.parent = parent
+        self.row = len(parent.children) if parent is not None else 0
+        self.children = []
+        # Все дети уже прочитаны из базы (у студента детей нет)
+        self.loaded = level == STUDENT
+        # Ключ keyset-пагинации последнего студента группы
+        self.after = None
+
+    def add(self, level, key, label, count=None):
+        child = TreeNode(level, key, label, count, self)
+        self.children.append(child)
+        return child
+
+
+class StudentTreeModel(QAbstractItemModel):
+    """
+    Ленивое дерево институт → кафедра → группа → студенты
+
+    Институты и кафедры со счётчиками приходят одним сгруппированным
+    запросом (Database.student_tree_counts). Группы кафедры читаются при
+    её раскрытии, студенты группы - страницами по PAGE_SIZE при раскрытии
+    и при прокрутке до конца группы (fetch_more_below). Qt сам вызывает
+    canFetchMore/fetchMore, поэтому в памяти только то, что раскрывали.
+    """
+
+    # Ошибка подгрузки ветки (текст для строки состояния)
+    load_failed = pyqtSignal(str)
+
+    def __init__(self, db, parent=None, timeout=None):
+        super().__init__(parent)
+        self.db = db
+        self.timeout = timeout
+        self.filters = {}
+        self.root = TreeNode(None, None, None)
+        self.root.loaded = True
+        # Дерево хоть раз загружено (вкладку открывали)
+        self.populated = False
+
+    # ---- интерфейс QAbstractItemModel ----
+
+    def node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node(parent)
+        if parent.column() > 0 or not 0 <= row < len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        # Стрелка раскрытия у непрочитанных веток - без запроса к базе
+        return bool(node.children) or not node.loaded
+
+    def canFetchMore(self, parent):
+        return not self.node(parent).loaded
+
+    def fetchMore(self, parent):
+        node = self.node(parent)
+        if node.loaded:
+            return
+        try:
+            if node.level == DEPARTMENT:
+                self.fetch_groups(parent, node)
+            elif node.level == GROUP:
+                self.fetch_students(parent, node)
+        except psycopg2.Error as e:
+            # Исключение из виртуального метода Qt уронило бы приложение;
+            # ветка остаётся непрочитанной и подгрузится при следующем раскрытии
+            logger.error("Ошибка загрузки ветки дерева %s: %s", node.label, e)
+            self.load_failed.emit(str(e))
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        node = index.internalPointer()
+
+        if role == Qt.DisplayRole:
+            if index.column() == 0:
+                return node.label
+            return '' if node.count is None else str(node.count)
+
+        if role == Qt.ToolTipRole and node.level == GROUP and node.children and not node.loaded:
+            return (f"Показано {len(node.children)} из {node.count}; "
+                    f"прокрутите вниз, чтобы загрузить ещё")
+
+        if role == Qt.TextAlignmentRole and index.column() == 1:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+
+        return None
+
+    # ---- загрузка ----
+
+    def reload(self, filters=None):
+        """Перечитывает верхние уровни; раскрытые ветки сворачиваются"""
+        self.filters = dict(filters or {})
+        rows = self.db.student_tree_counts(self.filters, timeout=self.timeout)
+
+        self.beginResetModel()
+        self.root = TreeNode(None, None, None)
+        self.root.loaded = True
+        institute = None
+        for row in rows:
+            if institute is None or institute.key != row['institute_id']:
+                institute = self.root.add(INSTITUTE, row['institute_id'],
+                                          f"{row['institute_code']} - {row['institute_name']}", 0)
+                institute.loaded = True
+            institute.add(DEPARTMENT, row['department_id'],
+                          f"{row['department_code']} - {row['department_name']}", row['count'])
+            institute.count += row['count']
+        self.populated = True
+        self.endResetModel()
+
+    def fetch_groups(self, parent, node):
+        """Группы кафедры со счётчиками"""
+        rows = self.db.student_group_counts(node.key, self.filters, timeout=self.timeout)
+        self.insert_children(parent, node, [
+            (GROUP, row['group_name'], row['group_name'], row['count']) for row in rows
+        ])
+        node.loaded = True
+
+    def fetch_students(self, parent, node):
+        """Следующая страница студентов группы по фамилии"""
+        filters = dict(self.filters, department_id=node.parent.key, group_name=node.key)
+        students = self.db.get_students_page(sort_by='last_name', after=node.after,
+                                             limit=PAGE_SIZE, filters=filters,
+                                             timeout=self.timeout)
+        self.insert_children(parent, node, [
+            (STUDENT, student['id'], f"{student['last_name']} {student['initials']}", None)
+            for student in students
+        ])
+        if students:
+            node.after = (students[-1]['last_name'], students[-1]['id'])
+        node.loaded = len(students) < PAGE_SIZE
+
+    def insert_children(self, parent, node, children):
+        if not children:
+            return
+        first = len(node.children)
+        self.beginInsertRows(parent, first, first + len(children) - 1)
+        for child in children:
+            node.add(*child)
+        self.endInsertRows()
+
+    def fetch_more_below(self, index):
+        """
+        Догружает группу, в которой находится строка index
+
+        Вызывается, когда дерево прокручено до конца: QTreeView сам
+        подгружает только корень, а страницы внутри групп - нет.
+        """
+        node = self.node(index)
+        if node.level != STUDENT or node.parent.loaded:
+            return
+        group = node.parent
+        self.fetchMore(self.createIndex(group.row, 0, group))
+
+    # ---- доступ к строкам ----
+
+    def student_id(self, index):
+        """ID студента для строки студента, иначе None"""
+        node = self.node(index)
+        return node.key if node.level == STUDENT else None
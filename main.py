@@ -36,6 +36,10 @@ from config.settings import load_config, setup_logging
 from gui.main_window import MainWindow
 from gui.login_dialog import LoginDialog
 from app.database import Database
+from app.encryption import get_encryptor
+from app.query_cache import QueryCache
+from app.replicas import ReplicaSet
+from app.schema import REQUIRED_MIGRATIONS, missing_upcoming_partitions, pending_migrations
 from app.utils import check_requirements, create_directory_structure
 
 
@@ -87,7 +91,8 @@ def main():
 
     # Проверка подключения к БД
     try:
-        db = Database(config['database'])
+        db = Database(config['database'], cache=QueryCache.from_config(config['database']),
+                      replicas=ReplicaSet.from_config(config['database']))
         if not db.test_connection():
             QMessageBox.critical(None, "Ошибка",
                                  "Не удалось подключиться к базе данных.\n"
@@ -99,6 +104,44 @@ def main():
                              "Убедитесь, что PostgreSQL запущен.")
         return 1
 
+    # Партиции создаёт администратор или cron; здесь только предупреждаем
+    try:
+        missing = missing_upcoming_partitions(db)
+        if missing:
+            logger.warning("Нет партиций students на годы %s: "
+                           "python -m app.cli maintenance partitions", missing)
+    except Exception as e:
+        logger.warning("Не удалось проверить партиции на следующий год: %s", e)
+
+    # Миграции (в том числе сборку индексов) запускает администратор отдельно.
+    # Без обязательных миграций запись студентов не работает - не запускаемся
+    try:
+        pending = [migration.version for migration in pending_migrations(db)]
+    except Exception as e:
+        logger.error("Не удалось проверить версию схемы: %s", e)
+        QMessageBox.critical(None, "Ошибка", f"Не удалось проверить версию схемы БД: {e}")
+        return 1
+    required = [version for version in pending if version in REQUIRED_MIGRATIONS]
+    if required:
+        logger.error("Схема БД устарела, не применены обязательные миграции %s", required)
+        QMessageBox.critical(None, "Ошибка",
+                             f"Схема базы данных устарела: не применены миграции {required}.\n"
+                             "Попросите администратора выполнить:\n"
+                             "python -m app.cli maintenance migrate")
+        return 1
+    if pending:
+        logger.warning("Схема БД устарела, не применены миграции %s: "
+                       "python -m app.cli maintenance migrate", pending)
+
+    # Значения aes-gcm в колонках TEXT не расшифровать - не запускаемся
+    try:
+        encryptor = get_encryptor(**config['encryption'])
+        db.check_encryptor(encryptor)
+    except Exception as e:
+        logger.error("Настройка шифрования не подходит к схеме БД: %s", e)
+        QMessageBox.critical(None, "Ошибка", f"Шифрование: {e}")
+        return 1
+
     # Показываем окно входа
     login_dialog = LoginDialog(db)
 
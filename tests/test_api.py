@@ -0,0 +1,53 @@
+# tests/test_api.py
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.api import (
+    ResponseCache, decode_cursor, encode_cursor, etag_matches, make_etag,
+    parse_filters, parse_limit
+)
+
+
+def test_cursor_round_trip():
+    token = encode_cursor('Ёлкин', 42)
+    assert '=' not in token
+    assert decode_cursor(token) == ('Ёлкин', 42)
+    with pytest.raises(ValueError):
+        decode_cursor('не курсор')
+
+
+def test_etag():
+    etag = make_etag(b'{"count": 1}')
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_cache_ttl_and_eviction(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('app.api.time.monotonic', lambda: now[0])
+
+    cache = ResponseCache(ttl=5, max_entries=2)
+    cache.put('a', '"1"', b'a')
+    cache.put('b', '"2"', b'b')
+    assert cache.get('a') == ('"1"', b'a')
+    cache.put('c', '"3"', b'c')          # вытесняет давно не нужный 'b'
+    assert cache.get('b') is None
+    now[0] += 6
+    assert cache.get('a') is None        # истёк
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_query_parameters():
+    assert parse_filters({'group_name': 'ИВТ-1', 'sort': 'id', 'city_before': ''}) == {
+        'group_name': 'ИВТ-1'
+    }
+    assert parse_limit({}) == 100
+    with pytest.raises(ValueError):
+        parse_limit({'limit': '5000'})
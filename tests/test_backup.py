@@ -0,0 +1,98 @@
+# tests/test_backup.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.backup import _backup_parts, _id_ranges, _index_rebuild, _restore_jobs, SPLIT_ROWS
+
+
+class CatalogCursor:
+    """Курсор без сервера: отвечает на запросы каталога, которые делает _backup_parts"""
+
+    def __init__(self, partitions, reltuples, bounds=(1, 10)):
+        self.partitions = partitions
+        self.reltuples = reltuples
+        self.bounds = bounds
+        self.rows = []
+
+    def execute(self, query, params=None):
+        text = query if isinstance(query, str) else repr(query)
+        table = params[0].split('.')[1] if params else None
+        if 'pg_inherits' in text:
+            self.rows = [{'relname': name} for name in self.partitions.get(table, [])]
+        elif 'reltuples' in text:
+            self.rows = [{'reltuples': self.reltuples.get(table, 0)}]
+        else:
+            self.rows = [{'low': self.bounds[0], 'high': self.bounds[1]}]
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_id_ranges_cover_all_ids():
+    assert _id_ranges(1, 10, 3) == [(1, 5), (5, 9), (9, 11)]
+    assert _id_ranges(5, 5, 4) == [(5, 6)]
+    assert _id_ranges(1, 3, 8) == [(1, 2), (2, 3), (3, 4)]
+
+
+def test_students_split_by_partition_or_id_range():
+    cursor = CatalogCursor({'students': ['students_default', 'students_y2024']}, {})
+    parts = _backup_parts(cursor, ['departments', 'students'], chunks=4)
+    assert [(part['name'], part['relation']) for part in parts] == [
+        ('departments', 'departments'),
+        ('students', 'students_default'),
+        ('students', 'students_y2024'),
+    ]
+    assert len({part['file'] for part in parts}) == 3
+
+    # Обычная крупная таблица делится по id
+    cursor = CatalogCursor({}, {'students': SPLIT_ROWS})
+    parts = _backup_parts(cursor, ['students'], chunks=3)
+    assert [part['id_range'] for part in parts] == [[1, 5], [5, 9], [9, 11]]
+    assert {part['relation'] for part in parts} == {'students'}
+
+
+def test_restore_jobs_group_parts_by_relation():
+    parts = [
+        {'name': 'students', 'relation': 'students_y2024', 'file': 'a'},
+        {'name': 'institutes', 'file': 'b'},   # копия старого формата
+        {'name': 'students', 'relation': 'students_y2024', 'file': 'c'},
+    ]
+    jobs = _restore_jobs(parts, ['students_y2025'])
+    assert list(jobs) == ['students_y2024', 'institutes', 'students_y2025']
+    assert [part['file'] for part in jobs['students_y2024']] == ['a', 'c']
+    assert jobs['students_y2025'] == []
+
+
+def test_partitioned_index_rebuilt_per_partition():
+    indexes = [
+        {'index_name': 'departments_institute_id_idx', 'children': [],
+         'definition': 'CREATE INDEX departments_institute_id_idx ON public.departments USING btree (institute_id)'},
+        {'index_name': 'students_group_name_sort_idx',
+         'definition': 'CREATE INDEX students_group_name_sort_idx ON ONLY public.students '
+                       'USING btree (group_name, id)',
+         'children': [
+             {'index_name': 'students_y2024_students_group_name_sort_idx',
+              'definition': 'CREATE INDEX students_y2024_students_group_name_sort_idx '
+                            'ON public.students_y2024 USING btree (group_name, id)'},
+             {'index_name': 'students_default_students_group_name_sort_idx',
+              'definition': 'CREATE INDEX students_default_students_group_name_sort_idx '
+                            'ON public.students_default USING btree (group_name, id)'},
+         ]},
+    ]
+    parents, builds, attaches = _index_rebuild(indexes)
+
+    # Родительский индекс ON ONLY создаётся первым и только он
+    assert parents == [indexes[1]['definition']]
+    assert all('ON ONLY' not in statement for statement in builds)
+    assert len(builds) == 3
+    assert attaches == [
+        'ALTER INDEX "students_group_name_sort_idx" '
+        'ATTACH PARTITION "students_y2024_students_group_name_sort_idx"',
+        'ALTER INDEX "students_group_name_sort_idx" '
+        'ATTACH PARTITION "students_default_students_group_name_sort_idx"',
+    ]
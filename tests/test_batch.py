@@ -0,0 +1,96 @@
+# tests/test_batch.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from app.database import Database
+from app.query_cache import QueryCache, query_text
+
+
+class BatchDatabase(Database):
+    """Database без сервера: запоминает пакеты и отвечает заданными результатами"""
+
+    def __init__(self, results, cache=None):
+        super().__init__({}, cache=cache)
+        self.results = results
+        self.batches = []
+
+    def _execute_query(self, query, params=None, fetch=True, timeout=None, replica=False):
+        self.batches.append((query_text(query), params, replica))
+        columns = query_text(query).count('json_agg')
+        return [{f"r{number}": self.results.pop(0) for number in range(columns)}]
+
+
+STUDENT = "SELECT s.id, s.last_name FROM students s WHERE s.id = %s"
+
+
+def test_one_round_trip_for_all_queries():
+    db = BatchDatabase([[{'id': 7, 'last_name': 'Иванов'}], [{'id': 1, 'code': 'ИВТ'}]])
+    student, departments = db.execute_batch([
+        (STUDENT, (7,)),
+        (Database.DEPARTMENTS_QUERY, None),
+    ], replica=True)
+
+    assert student == [{'id': 7, 'last_name': 'Иванов'}]
+    assert departments == [{'id': 1, 'code': 'ИВТ'}]
+    assert len(db.batches) == 1
+    text, params, replica = db.batches[0]
+    assert text.count('json_agg') == 2
+    assert params == (7,)
+    assert replica
+
+
+def test_cached_results_are_not_requested_again():
+    db = BatchDatabase([[{'id': 1, 'code': 'ИВТ'}], [{'id': 7}], [{'id': 8}]],
+                       cache=QueryCache(ttl=60))
+    db.execute_batch([(Database.DEPARTMENTS_QUERY, None)])
+    student, departments = db.execute_batch([(STUDENT, (7,)), (Database.DEPARTMENTS_QUERY, None)])
+
+    assert departments == [{'id': 1, 'code': 'ИВТ'}]
+    assert student == [{'id': 7}]
+    assert db.batches[1][0].count('json_agg') == 1
+
+    db.execute_batch([(STUDENT, (7,)), (STUDENT, (8,))])
+    assert len(db.batches) == 3
+    assert db.batches[2][1] == (8,)
+
+
+def test_writes_are_rejected():
+    db = BatchDatabase([])
+    with pytest.raises(ValueError):
+        db.execute_batch([("DELETE FROM students WHERE id = %s", (1,))])
+    assert db.batches == []
+
+
+def test_batch_results_are_cached_apart_from_execute_query():
+    cache = QueryCache(ttl=60)
+    db = BatchDatabase([[{'id': 7, 'birth_date': '2004-05-01'}]], cache=cache)
+    db.execute_batch([(STUDENT, (7,))])
+
+    # Строки из JSON не должны попасть в execute_query с другими типами
+    found, _ = cache.get(cache.make_key(STUDENT, (7,)))
+    assert not found
+    found, rows = cache.get((Database.BATCH_CACHE_KEY, cache.make_key(STUDENT, (7,))))
+    assert found and rows == [{'id': 7, 'birth_date': '2004-05-01'}]
+
+
+def test_fresh_query_bypasses_cache_and_replicas():
+    db = BatchDatabase([[{'id': 7, 'version': 3}], [{'id': 1, 'code': 'ИВТ'}],
+                        [{'id': 7, 'version': 4}]], cache=QueryCache(ttl=60))
+    student, departments = db.get_student_for_edit(7)
+    assert student == {'id': 7, 'version': 3}
+    assert departments == [{'id': 1, 'code': 'ИВТ'}]
+
+    # Второй раз кафедры из кэша, строка студента - снова с сервера
+    student, _ = db.get_student_for_edit(7)
+    assert student['version'] == 4
+    assert len(db.batches) == 2
+    assert db.batches[1][0].count('json_agg') == 1
+    assert not any(replica for _, _, replica in db.batches)
+
+    db = BatchDatabase([[{'id': 7}]])
+    db.execute_batch([(STUDENT, (7,), True)], replica=True)
+    assert not db.batches[0][2]
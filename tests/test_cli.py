@@ -0,0 +1,82 @@
+# tests/test_cli.py
+import sys
+import os
+import subprocess
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app import cli
+from app.database import Database
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+class FakeDatabase(Database):
+    def __init__(self):
+        super().__init__({})
+        self.inserted = []
+
+    def get_departments(self):
+        return [
+            {'id': 1, 'code': 'ИВТ', 'name': '', 'institute_code': 'ИТ', 'institute_name': ''},
+            {'id': 2, 'code': 'ПМ', 'name': '', 'institute_code': 'ИТ', 'institute_name': ''},
+            {'id': 3, 'code': 'ПМ', 'name': '', 'institute_code': 'ФМ', 'institute_name': ''},
+        ]
+
+    def add_students_with_encryption(self, students, encryptor, created_by=1):
+        self.inserted.extend(students)
+        return list(range(len(students)))
+
+
+def test_cli_does_not_import_qt():
+    code = "import sys, app.cli; print(any(m.startswith('PyQt5') for m in sys.modules))"
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip() == 'False'
+
+
+def test_filters_from_arguments():
+    args = cli.build_parser().parse_args(['search', '--group', 'ИВТ-1', '--year-from', '2020'])
+    assert cli.collect_filters(args) == {'admission_year_from': '2020', 'group_name': 'ИВТ-1'}
+
+
+def test_import_batches(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / 'students.csv'
+    path.write_text(
+        "last_name,initials,birth_year,phone,record_book_number,admission_year,"
+        "group_name,department_code,institute_code,city_before\n"
+        "Иванов,И.И.,2002,+7 900 123-45-67,123,2020,ИВТ-1,ИВТ,,Тула\n"
+        "Петров,П.П.,2002,+7 900 123-45-68,124,2020,ПМ-1,ПМ,ФМ,Тула\n"
+        "Сидоров,СС,2002,+7 900 123-45-69,125,2020,ПМ-1,ПМ,,Тула\n",
+        encoding='utf-8'
+    )
+    db = FakeDatabase()
+    args = cli.build_parser().parse_args(['import', str(path), '--batch-size', '2'])
+
+    config = {'encryption': {'key_file': str(tmp_path / 'secret.key')}}
+
+    assert cli.command_import(db, args, config) == 1
+    assert [(s['last_name'], s['department_id'], s['phone']) for s in db.inserted] == [
+        ('Иванов', 1, '79001234567'),
+        ('Петров', 3, '79001234568'),
+    ]
+    errors = capsys.readouterr().err
+    # Инициалы и неоднозначный код кафедры ПМ без института
+    assert "строка 4: initials" in errors
+    assert "строка 4: department_id" in errors
+
+
+def test_legacy_entry_points_run_maintenance_tasks(monkeypatch):
+    from app import backup, schema
+    calls = []
+    monkeypatch.setattr(cli, 'main', lambda argv: calls.append(argv) or 0)
+
+    schema.main(['ensure-indexes'])
+    backup.main(['--workers', '4', 'restore', 'backups/20240901_020000'])
+    assert calls == [
+        ['maintenance', 'indexes'],
+        ['maintenance', '--workers', '4', 'restore', 'backups/20240901_020000'],
+    ]
+    args = cli.build_parser().parse_args(calls[1])
+    assert (args.task, args.path, args.workers) == ('restore', 'backups/20240901_020000', 4)
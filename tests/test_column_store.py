@@ -0,0 +1,91 @@
+# tests/test_column_store.py
+import sys
+import os
+import random
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.column_store import ColumnStore
+
+
+def make_rows():
+    return [
+        {'id': 1, 'last_name': 'Сидоров', 'initials': 'С.С.', 'birth_year': 2001,
+         'admission_year': 2019, 'group_name': 'ИВТ-1', 'city_before': 'Москва'},
+        {'id': 2, 'last_name': 'Алексеев', 'initials': 'А.А.', 'birth_year': 2002,
+         'admission_year': 2020, 'group_name': 'ИВТ-2', 'city_before': 'Тула'},
+        {'id': 3, 'last_name': 'Ёлкин', 'initials': 'Ё.Ё.', 'birth_year': 2002,
+         'admission_year': 2020, 'group_name': 'ИВТ-1', 'city_before': 'Москва'},
+        {'id': 4, 'last_name': 'Борисов', 'initials': 'Б.Б.', 'birth_year': 2000,
+         'admission_year': 2019, 'group_name': 'ИВТ-2', 'city_before': None},
+    ]
+
+
+def ids(store, positions):
+    return [store.value(position, 'id') for position in positions]
+
+
+def test_filter():
+    """Фильтры по группе, городу и году дают маску строк"""
+    store = ColumnStore()
+    store.extend(make_rows())
+
+    assert ids(store, store.select({'group_name': 'ИВТ-1'})) == [1, 3]
+    assert ids(store, store.select({'city_before': 'Москва', 'admission_year': 2020})) == [3]
+    assert ids(store, store.select({'city_before': 'Казань'})) == []
+
+
+def test_multi_key_sort():
+    """Сортировка по нескольким ключам, строки - в алфавитном порядке"""
+    store = ColumnStore()
+    store.extend(make_rows())
+
+    assert ids(store, store.select(sort=[('last_name', False)])) == [2, 4, 3, 1]
+    assert ids(store, store.select(sort=[('admission_year', True), ('last_name', False)])) == [2, 3, 4, 1]
+    assert ids(store, store.select(sort=[('group_name', False), ('birth_year', True)])) == [3, 1, 2, 4]
+
+
+def test_update_and_remove():
+    """Точечные изменения без перезагрузки всего кэша"""
+    store = ColumnStore()
+    store.extend(make_rows())
+
+    store.update_ids([1, 2], {'group_name': 'ИВТ-9', 'admission_year': 2021})
+    assert ids(store, store.select({'group_name': 'ИВТ-9'})) == [1, 2]
+    assert store.value(0, 'admission_year') == 2021
+
+    store.remove_ids([2])
+    assert len(store) == 3
+    assert ids(store, store.select({'group_name': 'ИВТ-9'})) == [1]
+    assert store.distinct('group_name') == ['ИВТ-1', 'ИВТ-2', 'ИВТ-9']
+
+
+def test_large_cache():
+    """Фильтр и сортировка 100 тысяч строк занимают миллисекунды"""
+    rng = random.Random(1)
+    rows = [
+        {'id': i, 'last_name': f"Фамилия{rng.randint(1, 50000)}", 'initials': 'И.О.',
+         'birth_year': rng.randint(1995, 2005), 'admission_year': rng.randint(2015, 2024),
+         'group_name': f"ГР-{rng.randint(1, 300)}", 'city_before': f"Город{rng.randint(1, 500)}"}
+        for i in range(100000)
+    ]
+    store = ColumnStore()
+    store.extend(rows)
+
+    started = time.perf_counter()
+    positions = store.select({'admission_year': 2020},
+                             sort=[('group_name', False), ('last_name', True)])
+    elapsed = time.perf_counter() - started
+    print(f"Фильтр + сортировка 100 тыс. строк: {elapsed * 1000:.1f} мс")
+
+    years = [store.value(p, 'admission_year') for p in positions]
+    assert set(years) == {2020}
+    assert elapsed < 1
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✅ {name}")
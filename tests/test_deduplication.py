@@ -0,0 +1,86 @@
+# tests/test_deduplication.py
+import sys
+import os
+import random
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.deduplication import find_duplicates, edit_distance
+
+
+def student(student_id, last_name, initials='И.И.', birth_year=2002, group_name='ИВТ-20-1'):
+    return {
+        'id': student_id,
+        'last_name': last_name,
+        'initials': initials,
+        'birth_year': birth_year,
+        'group_name': group_name,
+    }
+
+
+def test_edit_distance():
+    """Замена, вставка и перестановка букв - расстояние 1"""
+    assert edit_distance('иванов', 'иванов') == 0
+    assert edit_distance('иванов', 'иванoв') == 1
+    assert edit_distance('иванов', 'ивановв') == 1
+    assert edit_distance('иванов', 'иваонв') == 1
+    assert edit_distance('иванов', 'петров') > 1
+
+
+def test_exact_duplicates():
+    """Одинаковые фамилия, инициалы, год рождения и группа"""
+    groups = find_duplicates([
+        student(1, 'Иванов'),
+        student(2, 'иванов'),
+        student(3, 'Иванов', group_name='ИВТ-20-2'),
+        student(4, 'Петров'),
+    ])
+    assert [(g.kind, g.student_ids) for g in groups] == [('exact', [1, 2])]
+
+
+def test_fuzzy_duplicates():
+    """Почти одинаковое написание внутри одного блока"""
+    groups = find_duplicates([
+        student(1, 'Семёнов'),
+        student(2, 'Семенов'),      # ё/е - точный дубликат после нормализации
+        student(3, 'Семеннов'),
+        student(4, 'Семенов', initials='А.А.'),
+        student(5, 'Сидоров'),
+    ])
+    kinds = {(g.kind, tuple(g.student_ids)) for g in groups}
+    assert ('exact', (1, 2)) in kinds
+    assert ('fuzzy', (1, 2, 3)) in kinds
+    assert len(groups) == 2
+
+
+def test_large_table():
+    """200 тысяч записей обрабатываются за секунды"""
+    rng = random.Random(42)
+    letters = 'АБВГДЕЖЗИКЛМНОПРСТУФХЦЧШЭЮЯ'
+    students = []
+    for student_id in range(1, 200001):
+        name = ''.join(rng.choice(letters) for _ in range(8)).capitalize()
+        students.append(student(
+            student_id, name,
+            initials=f"{rng.choice(letters)}.{rng.choice(letters)}.",
+            birth_year=rng.randint(1995, 2006),
+            group_name=f"ГР-{rng.randint(1, 300)}",
+        ))
+    students.append(student(200001, students[0]['last_name'], students[0]['initials'],
+                            students[0]['birth_year'], students[0]['group_name']))
+
+    started = time.perf_counter()
+    groups = find_duplicates(students)
+    elapsed = time.perf_counter() - started
+    print(f"200 тыс. записей: {elapsed:.2f} с")
+
+    assert any(g.kind == 'exact' and g.student_ids == [1, 200001] for g in groups)
+    assert elapsed < 30
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✅ {name}")
@@ -0,0 +1,90 @@
+# tests/test_encryption.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from app.database import Database
+from app.encryption import BACKENDS, DataEncryptor, VERSION_AES_GCM
+
+KEY = DataEncryptor().key
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_round_trip(backend):
+    encryptor = DataEncryptor(key=KEY, backend=backend)
+    encrypted = encryptor.encrypt('+79991234567')
+    assert encrypted != '+79991234567'
+    assert encryptor.decrypt(encrypted) == '+79991234567'
+    assert encryptor.decrypt(None) is None
+
+
+def test_aes_gcm_format_is_compact_bytes():
+    encryptor = DataEncryptor(key=KEY, backend='aes-gcm')
+    encrypted = encryptor.encrypt('+79991234567')
+    assert isinstance(encrypted, bytes)
+    assert encrypted[0] == VERSION_AES_GCM
+    # заголовок + nonce + текст + тег
+    assert len(encrypted) == 1 + 12 + len('+79991234567') + 16
+    # bytea приходит из psycopg2 как memoryview
+    assert encryptor.decrypt(memoryview(encrypted)) == '+79991234567'
+
+
+def test_both_formats_readable_after_switch():
+    fernet = DataEncryptor(key=KEY, backend='fernet')
+    aes_gcm = DataEncryptor(key=KEY, backend='aes-gcm')
+    legacy = fernet.encrypt('2020-00123')
+
+    # TEXT-колонка и та же строка после миграции в bytea
+    assert aes_gcm.decrypt(legacy) == '2020-00123'
+    assert aes_gcm.decrypt(memoryview(legacy.encode('ascii'))) == '2020-00123'
+    assert fernet.decrypt(aes_gcm.encrypt('2020-00123')) == '2020-00123'
+
+    assert aes_gcm.needs_reencryption(legacy)
+    assert not aes_gcm.needs_reencryption(aes_gcm.encrypt('2020-00123'))
+    assert fernet.needs_reencryption(memoryview(aes_gcm.encrypt('x')))
+    assert not fernet.needs_reencryption(None)
+
+
+def test_tampered_or_foreign_values_are_rejected():
+    encryptor = DataEncryptor(key=KEY, backend='aes-gcm')
+    encrypted = bytearray(encryptor.encrypt('+79991234567'))
+    encrypted[-1] ^= 1
+    assert encryptor.decrypt(bytes(encrypted)) is None
+
+    other = DataEncryptor(backend='aes-gcm')
+    assert other.decrypt(encryptor.encrypt('+79991234567')) is None
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        DataEncryptor(key=KEY, backend='rot13')
+
+
+class ColumnTypeDatabase(Database):
+    """Database без сервера: зашифрованные колонки заданного типа"""
+
+    def __init__(self, data_type):
+        super().__init__({})
+        self.data_type = data_type
+        self.queries = 0
+
+    def _execute_query(self, query, params=None, fetch=True, timeout=None, replica=False):
+        self.queries += 1
+        return [{'column_name': column, 'data_type': self.data_type} for column in params[0]]
+
+
+def test_aes_gcm_refused_before_bytea_migration():
+    db = ColumnTypeDatabase('text')
+    db.check_encryptor(DataEncryptor(key=KEY))
+    assert db.queries == 0
+    with pytest.raises(RuntimeError):
+        db.add_students_with_encryption([{'last_name': 'Иванов'}], DataEncryptor(key=KEY, backend='aes-gcm'))
+
+    db = ColumnTypeDatabase('bytea')
+    encryptor = DataEncryptor(key=KEY, backend='aes-gcm')
+    db.check_encryptor(encryptor)
+    db.check_encryptor(encryptor)
+    assert db.queries == 1
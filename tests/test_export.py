@@ -0,0 +1,56 @@
+# tests/test_export.py
+import sys
+import os
+import gzip
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import Database
+from app.export import export_students_csv, build_export_query
+
+CSV = "id,last_name\n1,Иванов\n2,Петров\n".encode('utf-8')
+
+
+class FakeDatabase(Database):
+    """Database без подключения: COPY отдаёт готовые байты кусками"""
+
+    def __init__(self):
+        super().__init__({})
+        self.calls = []
+
+    def copy_to(self, query, file, params=None, options=None, timeout=None):
+        self.calls.append((query, params, options))
+        for start in range(0, len(CSV), 7):
+            file.write(CSV[start:start + 7])
+        return 2
+
+
+def test_query_uses_search_filters():
+    """Фильтры выгрузки - те же, что у поиска"""
+    db = FakeDatabase()
+    query, params = build_export_query(db, {'group_name': 'ИВТ-1', 'admission_year': '2020'})
+    assert "s.group_name = %s" in query
+    assert "s.admission_year = %s" in query
+    assert params == ['ИВТ-1', 2020]
+    assert "phone" not in query
+
+
+def test_export_plain(tmp_path):
+    db = FakeDatabase()
+    result = export_students_csv(db, export_dir=tmp_path)
+    assert result.path.suffix == '.csv'
+    assert result.path.read_bytes() == CSV
+    assert result.rows == 2
+    assert result.bytes_raw == result.bytes_written == len(CSV)
+    assert "HEADER" in db.calls[0][2]
+
+
+def test_export_gzip(tmp_path):
+    db = FakeDatabase()
+    result = export_students_csv(db, filters={'city_before': 'Тула'},
+                                 export_dir=tmp_path, compress=True)
+    assert result.path.name.endswith('.csv.gz')
+    with gzip.open(result.path, 'rb') as f:
+        assert f.read() == CSV
+    assert result.bytes_raw == len(CSV)
+    assert db.calls[0][1] == ('Тула',)
@@ -0,0 +1,88 @@
+# tests/test_optimistic_locking.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from app.database import ConcurrentUpdateError, Database
+from app.encryption import DataEncryptor
+from app.query_cache import QueryCache, query_text
+
+
+class VersionedDatabase(Database):
+    """Database без сервера: одна строка студента с версией"""
+
+    def __init__(self, row):
+        super().__init__({})
+        self.row = row
+        self.queries = []
+
+    def _execute_query(self, query, params=None, fetch=True, timeout=None, replica=False):
+        text = ' '.join(query_text(query).split())
+        self.queries.append((text, params, replica))
+        if text.startswith('UPDATE'):
+            if self.row is None or (len(params) > 2 and params[-1] != self.row['version']):
+                return []
+            self.row['version'] += 1
+            return [{'id': self.row['id'], 'version': self.row['version']}]
+        return [dict(self.row)] if self.row else []
+
+
+ROW = {'id': 7, 'last_name': 'Иванов', 'initials': 'И.И.', 'group_name': 'ИВТ-21',
+       'city_before': 'Томск', 'department_id': 1, 'version': 3}
+
+
+def test_update_checks_and_bumps_version():
+    db = VersionedDatabase(dict(ROW))
+    assert db.update_student_with_encryption(7, {'group_name': 'ИВТ-22'}, DataEncryptor(), version=3)
+
+    text, params, _ = db.queries[0]
+    assert "version = version + 1" in text and "WHERE id = %s AND version = %s" in text
+    assert params == ('ИВТ-22', 7, 3)
+    assert db.row['version'] == 4
+
+
+def test_stale_version_raises_conflict_with_current_row():
+    db = VersionedDatabase(dict(ROW, version=5, city_before='Омск'))
+    with pytest.raises(ConcurrentUpdateError) as error:
+        db.update_student_with_encryption(7, {'group_name': 'ИВТ-22'}, DataEncryptor(), version=3)
+    assert error.value.current['version'] == 5
+
+    # Другой оператор менял только город - конфликта по полям нет
+    original = {field: ROW[field] for field in ('group_name', 'city_before')}
+    assert error.value.conflicts(original, {'group_name': 'ИВТ-22'}) == {}
+
+
+def test_same_field_changed_by_both_operators():
+    conflict = ConcurrentUpdateError(7, dict(ROW, group_name='ИВТ-23', version=4))
+    original = {'group_name': 'ИВТ-21', 'last_name': 'Иванов'}
+    assert conflict.conflicts(original, {'group_name': 'ИВТ-22', 'last_name': 'Иванова'}) == {
+        'group_name': ('ИВТ-22', 'ИВТ-23'),
+    }
+    # Оба поставили одно и то же значение - не конфликт
+    assert conflict.conflicts(original, {'group_name': 'ИВТ-23'}) == {}
+
+
+def test_deleted_row_is_reported():
+    db = VersionedDatabase(None)
+    with pytest.raises(ConcurrentUpdateError) as error:
+        db.update_student_with_encryption(7, {'group_name': 'ИВТ-22'}, DataEncryptor(), version=3)
+    assert error.value.current is None
+
+
+def test_batch_update_bumps_version():
+    db = VersionedDatabase(dict(ROW))
+    db.move_students([7], group_name='ИВТ-22')
+    assert "version = version + 1" in db.queries[0][0]
+
+
+def test_version_is_read_from_primary_without_cache():
+    db = VersionedDatabase(dict(ROW))
+    db.cache = QueryCache(ttl=60)
+    assert db.get_student_version(7)['version'] == 3
+    assert db.get_student_version(7)['version'] == 3
+
+    assert len(db.queries) == 2
+    assert not any(replica for _, _, replica in db.queries)
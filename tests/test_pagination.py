@@ -0,0 +1,42 @@
+# tests/test_pagination.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.api import decode_cursor, encode_cursor
+from app.database import Database
+from app.query_cache import query_text
+
+
+class RecordingDatabase(Database):
+    """Database без сервера: запоминает запросы страниц"""
+
+    def __init__(self):
+        super().__init__({})
+        self.queries = []
+
+    def _execute_query(self, query, params=None, fetch=True, timeout=None, replica=False):
+        self.queries.append((' '.join(query_text(query).split()), params))
+        return []
+
+
+def test_nullable_sort_column_pages_past_null():
+    db = RecordingDatabase()
+    # Последняя строка страницы без города: ключ (NULL, id) из курсора API
+    after = decode_cursor(encode_cursor(None, 17))
+    db.get_students_page(sort_by='city_before', after=after, limit=50)
+
+    text, params = db.queries[0]
+    assert 'ORDER BY COALESCE(s."city_before", \'\') ASC, s.id ASC' in text
+    assert '(COALESCE(s."city_before", \'\'), s.id) > (%s, %s)' in text
+    assert params == ('', 17, 50)
+
+
+def test_not_null_sort_column_compared_directly():
+    db = RecordingDatabase()
+    db.get_students_page(sort_by='group_name', descending=True, after=('ИВТ-21', 5))
+
+    text, params = db.queries[0]
+    assert '(s."group_name", s.id) < (%s, %s)' in text
+    assert params == ('ИВТ-21', 5, 100)
@@ -0,0 +1,45 @@
+# tests/test_plaintext_cache.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app import plaintext_cache
+from app.plaintext_cache import PlaintextCache
+
+
+def test_missing_and_lru_bound():
+    cache = PlaintextCache(ttl=60, max_entries=2)
+    cache.put(1, '+79990000001')
+    cache.put(2, '')
+    assert cache.missing([1, 2, 3]) == [3]
+    # Обращение к 1 делает вытесняемым 2
+    assert cache.get(1) == (True, '+79990000001')
+    cache.put(3, '+79990000003')
+    assert cache.get(2) == (False, None)
+    assert len(cache) == 2
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(plaintext_cache.time, 'monotonic', lambda: now[0])
+    cache = PlaintextCache(ttl=60)
+    cache.put(1, '+79990000001')
+    now[0] += 59
+    assert cache.get(1) == (True, '+79990000001')
+    now[0] += 2
+    assert cache.missing([1]) == [1]
+    assert cache.get(1) == (False, None)
+    assert len(cache) == 0
+
+
+def test_discard_and_wipe():
+    cache = PlaintextCache.from_config({'phone_reveal_ttl': 30, 'phone_reveal_cache_size': 10})
+    assert (cache.ttl, cache.max_entries) == (30, 10)
+    cache.put(1, '+79990000001')
+    cache.put(2, '+79990000002')
+    cache.discard(1)
+    cache.discard(5)
+    assert cache.missing([1, 2]) == [1]
+    cache.wipe()
+    assert len(cache) == 0
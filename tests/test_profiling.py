@@ -0,0 +1,42 @@
+# tests/test_profiling.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.profiling import Profiler
+
+
+def busy():
+    return sum(i * i for i in range(200000))
+
+
+def test_disabled_writes_nothing(tmp_path):
+    profiler = Profiler('off', report_dir=tmp_path)
+    with profiler.profile('load'):
+        busy()
+    assert profiler.reports == []
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cprofile_and_memory_reports(tmp_path):
+    profiler = Profiler('cprofile', memory=True, report_dir=tmp_path)
+    with profiler.profile('export'):
+        busy()
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert [name.split('_')[0] for name in names] == ['memory', 'profile', 'profile']
+    assert any(name.endswith('.prof') for name in names)
+    profiler.set_memory(False)
+
+
+def test_sampling_report(tmp_path):
+    profiler = Profiler('sampling', report_dir=tmp_path, sample_interval=0.001)
+    with profiler.profile('search'):
+        for _ in range(5):
+            busy()
+    report = profiler.reports[-1].read_text(encoding='utf-8')
+    assert 'busy' in report
+
+
+def test_unknown_mode_is_off():
+    assert Profiler('fast').mode == 'off'
@@ -0,0 +1,86 @@
+# tests/test_query_cache.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from psycopg2 import sql
+
+from app.database import Database
+from app.query_cache import QueryCache, referenced_tables, is_write, query_text
+
+
+class CountingDatabase(Database):
+    """Database без сервера: считает реальные выполнения запросов"""
+
+    def __init__(self, cache):
+        super().__init__({}, cache=cache)
+        self.executed = []
+
+    def _execute_query(self, query, params=None, fetch=True, timeout=None, replica=False):
+        self.executed.append(query_text(query))
+        if fetch and not is_write(query_text(query)):
+            return [{'id': 1, 'name': 'ИВТ'}]
+        return [{'id': 1}] if fetch else None
+
+
+def test_referenced_tables():
+    text = """SELECT s.id FROM students s
+              JOIN departments d ON s.department_id = d.id
+              JOIN public."institutes" i ON d.institute_id = i.id"""
+    assert referenced_tables(text) == {'students', 'departments', 'institutes'}
+    assert referenced_tables("UPDATE students SET updated_at = now()") == {'students'}
+    assert is_write("DELETE FROM students WHERE id = ANY(%s) RETURNING id")
+    assert not is_write("SELECT created_by, updated_at FROM students")
+
+
+def test_composed_query_text():
+    query = sql.SQL("SELECT * FROM {} ORDER BY {}").format(
+        sql.Identifier('students'), sql.Identifier('last_name'))
+    assert referenced_tables(query_text(query)) == {'students'}
+
+
+def test_repeated_reads_hit_cache():
+    db = CountingDatabase(QueryCache(ttl=60))
+    query = "SELECT id, name FROM departments"
+    first = db.execute_query(query)
+    first[0]['name'] = 'изменено вызывающим кодом'
+    second = db.execute_query("SELECT id,   name\n FROM departments")
+    assert len(db.executed) == 1
+    assert second == [{'id': 1, 'name': 'ИВТ'}]
+    assert db.cache.stats()['hits'] == 1
+
+
+def test_write_invalidates_only_touched_tables():
+    db = CountingDatabase(QueryCache(ttl=60))
+    db.execute_query("SELECT id FROM departments")
+    db.execute_query("SELECT id FROM students s JOIN departments d ON s.department_id = d.id")
+    db.execute_query("UPDATE students SET group_name = %s WHERE id = ANY(%s) RETURNING id",
+                     ('ИВТ-2', [1, 2]))
+    db.execute_query("SELECT id FROM departments")
+    db.execute_query("SELECT id FROM students s JOIN departments d ON s.department_id = d.id")
+    # departments - из кэша, students перечитан после UPDATE
+    assert len(db.executed) == 4
+
+
+def test_lru_bound():
+    cache = QueryCache(ttl=60, max_entries=2)
+    for table in ('a', 'b', 'c'):
+        cache.put(cache.make_key(f"SELECT 1 FROM {table}", ()), {table}, [])
+    assert cache.stats()['entries'] == 2
+    assert cache.stats()['evictions'] == 1
+    assert cache.get(cache.make_key("SELECT 1 FROM a", ()))[0] is False
+
+
+def test_disabled_by_config():
+    assert QueryCache.from_config({'cache_ttl': 0}) is None
+    assert QueryCache.from_config({'cache_ttl': 5, 'cache_size': 10}).max_entries == 10
+
+
+def test_literals_are_part_of_key():
+    db = CountingDatabase(QueryCache(ttl=60))
+    query = "SELECT id FROM students WHERE admission_year = {}"
+    db.execute_query(sql.SQL(query).format(sql.Literal(2023)))
+    db.execute_query(sql.SQL(query).format(sql.Literal(2024)))
+    db.execute_query(sql.SQL(query).format(sql.Literal(2024)))
+    assert len(db.executed) == 2
@@ -0,0 +1,145 @@
+# tests/test_replicas.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import time
+
+import psycopg2
+import pytest
+
+from app.database import Database
+from app.replicas import Replica, ReplicaSet, parse_lsn
+
+
+class FakeReplica(Replica):
+    """Реплика без сервера: состояние задаётся тестом"""
+
+    def __init__(self, name, lag=0.0, replay_lsn='0/100', standby=True):
+        super().__init__(f"host={name} port=5432", {})
+        self.state = {'standby': standby, 'replay_lsn': replay_lsn, 'lag': lag}
+        self.checks = 0
+
+    def check(self):
+        self.checks += 1
+        if self.state is None:
+            raise psycopg2.OperationalError("connection refused")
+        return self.state
+
+
+def test_parse_lsn():
+    assert parse_lsn('0/16B3748') == 0x16B3748
+    assert parse_lsn('1/0') == 1 << 32
+    assert parse_lsn('1/0') > parse_lsn('0/FFFFFFFF')
+    assert parse_lsn(None) is None
+
+
+def test_config_without_replicas():
+    assert ReplicaSet.from_config({'replicas': []}) is None
+
+
+def test_replica_inherits_primary_settings():
+    replicas = ReplicaSet.from_config({
+        'host': 'primary', 'port': 5432, 'name': 'students', 'user': 'app',
+        'password': 'secret', 'replicas': ['host=standby port=5433 password=other'],
+    })
+    replica = replicas.replicas[0]
+    assert replica.name == 'standby:5433'
+    assert replica.params['database'] == 'students'
+    assert replica.params['user'] == 'app'
+    assert 'host' not in replica.params and 'password' not in replica.params
+
+
+def test_round_robin_over_healthy_replicas():
+    first, second, lagging = FakeReplica('a'), FakeReplica('b'), FakeReplica('c', lag=60)
+    replicas = ReplicaSet([first, second, lagging], max_lag=5)
+    replicas.refresh()
+    chosen = {replicas.choose().name for _ in range(4)}
+    assert chosen == {'a:5432', 'b:5432'}
+
+
+def test_down_replica_is_skipped_until_next_check():
+    replica = FakeReplica('a')
+    replicas = ReplicaSet([replica], check_interval=60)
+    replicas.refresh()
+    assert replicas.choose() is replica
+    replicas.mark_down(replica)
+    assert replicas.choose() is None
+
+    replica.state = None
+    replicas.refresh()
+    assert replicas.choose() is None
+    assert replicas.status()[0]['healthy'] is False
+
+
+def test_reads_pinned_to_primary_until_replica_catches_up():
+    replica = FakeReplica('a', replay_lsn='0/100')
+    replicas = ReplicaSet([replica], check_interval=60)
+    replicas.refresh()
+    assert replicas.choose() is replica
+
+    replicas.note_write('0/200')
+    assert replicas.choose() is None
+
+    # Пока чтения прижаты к основному серверу, реплика проверяется чаще
+    replica.state['replay_lsn'] = '0/200'
+    replicas._checked_at = time.monotonic() - 1
+    replicas.choose()
+    replicas.wait_refresh(5)
+    assert replicas.choose() is replica
+    assert replica.checks == 2
+
+
+def test_choose_does_not_wait_for_health_check():
+    class SlowReplica(FakeReplica):
+        def check(self):
+            time.sleep(1)
+            return super().check()
+
+    replica = SlowReplica('a')
+    replicas = ReplicaSet([replica], check_interval=60)
+    started = time.monotonic()
+    assert replicas.choose() is None
+    assert time.monotonic() - started < 0.5
+
+    replicas.wait_refresh(5)
+    assert replicas.choose() is replica
+
+
+@pytest.mark.skipif(not os.getenv('DB_REPLICAS'), reason="нужны основной сервер и реплика (DB_REPLICAS)")
+def test_streaming_replication_read_your_writes():
+    """
+    Интеграционная проверка на двух экземплярах PostgreSQL в потоковой репликации
+
+    Запись идёт на основной сервер, чтение сразу после неё не теряет
+    запись, а после догоняющей проверки снова уходит на реплику.
+    """
+    from config.settings import load_config
+
+    config = load_config()['database']
+    replicas = ReplicaSet.from_config(config)
+    db = Database(config, replicas=replicas)
+
+    replicas.refresh()
+    assert any(status['healthy'] for status in replicas.status())
+    assert db.execute_query("SELECT pg_is_in_recovery() as standby", replica=True)[0]['standby']
+
+    db.execute_query("CREATE TABLE IF NOT EXISTS replica_check (id serial PRIMARY KEY, note text)",
+                     fetch=False)
+    try:
+        marker = f"check-{time.time()}"
+        db.execute_query("INSERT INTO replica_check (note) VALUES (%s)", (marker,), fetch=False)
+        assert replicas.write_lsn is not None
+
+        rows = db.execute_query("SELECT note FROM replica_check WHERE note = %s", (marker,),
+                                replica=True)
+        assert rows == [{'note': marker}]
+
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and not any(s['caught_up'] for s in replicas.status()):
+            time.sleep(0.2)
+            replicas.refresh()
+        assert db.execute_query("SELECT pg_is_in_recovery() as standby", replica=True)[0]['standby']
+    finally:
+        db.execute_query("DROP TABLE IF EXISTS replica_check", fetch=False)
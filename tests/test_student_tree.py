@@ -0,0 +1,52 @@
+# tests/test_student_tree.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import Database
+from app.query_cache import query_text
+
+
+class RecordingDatabase(Database):
+    """Database без сервера: запоминает запросы дерева"""
+
+    def __init__(self):
+        super().__init__({})
+        self.queries = []
+
+    def _execute_query(self, query, params=None, fetch=True, timeout=None, replica=False):
+        self.queries.append((' '.join(query_text(query).split()), params, timeout, replica))
+        return []
+
+
+def test_top_levels_from_one_grouped_query():
+    db = RecordingDatabase()
+    db.student_tree_counts({'admission_year': '2024'}, timeout=500)
+
+    assert len(db.queries) == 1
+    text, params, timeout, replica = db.queries[0]
+    assert "GROUP BY i.id, i.code, i.name, d.id, d.code, d.name" in text
+    assert "s.admission_year = %s" in text
+    assert params == (2024,)
+    assert timeout == 500 and replica
+
+
+def test_groups_are_counted_inside_department():
+    db = RecordingDatabase()
+    db.student_group_counts('3', {'city_before': 'Томск'})
+
+    text, params, _, replica = db.queries[0]
+    assert "s.department_id = %s" in text and "GROUP BY s.group_name" in text
+    assert params == ('Томск', 3)
+    assert replica
+
+
+def test_group_page_continues_after_last_student():
+    db = RecordingDatabase()
+    db.get_students_page(after=('Иванов', 42), limit=100,
+                         filters={'department_id': 3, 'group_name': 'ИВТ-21'})
+
+    text, params, _, _ = db.queries[0]
+    assert "s.department_id = %s AND s.group_name = %s" in text
+    assert params == (3, 'ИВТ-21', 'Иванов', 42, 100)
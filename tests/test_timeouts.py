@@ -0,0 +1,154 @@
+# tests/test_timeouts.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import psycopg2
+import psycopg2.errors
+import pytest
+from psycopg2 import sql
+
+import app.database as database
+from app.database import (
+    Database, QueryCancelledError, QueryTimeoutError, is_transient_error,
+)
+
+
+class FakeCursor:
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.description = None
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append(query)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        self.rows = outcome
+        self.description = [('id',)]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.closed = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.cancelled = False
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def cancel(self):
+        self.cancelled = True
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeDatabase(Database):
+    """Database без сервера: каждое подключение выполняет следующий исход из списка"""
+
+    def __init__(self, outcomes, failed_connects=0, statement_timeout=5000):
+        super().__init__({'name': 'test', 'statement_timeout': statement_timeout})
+        self.outcomes = outcomes
+        self.failed_connects = failed_connects
+        self.connections = []
+
+    def connect(self):
+        if self.failed_connects:
+            self.failed_connects -= 1
+            return False
+        self.connection = FakeConnection(FakeCursor(self.outcomes))
+        self.cursor = self.connection.cursor()
+        self.connections.append(self.connection)
+        return True
+
+
+@pytest.fixture(autouse=True)
+def no_retry_pause(monkeypatch):
+    monkeypatch.setattr(database.Database, '_retry_pause', staticmethod(lambda attempt: None))
+
+
+def test_transient_errors():
+    assert is_transient_error(psycopg2.OperationalError("server closed the connection unexpectedly"))
+    assert is_transient_error(psycopg2.InterfaceError("connection already closed"))
+    assert not is_transient_error(psycopg2.errors.QueryCanceled())
+    assert not is_transient_error(psycopg2.errors.LockNotAvailable())
+    assert not is_transient_error(QueryTimeoutError("таймаут"))
+    assert not is_transient_error(psycopg2.errors.UniqueViolation())
+
+
+def test_retries_lost_connection():
+    lost = psycopg2.OperationalError("server closed the connection unexpectedly")
+    db = FakeDatabase([lost, [{'id': 1}]], failed_connects=1)
+    assert db.execute_query("SELECT id FROM students") == [{'id': 1}]
+    assert len(db.connections) == 2
+    assert db.connections[-1].commits == 1
+
+
+def test_gives_up_after_attempts():
+    lost = psycopg2.OperationalError("server closed the connection unexpectedly")
+    db = FakeDatabase([lost] * database.RETRY_ATTEMPTS)
+    with pytest.raises(psycopg2.OperationalError):
+        db.execute_query("SELECT id FROM students")
+    assert len(db.connections) == database.RETRY_ATTEMPTS
+
+
+def test_sql_errors_are_not_retried():
+    db = FakeDatabase([psycopg2.errors.UniqueViolation()])
+    with pytest.raises(psycopg2.errors.UniqueViolation):
+        db.execute_query("INSERT INTO students (id) VALUES (1)", fetch=False)
+    assert len(db.connections) == 1
+
+
+def test_statement_timeout_is_reported():
+    db = FakeDatabase([psycopg2.errors.QueryCanceled()])
+    with pytest.raises(QueryTimeoutError, match="2 с"):
+        db.execute_query("SELECT pg_sleep(10)", timeout=2000)
+    assert len(db.connections) == 1
+    assert db.connections[0].rollbacks == 1
+
+
+def test_cancel_interrupts_and_blocks_further_queries():
+    db = FakeDatabase([])
+    db.outcomes.append(psycopg2.errors.QueryCanceled())
+    original_connect = db.connect
+
+    def connect_and_cancel():
+        original_connect()
+        db.cancel()
+        return True
+
+    db.connect = connect_and_cancel
+    with pytest.raises(QueryCancelledError):
+        db.execute_query("SELECT id FROM students")
+    assert db.connections[0].cancelled
+
+    with pytest.raises(QueryCancelledError):
+        db.execute_query("SELECT id FROM students")
+    assert len(db.connections) == 1
+
+    assert not db.clone()._cancel_requested.is_set()
+
+
+def test_timeout_prefix():
+    db = FakeDatabase([[{'id': 1}]], statement_timeout=0)
+    assert db._with_timeout("SELECT 1", None) == "SELECT 1"
+    timed = db._with_timeout("SELECT 1", 1500)
+    assert isinstance(timed, sql.Composed)
+    assert timed.seq[-1] == sql.SQL("SELECT 1")
@@ -0,0 +1,101 @@
+# tests/test_validation.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from app.validation import (
+    normalize_phone, normalize_initials, validate_columns,
+    validate_record, normalize_record
+)
+
+
+def valid_record():
+    return {
+        'last_name': 'Иванов',
+        'initials': 'И.И.',
+        'birth_year': 2002,
+        'phone': '+7 (999) 123-45-67',
+        'record_book_number': '12345678',
+        'admission_year': 2020,
+        'group_name': 'ИВТ-20-1',
+        'department_id': 1,
+        'city_before': 'Москва',
+    }
+
+
+def test_normalize_phone():
+    """Телефон приводится к виду 7XXXXXXXXXX"""
+    assert normalize_phone('+7 (999) 123-45-67') == '79991234567'
+    assert normalize_phone('8 999 123 45 67') == '79991234567'
+    assert normalize_phone('89991234567') == '79991234567'
+    assert normalize_phone('12345') is None
+
+
+def test_normalize_initials():
+    """Инициалы приводятся к виду 'И.О.'"""
+    assert normalize_initials('И. О.') == 'И.О.'
+    assert normalize_initials('И.О.') == 'И.О.'
+    assert normalize_initials('ИО') is None
+
+
+def test_validate_record():
+    """Форма: корректная запись без ошибок, ошибки - с понятными текстами"""
+    assert validate_record(valid_record()) == []
+
+    record = valid_record()
+    record['initials'] = 'ИИ'
+    record['phone'] = ''
+    errors = validate_record(record)
+    assert "Инициалы должны быть в формате 'И.О.'" in errors
+    assert "Телефон обязателен для заполнения" in errors
+
+    # При редактировании телефон можно не указывать
+    assert validate_record(record, optional_fields=('phone',)) == \
+        ["Инициалы должны быть в формате 'И.О.'"]
+
+
+def test_admission_age():
+    """Студент не может поступить раньше 16 лет"""
+    record = valid_record()
+    record['birth_year'] = 2010
+    errors = validate_record(record)
+    assert len(errors) == 1
+    assert 'младше 16 лет' in errors[0]
+
+
+def test_normalize_record():
+    """Нормализация записи не теряет некорректные значения"""
+    record = normalize_record({'phone': '8 999 123-45-67', 'initials': 'плохо'})
+    assert record == {'phone': '79991234567', 'initials': 'плохо'}
+
+
+def test_validate_columns_batch():
+    """Пакетный режим: ошибки с номерами строк, нормализованные колонки"""
+    size = 100000
+    columns = {
+        'last_name': ['Петров'] * size,
+        'initials': ['П.П.'] * size,
+        'phone': ['8 (900) 000-00-00'] * size,
+        'birth_year': [2001] * size,
+        'admission_year': [2019] * size,
+    }
+    columns['phone'][10] = 'нет'
+    columns['initials'][20] = ''
+    columns['birth_year'][30] = 2010
+
+    result = validate_columns(columns)
+
+    assert result.valid_count == size - 3
+    assert [(e.row, e.field) for e in result.errors] == [
+        (10, 'phone'), (20, 'initials'), (30, 'admission_year')
+    ]
+    assert result.columns['phone'][0] == '79000000000'
+    assert len(list(result.rows())) == size - 3
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith('test_'):
+            func()
+            print(f"✅ {name}")
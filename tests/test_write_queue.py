@@ -0,0 +1,200 @@
+# tests/test_write_queue.py
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import psycopg2
+import pytest
+
+from app.encryption import DataEncryptor
+from app.write_queue import WriteQueue
+
+
+class QueueDatabase:
+    """Database без сервера: пачки и вставки по одной задаются тестом"""
+
+    def __init__(self):
+        self.batches = []
+        self.next_id = 1
+        self.rejected = set()
+        self.offline = 0
+        # Вставленные ключи записей: повтор ключа не вставляет строку (ON CONFLICT)
+        self.by_key = {}
+
+    def clone(self):
+        return self
+
+    def add_students_with_encryption(self, students, encryptor, created_by=1, keys=None):
+        if self.offline:
+            self.offline -= 1
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.batches.append([student['last_name'] for student in students])
+        if any(student['last_name'] in self.rejected for student in students):
+            raise psycopg2.IntegrityError("duplicate key")
+        return [self._insert(key) for key in keys]
+
+    def add_students_with_savepoints(self, students, encryptor, created_by=1, keys=None):
+        return [(None, "duplicate key") if student['last_name'] in self.rejected
+                else (self._insert(key), None) for student, key in zip(students, keys)]
+
+    def _insert(self, key):
+        if key not in self.by_key:
+            self.by_key[key] = self.next_id
+            self.next_id += 1
+        return self.by_key[key]
+
+
+def student(last_name):
+    return {'last_name': last_name, 'initials': 'И.И.', 'birth_year': 2005,
+            'phone': '79991234567', 'record_book_number': '2024-00001',
+            'admission_year': 2024, 'group_name': 'ИВТ-24-1', 'department_id': 1,
+            'city_before': 'Томск'}
+
+
+def make_queue(tmp_path, db, **kwargs):
+    return WriteQueue(db, DataEncryptor(), str(tmp_path / 'queue.journal'), flush_delay=0.05, **kwargs)
+
+
+def test_journal_is_encrypted_and_survives_restart(tmp_path):
+    db = QueueDatabase()
+    queue = make_queue(tmp_path, db)
+    queue.put(student('Иванов'))
+
+    with open(queue.journal_path, 'rb') as journal:
+        assert b'79991234567' not in journal.read()
+
+    restarted = WriteQueue(db, queue.encryptor, queue.journal_path)
+    assert restarted.load() == 1
+    assert restarted.snapshot()[0]['student']['last_name'] == 'Иванов'
+
+
+def test_records_are_flushed_in_batches(tmp_path):
+    db = QueueDatabase()
+    notified = []
+    queue = make_queue(tmp_path, db, batch_size=2,
+                       listener=lambda saved, failed: notified.append((saved, failed)))
+    for name in ('Иванов', 'Петров', 'Сидоров'):
+        queue.put(student(name))
+
+    queue.start()
+    try:
+        assert queue.flush(timeout=5)
+    finally:
+        queue.stop()
+
+    assert db.batches == [['Иванов', 'Петров'], ['Сидоров']]
+    assert queue.status() == {'pending': 0, 'failed': 0, 'saved': 3, 'offline': False,
+                              'journal_error': None}
+    assert sum(len(saved) for saved, _ in notified) == 3
+    assert not os.path.exists(queue.journal_path)
+
+
+def test_failed_record_stays_until_corrected(tmp_path):
+    db = QueueDatabase()
+    db.rejected = {'Петров'}
+    queue = make_queue(tmp_path, db)
+    queue.put(student('Иванов'))
+    key = queue.put(student('Петров'))
+
+    queue.start()
+    try:
+        assert queue.flush(timeout=5)
+        assert queue.status()['saved'] == 1
+        [entry] = queue.snapshot()
+        assert entry['key'] == key and entry['error'] == "duplicate key"
+
+        assert queue.update(key, student('Петрова'))
+        assert queue.flush(timeout=5)
+    finally:
+        queue.stop()
+
+    assert queue.status() == {'pending': 0, 'failed': 0, 'saved': 2, 'offline': False,
+                              'journal_error': None}
+
+
+def test_batch_is_retried_after_lost_connection(tmp_path):
+    db = QueueDatabase()
+    db.offline = 1
+    states = []
+    queue = make_queue(tmp_path, db)
+    queue.listener = lambda saved, failed: states.append(queue.offline)
+    queue.put(student('Иванов'))
+
+    queue.start()
+    try:
+        assert queue.flush(timeout=5)
+    finally:
+        queue.stop()
+
+    assert states[0] is True and states[-1] is False
+    assert db.batches == [['Иванов']]
+
+
+def test_resent_batch_after_crash_is_not_duplicated(tmp_path):
+    db = QueueDatabase()
+    queue = make_queue(tmp_path, db)
+    queue.put(student('Иванов'))
+    queue.put(student('Петров'))
+
+    # Приложение упало после COMMIT, журнал не успел перезаписаться
+    first = queue._write([entry['student'] for entry in queue.snapshot()],
+                         [entry['key'] for entry in queue.snapshot()])
+
+    restarted = WriteQueue(db, queue.encryptor, queue.journal_path, flush_delay=0.05)
+    assert restarted.load() == 2
+    restarted.start()
+    try:
+        assert restarted.flush(timeout=5)
+    finally:
+        restarted.stop()
+
+    assert len(db.by_key) == 2
+    assert restarted.status()['saved'] == 2
+    assert [student_id for student_id, _ in first] == sorted(db.by_key.values())
+
+
+def test_journal_error_does_not_stop_worker(tmp_path):
+    db = QueueDatabase()
+    notified = []
+    queue = make_queue(tmp_path, db, listener=lambda saved, failed: notified.append(saved))
+    queue.put(student('Иванов'))
+
+    save = queue._save
+    def broken_save():
+        raise OSError(28, "No space left on device")
+    queue._save = broken_save
+
+    queue.start()
+    try:
+        assert queue.flush(timeout=5)
+        assert notified and queue.status()['journal_error']
+
+        queue._save = save
+        queue.put(student('Петров'))
+        assert queue.flush(timeout=5)
+    finally:
+        queue.stop()
+
+    assert queue.status()['journal_error'] is None
+    assert queue.status()['saved'] == 2
+
+
+def test_failed_journal_write_keeps_queue_unchanged(tmp_path):
+    db = QueueDatabase()
+    queue = make_queue(tmp_path, db)
+    key = queue.put(student('Петров'))
+    queue.entries[0]['error'] = "duplicate key"
+
+    def broken_save():
+        raise OSError(28, "No space left on device")
+    queue._save = broken_save
+
+    for change in (lambda: queue.update(key, student('Петрова')),
+                   lambda: queue.discard(key),
+                   queue.retry_failed):
+        with pytest.raises(OSError):
+            change()
+        [entry] = queue.snapshot()
+        assert entry['student']['last_name'] == 'Петров'
+        assert entry['error'] == "duplicate key"